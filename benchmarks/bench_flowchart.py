@@ -0,0 +1,59 @@
+"""
+Throughput of `PFlowchartGenerator` on the largest modules of the standard
+library, in nodes generated per second (parsing excluded).
+"""
+import ast
+import os
+import sysconfig
+import time
+
+import common  # noqa: F401
+
+from code_generator.flowchart import PFlowchartGenerator, source_lines
+
+MODULE_COUNT = 10
+
+
+def largest_modules(count):
+    stdlib = sysconfig.get_paths()["stdlib"]
+    modules = []
+    for directory, directories, files in os.walk(stdlib):
+        # * skip the test suites and third party packages
+        directories[:] = [
+            name
+            for name in directories
+            if name not in ("test", "tests", "site-packages", "idlelib")
+        ]
+        modules += [
+            os.path.join(directory, name) for name in files if name.endswith(".py")
+        ]
+    return sorted(modules, key=os.path.getsize, reverse=True)[:count]
+
+
+def main():
+    generator = PFlowchartGenerator()
+    total_nodes, total_seconds = 0, 0.0
+
+    for path in largest_modules(MODULE_COUNT):
+        with open(path, "r", encoding="utf-8") as module_file:
+            source = module_file.read()
+        lines = source_lines(source)
+        statements = ast.parse(source, path).body
+
+        start = time.perf_counter()
+        chart = generator.generate_statements(statements, lines)
+        seconds = time.perf_counter() - start
+
+        total_nodes += len(chart)
+        total_seconds += seconds
+        print(
+            f"{os.path.relpath(path, sysconfig.get_paths()['stdlib']):>36}: "
+            f"{len(lines):>6} lines, {len(chart):>6} nodes, "
+            f"{len(chart) / seconds:10.0f} nodes/s"
+        )
+
+    print(f"{'total':>36}: {total_nodes / total_seconds:10.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    main()
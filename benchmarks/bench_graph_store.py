@@ -0,0 +1,101 @@
+"""
+Memory per node and whole graph operation time of `PNodeStore` against one
+python object per node.
+"""
+import random
+import time
+import tracemalloc
+
+import common  # noqa: F401
+
+from editor.graph_store import PNodeStore
+
+NODE_COUNT = 100_000
+
+
+class Node:
+    def __init__(self, x, y, width, height, kind, first_line, last_line) -> None:
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.kind = kind
+        self.first_line, self.last_line = first_line, last_line
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size / NODE_COUNT, seconds
+
+
+def main():
+    random.seed(0)
+    columns = (
+        [random.uniform(0, 64_000) for _ in range(NODE_COUNT)],
+        [random.uniform(0, 64_000) for _ in range(NODE_COUNT)],
+        [120.0] * NODE_COUNT,
+        [40.0] * NODE_COUNT,
+        [random.randrange(8) for _ in range(NODE_COUNT)],
+        list(range(NODE_COUNT)),
+        list(range(1, NODE_COUNT + 1)),
+    )
+
+    objects, object_bytes, object_add = measure(
+        lambda: [Node(*row) for row in zip(*columns)]
+    )
+
+    def translate_objects():
+        for node in objects:
+            node.x += 10
+            node.y += 10
+
+    def bounding_rect_objects():
+        left = min(node.x for node in objects)
+        top = min(node.y for node in objects)
+        right = max(node.x + node.width for node in objects)
+        bottom = max(node.y + node.height for node in objects)
+        return left, top, right - left, bottom - top
+
+    def store_nodes():
+        store = PNodeStore()
+        store.add_many(*columns)
+        return store
+
+    store, store_bytes, store_add = measure(store_nodes)
+
+    for name, bytes_per_node, add, translate, bounding_rect in (
+        (
+            "objects",
+            object_bytes,
+            object_add,
+            translate_objects,
+            bounding_rect_objects,
+        ),
+        (
+            "columns",
+            store_bytes,
+            store_add,
+            lambda: store.translate(10, 10),
+            store.bounding_rect,
+        ),
+    ):
+        start = time.perf_counter()
+        translate()
+        translate_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bounding_rect()
+        bounding_rect_time = time.perf_counter() - start
+
+        print(
+            f"{name:>8}: {bytes_per_node:6.1f} bytes/node, "
+            f"add {add * 1000:7.2f}ms, translate {translate_time * 1000:7.2f}ms, "
+            f"bounding rect {bounding_rect_time * 1000:7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
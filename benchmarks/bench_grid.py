@@ -0,0 +1,55 @@
+"""
+Frame time of `PGraphicsScene.drawBackground` while panning, across the zoom
+levels `PGraphicsView.wheelEvent` allows and a few grid sizes.
+"""
+import time
+
+from common import application
+
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QImage, QPainter
+
+from editor.widgets import PGraphicsScene
+
+VIEWPORT_WIDTH, VIEWPORT_HEIGHT = 1920, 1080
+FRAMES = 60
+# * pixels panned on screen between two frames
+PAN_STEP = 7
+
+
+def frame_time(scene, scale):
+    image = QImage(
+        VIEWPORT_WIDTH, VIEWPORT_HEIGHT, QImage.Format_ARGB32_Premultiplied
+    )
+    painter = QPainter(image)
+    painter.scale(scale, scale)
+
+    width, height = VIEWPORT_WIDTH / scale, VIEWPORT_HEIGHT / scale
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        offset = frame * PAN_STEP / scale
+        scene.drawBackground(painter, QRectF(offset, offset, width, height))
+    seconds = time.perf_counter() - start
+
+    painter.end()
+    return seconds / FRAMES
+
+
+def main():
+    application()
+
+    # * the zoom levels of `PGraphicsView`, from 0 to 10 with a 1.25 factor
+    scales = [1.25 ** (zoom - 10) for zoom in range(0, 11)]
+
+    for grid_size in (10, 20, 50):
+        scene = PGraphicsScene()
+        scene.grid_size = grid_size
+        times = ", ".join(
+            f"{scale:5.2f}x {frame_time(scene, scale) * 1000:6.2f}ms"
+            for scale in scales
+        )
+        print(f"grid {grid_size:>3}: {times}")
+
+
+if __name__ == "__main__":
+    main()
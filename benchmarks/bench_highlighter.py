@@ -0,0 +1,104 @@
+"""
+Blocks per second of `PSyntaxHighlighter` against the previous
+implementation, which ran one `QRegExp` per keyword, operator and brace.
+"""
+from common import application, best_of, generate_source
+
+from PyQt5.QtCore import QRegExp
+from PyQt5.QtGui import QTextDocument
+
+from editor.code_overview import PSyntaxHighlighter
+
+
+class PRuleLoopHighlighter(PSyntaxHighlighter):
+    """The rule loop `PSyntaxHighlighter` used before the single pass tokenizer."""
+
+    def __init__(self, parent: QTextDocument) -> None:
+        rules = []
+        rules += [(r"\b%s\b" % w, 0, "keyword") for w in self.KEYWORDS]
+        rules += [(r"%s" % o, 0, "operator") for o in self.OPERATORS]
+        rules += [(r"%s" % b, 0, "brace") for b in self.BRACES]
+        rules += [
+            (r"\bself\b", 0, "self"),
+            (r"\bdef\b\s*(\w+)", 1, "defclass"),
+            (r"\bclass\b\s*(\w+)", 1, "defclass"),
+            (r"\b[+-]?[0-9]+[lL]?\b", 0, "numbers"),
+            (r"\b[+-]?0[xX][0-9A-Fa-f]+[lL]?\b", 0, "numbers"),
+            (r"\b[+-]?[0-9]+(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?\b", 0, "numbers"),
+            (r'"[^"\\]*(\\.[^"\\]*)*"', 0, "string"),
+            (r"'[^'\\]*(\\.[^'\\]*)*'", 0, "string"),
+            (r"#[^\n]*", 0, "comment"),
+        ]
+        self.rules = [
+            (QRegExp(pat), index, self.STYLES[style]) for (pat, index, style) in rules
+        ]
+        self.tri_quote = QRegExp("'''")
+        self.string_patterns = [r'"[^"\\]*(\\.[^"\\]*)*"', r"'[^'\\]*(\\.[^'\\]*)*'"]
+
+        super().__init__(parent)
+
+    def highlightBlock(self, text):
+        triple_quotes_within_strings = []
+        for expression, nth, format in self.rules:
+            index = expression.indexIn(text, 0)
+            if index >= 0:
+                inner_index = self.tri_quote.indexIn(text, index + 1)
+                if expression.pattern() in self.string_patterns and inner_index != -1:
+                    triple_quotes_within_strings.extend(
+                        range(inner_index, inner_index + 3)
+                    )
+
+            while index >= 0:
+                if index in triple_quotes_within_strings:
+                    index += 1
+                    expression.indexIn(text, index)
+                    continue
+
+                index = expression.pos(nth)
+                length = len(expression.cap(nth))
+                self.setFormat(index, length, format)
+                index = expression.indexIn(text, index + length)
+
+        self.setCurrentBlockState(0)
+
+
+def blocks_per_second(highlighter_class, document, warm_cache=False):
+    """
+    Blocks per second of ``highlighter_class`` highlighting ``document``.
+    Without ``warm_cache`` the token cache keeps no line, the generated
+    sources repeat the same few lines and would be all hits otherwise.
+    """
+    highlighter = highlighter_class(None)
+    if not warm_cache:
+        highlighter.token_cache.resize(0)
+    highlighter.setDocument(document)
+
+    seconds = best_of(highlighter.rehighlight)
+    highlighter.setDocument(None)
+    if not warm_cache:
+        assert highlighter.cache_statistics()["hits"] == 0
+    return document.blockCount() / seconds
+
+
+def main():
+    application()
+
+    for line_count in (1_000, 10_000):
+        document = QTextDocument()
+        document.setPlainText(generate_source(line_count))
+
+        rule_loop = blocks_per_second(PRuleLoopHighlighter, document)
+        single_pass = blocks_per_second(PSyntaxHighlighter, document)
+        cached = blocks_per_second(PSyntaxHighlighter, document, warm_cache=True)
+
+        print(
+            f"{line_count:>7} lines: rule loop {rule_loop:10.0f} blocks/s, "
+            f"single pass {single_pass:10.0f} blocks/s "
+            f"({single_pass / rule_loop:.1f}x), "
+            f"warm token cache {cached:10.0f} blocks/s "
+            f"({cached / rule_loop:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
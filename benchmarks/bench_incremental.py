@@ -0,0 +1,63 @@
+"""
+Latency of updating the flowchart of a 5k line file after a one line edit,
+with `PIncrementalFlowchart` against generating, adding and laying out the
+whole graph again.
+"""
+import random
+
+import common
+
+from code_generator.flowchart import PFlowchartGenerator
+from code_generator.incremental import PIncrementalFlowchart
+from editor.layout import PLayeredLayout
+from editor.widgets import PScene
+
+LINE_COUNT = 5_000
+EDITS = 200
+
+
+def main():
+    random.seed(0)
+    lines = common.generate_source(LINE_COUNT).split("\n")
+    # * edits appending to a statement keep the source valid
+    statements = [
+        index
+        for index, line in enumerate(lines)
+        if line.strip().startswith(("print(", "return ")) and line.endswith(")")
+    ]
+
+    incremental = PIncrementalFlowchart(PScene())
+    incremental.update("\n".join(lines))
+
+    latencies, parsed_lines = [], 0
+    for _ in range(EDITS):
+        index = random.choice(statements)
+        lines[index] = lines[index][:-1] + " + 1)"
+        incremental.update("\n".join(lines))
+
+        latencies.append(incremental.statistics["seconds"])
+        parsed_lines += incremental.statistics["parsed_lines"]
+
+    source = "\n".join(lines)
+    generator = PFlowchartGenerator()
+    layout = PLayeredLayout()
+
+    def rebuild():
+        scene = PScene()
+        generator.generate(source).add_to_scene(scene)
+        layout.apply(scene)
+
+    full = common.best_of(rebuild)
+
+    latencies.sort()
+    median = latencies[len(latencies) // 2]
+    worst = latencies[-1]
+    print(
+        f"incremental: median {median * 1000:7.2f}ms, worst {worst * 1000:7.2f}ms, "
+        f"{parsed_lines / EDITS:6.1f} lines parsed per edit"
+    )
+    print(f"       full: {full * 1000:7.2f}ms, {LINE_COUNT} lines parsed per edit")
+
+
+if __name__ == "__main__":
+    main()
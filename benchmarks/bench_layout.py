@@ -0,0 +1,57 @@
+"""
+Time of `PLayeredLayout` on flowcharts of growing size built from the
+standard library, from reading the scene to writing the positions back.
+"""
+import ast
+import time
+
+import common  # noqa: F401
+
+from bench_flowchart import largest_modules
+from code_generator.flowchart import PFlowchartGenerator, source_lines
+from editor import layout
+from editor.layout import PLayeredLayout
+from editor.widgets import PScene
+
+NODE_COUNTS = (1_000, 10_000)
+
+
+def build_scene(node_count):
+    """Return a scene with the flowcharts of the largest modules, side by side."""
+    scene = PScene()
+    generator = PFlowchartGenerator()
+    for path in largest_modules(100):
+        with open(path, "r", encoding="utf-8") as module_file:
+            source = module_file.read()
+        chart = generator.generate_statements(
+            ast.parse(source, path).body, source_lines(source)
+        )
+        chart.add_to_scene(scene)
+        if len(scene.node_store) >= node_count:
+            break
+    return scene
+
+
+def main():
+    engine = "numpy" if layout.numpy is not None else "packing"
+    for node_count in NODE_COUNTS:
+        scene = build_scene(node_count)
+        engine_layout = PLayeredLayout()
+
+        start = time.perf_counter()
+        nodes, xs, ys = engine_layout.layout(scene)
+        layout_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scene.move_nodes(nodes, xs, ys)
+        write_time = time.perf_counter() - start
+
+        print(
+            f"{len(scene.node_store):>6} nodes, {len(scene.edge_store):>6} edges "
+            f"({engine}): layout {layout_time * 1000:8.2f}ms, "
+            f"write back {write_time * 1000:7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
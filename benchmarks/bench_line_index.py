@@ -0,0 +1,38 @@
+"""
+Time of `PScene.node_at_line` on flowcharts of growing size, for every line
+of the code, and of shifting the lines of all the nodes as an edit at the
+top of the code does.
+"""
+import time
+
+import common  # noqa: F401
+
+from bench_layout import build_scene
+
+NODE_COUNTS = (1_000, 10_000)
+
+
+def main():
+    for node_count in NODE_COUNTS:
+        scene = build_scene(node_count)
+        store = scene.node_store
+        line_count = max(store.last_line) + 1
+
+        start = time.perf_counter()
+        for line in range(line_count):
+            scene.node_at_line(line)
+        lookup_time = (time.perf_counter() - start) / line_count
+
+        start = time.perf_counter()
+        for node in list(store):
+            scene.set_lines(node, store.first_line[node] + 1, store.last_line[node] + 1)
+        shift_time = time.perf_counter() - start
+
+        print(
+            f"{len(store):>6} nodes, {line_count:>6} lines: "
+            f"lookup {lookup_time * 1e6:6.2f}us, shift all {shift_time * 1000:7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Time to load a file into `PCodeOverview` against its size, for the previous
+line by line `appendPlainText` loop, the bulk `load_file`, the streaming
+`load_file` and the virtual mode, with its line index built ("cold") or
+persisted by a previous load.
+"""
+import contextlib
+import os
+import tempfile
+import time
+
+from common import application, generate_source
+
+from PyQt5.QtCore import QCoreApplication, QEvent, QEventLoop
+
+from editor.code_overview import PCodeOverview
+from editor.mapped_source import index_path
+
+# * the line by line loop is too slow to be measured on the bigger files
+APPEND_MAX_LINES = 20_000
+
+
+def append_lines(editor, path):
+    with open(path, "r") as source_file:
+        for line in source_file.readlines():
+            editor.appendPlainText(line.removesuffix("\n"))
+
+
+def load_bulk(editor, path):
+    editor.load_file(path, streaming=False)
+
+
+def load_streaming(editor, path):
+    loop = QEventLoop()
+    editor.fileLoaded.connect(loop.quit)
+    editor.load_file(path, streaming=True)
+    loop.exec_()
+    editor.fileLoaded.disconnect(loop.quit)
+
+
+def load_virtual(editor, path):
+    loop = QEventLoop()
+    editor.fileLoaded.connect(loop.quit)
+    editor.load_file(path, virtual=True)
+    # * a persisted index is opened right away
+    if editor.is_loading():
+        loop.exec_()
+    editor.fileLoaded.disconnect(loop.quit)
+
+
+def load_virtual_cold(editor, path):
+    remove_index(path)
+    load_virtual(editor, path)
+
+
+def remove_index(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(index_path(path))
+
+
+def timed(function, path):
+    application().processEvents()
+    editor = PCodeOverview()
+    start = time.perf_counter()
+    function(editor, path)
+    seconds = time.perf_counter() - start
+    # * the background highlighting thread must not outlive the editor
+    editor.highlighter.stop_async()
+    editor.deleteLater()
+    # * deleted now, not in the event loop of the next measure
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    return seconds
+
+
+def main():
+    application()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for line_count in (1_000, 10_000, 100_000, 1_000_000):
+            path = os.path.join(directory, f"source_{line_count}.py")
+            with open(path, "w") as source_file:
+                source_file.write(generate_source(line_count))
+            size = os.path.getsize(path) / (1024 * 1024)
+
+            if line_count <= APPEND_MAX_LINES:
+                append = f"{timed(append_lines, path):8.3f}s"
+            else:
+                append = "       -"
+            bulk = timed(load_bulk, path)
+            streaming = timed(load_streaming, path)
+            virtual_cold = timed(load_virtual_cold, path)
+            virtual = timed(load_virtual, path)
+            remove_index(path)
+
+            print(
+                f"{line_count:>9} lines ({size:7.2f} MiB): "
+                f"appendPlainText {append}, bulk {bulk:8.3f}s, "
+                f"streaming {streaming:8.3f}s, virtual {virtual_cold:8.3f}s "
+                f"({virtual:8.3f}s indexed)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Paint time of `PCodeOverview.PNumberBar` on a 100k line document, against
+the previous `paintEvent` which laid out every visible line number again.
+"""
+from common import application, best_of, generate_source
+
+from PyQt5.QtCore import QRect, Qt
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import QWidget
+
+from editor.code_overview import PCodeOverview
+
+LINE_COUNT = 100_000
+FRAMES = 100
+
+
+class PLegacyNumberBar(PCodeOverview.PNumberBar):
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), self.number_bar_color)
+
+        block = self.editor.firstVisibleBlock()
+
+        while block.isValid():
+            block_number = block.blockNumber()
+            block_top = (
+                self.editor.blockBoundingGeometry(block)
+                .translated(self.editor.contentOffset())
+                .top()
+            )
+
+            if not block.isVisible() or block_top >= event.rect().bottom():
+                break
+
+            if block_number == self.editor.textCursor().blockNumber():
+                self.font.setBold(True)
+                painter.setPen(QColor("#000000"))
+            else:
+                self.font.setBold(False)
+                painter.setPen(QColor("#717171"))
+            painter.setFont(self.font)
+
+            paint_rect = QRect(
+                0, int(block_top), self.width(), self.editor.fontMetrics().height()
+            )
+            painter.drawText(paint_rect, Qt.AlignRight, str(block_number + 1))
+
+            block = block.next()
+
+        painter.end()
+
+        QWidget.paintEvent(self, event)
+
+
+def frame_times(number_bar):
+    def full():
+        for _ in range(FRAMES):
+            number_bar.repaint()
+
+    # * a cursor blink or a one line scroll only exposes a single row
+    row_height = number_bar.editor.fontMetrics().height()
+
+    def row():
+        for _ in range(FRAMES):
+            number_bar.repaint(0, row_height * 10, number_bar.width(), row_height)
+
+    return best_of(full) / FRAMES, best_of(row) / FRAMES
+
+
+def open_editor(line_count=LINE_COUNT):
+    """Return an editor shown on the middle of a ``line_count`` line source."""
+    application()
+
+    editor = PCodeOverview()
+    editor.setPlainText(generate_source(line_count))
+    editor.resize(800, 1000)
+    editor.show()
+    # * middle of the document, the line numbers have six digits
+    editor.verticalScrollBar().setValue(line_count // 2)
+    application().processEvents()
+    return editor
+
+
+def main():
+    editor = open_editor()
+
+    for name, number_bar in (
+        ("previous", PLegacyNumberBar(editor)),
+        ("cached", editor.number_bar),
+    ):
+        number_bar.setGeometry(editor.number_bar.geometry())
+        number_bar.show()
+        number_bar.raise_()
+        full, row = frame_times(number_bar)
+        number_bar.hide()
+        print(
+            f"{name:>8}: full paint {full * 1000:7.3f}ms, "
+            f"single row {row * 1000:7.3f}ms"
+        )
+    # * the background highlighting thread must not outlive the editor
+    editor.highlighter.stop_async()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Cost of the orthogonal edge routes of `PEdgeRouter` on a laid out 10k node
+flowchart: routing every edge once, then dragging single nodes, which only
+routes again the edges of the node and the routes passing near it.
+"""
+import random
+import time
+
+import common  # noqa: F401
+
+from bench_layout import build_scene
+from editor.layout import PLayeredLayout
+
+NODE_COUNT = 10_000
+DRAGS = 200
+
+
+def main():
+    random.seed(0)
+    scene = build_scene(NODE_COUNT)
+    PLayeredLayout().apply(scene)
+    router = scene.router
+    edges = list(scene.edge_store)
+
+    start = time.perf_counter()
+    for edge in edges:
+        router.route(edge)
+    route_all = time.perf_counter() - start
+
+    nodes = list(scene.node_store)
+    store = scene.node_store
+    rerouted, drag = 0, 0.0
+    for _ in range(DRAGS):
+        node = random.choice(nodes)
+        start = time.perf_counter()
+        scene.move_node(node, store.x[node] + router.grid_size, store.y[node])
+        drag += time.perf_counter() - start
+
+        # * what a repaint asks for, found outside of the timing
+        dropped = [edge for edge in edges if edge not in router.routes]
+        rerouted += len(dropped)
+        start = time.perf_counter()
+        for edge in dropped:
+            router.route(edge)
+        drag += time.perf_counter() - start
+    drag /= DRAGS
+
+    print(
+        f"{len(nodes):>6} nodes, {len(edges):>6} edges: "
+        f"route all {route_all * 1000:8.2f}ms"
+    )
+    print(
+        f"  drag one node: {drag * 1000:7.3f}ms, "
+        f"{rerouted / DRAGS:5.1f} edges routed again per drag"
+    )
+
+
+if __name__ == "__main__":
+    main()
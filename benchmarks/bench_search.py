@@ -0,0 +1,88 @@
+"""
+Time to find all the matches of a word in `PCodeOverview` against the size
+of the document, for a `QTextDocument.find` loop and for `find_all`, which
+searches the chunks of its `PSearchIndex` in a background thread. The time
+to build the index on the first search is given apart.
+"""
+import time
+
+from common import application, generate_source
+
+from PyQt5.QtCore import QCoreApplication, QEventLoop
+from PyQt5.QtGui import QTextCursor, QTextDocument
+
+from editor.code_overview import PCodeOverview
+
+WORD = "count"
+# * the find loop is too slow to be measured on the bigger documents
+FIND_LOOP_MAX_LINES = 100_000
+
+
+def find_loop(document, word):
+    count = 0
+    cursor = QTextCursor(document)
+    flags = QTextDocument.FindCaseSensitively
+    while True:
+        cursor = document.find(word, cursor, flags)
+        if cursor.isNull():
+            return count
+        count += 1
+
+
+def wait_for_structure(editor):
+    # * the structure index is built from the event loop, which `find_all` runs
+    while editor.structure is None:
+        QCoreApplication.processEvents()
+
+
+def find_all(editor, word):
+    loop = QEventLoop()
+
+    def on_progress(count, finished):
+        if finished:
+            loop.quit()
+
+    editor.searchProgress.connect(on_progress)
+    editor.find_all(word, case_sensitive=True)
+    loop.exec_()
+    editor.searchProgress.disconnect(on_progress)
+    return len(editor.matches)
+
+
+def main():
+    application()
+    editor = PCodeOverview()
+    editor.highlighter.stop_async()
+    # * only the search is timed
+    editor.highlighter.setDocument(None)
+
+    for line_count in (10_000, 100_000, 1_000_000):
+        # * or the matches of the last document are searched again in the wait
+        editor.clear_search()
+        editor.setPlainText(generate_source(line_count))
+        wait_for_structure(editor)
+
+        if line_count <= FIND_LOOP_MAX_LINES:
+            start = time.perf_counter()
+            find_loop(editor.document(), WORD)
+            loop = f"{time.perf_counter() - start:8.3f}s"
+        else:
+            loop = "       -"
+
+        start = time.perf_counter()
+        editor.search_index()
+        index = time.perf_counter() - start
+        start = time.perf_counter()
+        count = find_all(editor, WORD)
+        search = time.perf_counter() - start
+
+        print(
+            f"{line_count:>9} lines, {count:>6} matches: find loop {loop}, "
+            f"index build {index:8.3f}s, find_all {search:8.3f}s"
+        )
+
+    editor.stop_search()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Insert, region query, nearest item and remove throughput of `PSpatialIndex`
+with 10k, 100k and 1M flowchart nodes spread over the 64,000 x 64,000 scene.
+"""
+import random
+import time
+
+import common  # noqa: F401
+
+from editor.spatial_index import PSpatialIndex
+
+SCENE_SIZE = 64_000
+NODE_WIDTH, NODE_HEIGHT = 120, 40
+# * a 1920 x 1080 viewport at zoom 1
+VIEWPORT = (1920, 1080)
+QUERIES = 1_000
+
+
+def per_second(count, seconds):
+    return count / seconds if seconds else float("inf")
+
+
+def main():
+    random.seed(0)
+
+    for node_count in (10_000, 100_000, 1_000_000):
+        rects = [
+            (
+                random.uniform(0, SCENE_SIZE),
+                random.uniform(0, SCENE_SIZE),
+                NODE_WIDTH,
+                NODE_HEIGHT,
+            )
+            for _ in range(node_count)
+        ]
+        points = [
+            (random.uniform(0, SCENE_SIZE), random.uniform(0, SCENE_SIZE))
+            for _ in range(QUERIES)
+        ]
+
+        index = PSpatialIndex()
+
+        start = time.perf_counter()
+        for node, rect in enumerate(rects):
+            index.insert(node, rect)
+        insert = per_second(node_count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        found = 0
+        for x, y in points:
+            found += len(index.query((x, y, *VIEWPORT)))
+        query = per_second(QUERIES, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for x, y in points:
+            index.nearest(x, y)
+        nearest = per_second(QUERIES, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for node in range(0, node_count, 10):
+            index.remove(node)
+        remove = per_second(node_count // 10, time.perf_counter() - start)
+
+        print(
+            f"{node_count:>9} nodes: insert {insert:10.0f}/s, "
+            f"viewport query {query:8.0f}/s ({found / QUERIES:.0f} nodes), "
+            f"nearest {nearest:8.0f}/s, remove {remove:10.0f}/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Cold start time of `PWindow`, as `main.py` opens it: a new interpreter
+imports the editor, and opens the window which paints its shell and then
+loads the demo program and its flowchart. The imports, the first paint and
+the time until it is interactive are measured by `PStartupTiming` in the new
+process, from its first line, the total from before it is spawned.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import common
+
+RUNS = 5
+PHASES = ("imports", "first_paint", "interactive", "total")
+
+
+def child(spawn_time):
+    """Measure the phases in this process and print them as JSON."""
+    start = time.perf_counter()
+    from PyQt5.QtWidgets import QApplication
+
+    from editor.startup import PStartupTiming
+    from editor.window import PWindow
+
+    imports = time.perf_counter() - start
+    application = QApplication([])
+    window = PWindow()
+    timing = PStartupTiming(window, start)
+
+    def report(times):
+        times.update(imports=imports, total=time.time() - spawn_time)
+        print(json.dumps(times))
+        window.close()
+        application.quit()
+
+    timing.finished.connect(report)
+    application.exec_()
+
+
+def cold_start(runs=RUNS):
+    """Return the best time of each phase over ``runs`` new processes."""
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        filter(None, (common.ROOT, environment.get("PYTHONPATH")))
+    )
+    best = dict.fromkeys(PHASES, float("inf"))
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", repr(time.time())],
+            capture_output=True,
+            check=True,
+            cwd=common.ROOT,
+            env=environment,
+            text=True,
+        ).stdout
+        # * the window may print before the timings
+        times = json.loads(output.strip().splitlines()[-1])
+        for phase in PHASES:
+            best[phase] = min(best[phase], times[phase])
+    return best
+
+
+def main():
+    times = cold_start()
+    print(", ".join(f"{phase} {times[phase] * 1000:8.1f}ms" for phase in PHASES))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(float(sys.argv[2]))
+    else:
+        main()
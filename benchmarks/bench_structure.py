@@ -0,0 +1,65 @@
+"""
+Time to find the bracket matching the one opening a document against its
+size, by tokenizing the lines after it until the depth gets back to 0 and
+with the segment tree of `PStructureIndex`. The document is the generated
+source between a "(" on its first line and a ")" on its last one. The time
+to build the index and to index again the line of a one character edit are
+given apart.
+"""
+import time
+
+from common import best_of, generate_source
+
+from editor.code_overview import PSyntaxHighlighter
+from editor.structure_index import OPEN_BRACKETS, PStructureIndex
+from editor.tokenizer import NORMAL_STATE, PTokenCache
+
+
+def scan_match(tokenize, lines, line, column):
+    """The close bracket of the open one at ``(line, column)``, line by line."""
+    depth = 0
+    state = NORMAL_STATE
+    for number in range(line, len(lines)):
+        text = lines[number]
+        spans, state = tokenize(text, state)
+        for start, length, style in spans:
+            if style != "brace" or (number == line and start < column):
+                continue
+            depth += 1 if text[start] in OPEN_BRACKETS else -1
+            if depth == 0:
+                return number, start
+    return None
+
+
+def main():
+    tokenize = PTokenCache(PSyntaxHighlighter.tokenizer()).tokenize
+
+    for line_count in (10_000, 100_000, 1_000_000):
+        lines = generate_source(line_count).split("\n")
+        lines[0] = "(" + lines[0]
+        lines[-1] += ")"
+
+        start = time.perf_counter()
+        index = PStructureIndex(tokenize)
+        index.set_lines(lines)
+        build = time.perf_counter() - start
+
+        scan = best_of(lambda: scan_match(tokenize, lines, 0, 0))
+        match = best_of(lambda: index.match(0, 0, lines.__getitem__))
+        assert index.match(0, 0, lines.__getitem__) == scan_match(
+            tokenize, lines, 0, 0
+        )
+
+        middle = line_count // 2
+        edited = lines[middle] + " "
+        edit = best_of(lambda: index.replace_lines(middle, 1, [edited]))
+
+        print(
+            f"{line_count:>9} lines: scan {scan * 1000:9.3f}ms, "
+            f"index match {match * 1000:7.3f}ms, "
+            f"index build {build:7.3f}s, one line edit {edit * 1000:7.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
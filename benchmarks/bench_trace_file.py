@@ -0,0 +1,88 @@
+"""
+Size, opening time, resident memory and seek time of a 10 million event
+trace written by `PTraceWriter` and replayed with `PTraceReader`. The
+resident memory of the reader is mostly pages of the mapped file, which the
+OS can drop at any time.
+"""
+import os
+import random
+import resource
+import tempfile
+import time
+
+import common  # noqa: F401
+
+from tracer.events import EVENT_CALL, EVENT_LINE, EVENT_RETURN, EVENT_VARIABLE
+from tracer.trace_file import PTraceReader, PTraceWriter
+
+EVENT_COUNT = 10_000_000
+SEEKS = 1_000
+
+
+def loop_events(iterations):
+    """The events of a loop calling a function, as `PTracer` sends them."""
+    events = [(EVENT_CALL, "<module>", 1)]
+    for index in range(iterations):
+        events += [
+            (EVENT_VARIABLE, "index", ("int", -1, repr(index), 0)),
+            (EVENT_LINE, 5),
+            (EVENT_CALL, "square", 1),
+            (EVENT_LINE, 2),
+            (EVENT_VARIABLE, "result", ("int", -1, repr(index * index), 0)),
+            (EVENT_LINE, 3),
+            (EVENT_RETURN, "square", ("int", -1, repr(index * index), 0)),
+            (EVENT_LINE, 6),
+        ]
+    return events
+
+
+def resident_kb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    random.seed(0)
+    path = os.path.join(tempfile.gettempdir(), "bench_trace_file.trace")
+    batch = loop_events(10_000)
+
+    start = time.perf_counter()
+    writer = PTraceWriter(path)
+    for _ in range(EVENT_COUNT // len(batch)):
+        writer.write(batch)
+    writer.close()
+    write_time = time.perf_counter() - start
+    size = os.path.getsize(path)
+
+    before = resident_kb()
+    start = time.perf_counter()
+    reader = PTraceReader(path)
+    open_time = time.perf_counter() - start
+    opened = resident_kb() - before
+
+    steps = [random.randrange(len(reader)) for _ in range(SEEKS)]
+    start = time.perf_counter()
+    for step in steps:
+        reader.state(step)
+    seek_time = (time.perf_counter() - start) / SEEKS
+    resident = resident_kb() - before
+    reader.close()
+    os.remove(path)
+
+    print(
+        f"{EVENT_COUNT} events, {writer.step_count} steps: "
+        f"{size / 1e6:6.1f}MB ({size / EVENT_COUNT:4.2f} bytes per event), "
+        f"written in {write_time:5.1f}s"
+    )
+    print(
+        f"open {open_time * 1000:6.2f}ms, {opened}kB resident, "
+        f"seek {seek_time * 1000:6.3f}ms, "
+        f"{resident}kB resident after {SEEKS} random seeks"
+    )
+
+
+if __name__ == "__main__":
+    main()
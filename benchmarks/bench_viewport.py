@@ -0,0 +1,100 @@
+"""
+Frame time of `PGraphicsView` on a synthetic 5k node flowchart, for each of
+its `UPDATE_MODES`, with and without the background and node caches: moving
+one node per frame, and panning the view.
+"""
+import time
+
+from common import application
+
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsView
+
+from code_generator.flowchart import NODE_HEIGHT, NODE_SPACING, NODE_WIDTH
+from editor.graph_items import PNodeItem
+from editor.widgets import PGraphicsScene, PGraphicsView, PScene
+
+VIEWPORT_WIDTH, VIEWPORT_HEIGHT = 1920, 1080
+COLUMNS, ROWS = 50, 100
+FRAMES = 60
+# * pixels panned on screen between two frames
+PAN_STEP = 7
+
+NODE_CACHES = (QGraphicsItem.NoCache, QGraphicsItem.DeviceCoordinateCache)
+CacheNone = QGraphicsView.CacheNone
+BACKGROUND_CACHES = (CacheNone, QGraphicsView.CacheBackground)
+
+
+def build_scene(graphic_scene):
+    """Return a scene of ``COLUMNS`` chains of ``ROWS`` nodes."""
+    scene = PScene(graphic_scene)
+    count = COLUMNS * ROWS
+    nodes = scene.add_nodes(
+        [(index // ROWS) * (NODE_WIDTH + NODE_SPACING) for index in range(count)],
+        [(index % ROWS) * (NODE_HEIGHT + NODE_SPACING) for index in range(count)],
+        [float(NODE_WIDTH)] * count,
+        [float(NODE_HEIGHT)] * count,
+        labels=[f"node {index}" for index in range(count)],
+    )
+    chained = [index for index in range(count) if (index + 1) % ROWS]
+    scene.add_edges(
+        [nodes[index] for index in chained], [nodes[index + 1] for index in chained]
+    )
+    return scene, nodes
+
+
+def frame_time(application, function):
+    # * a frame is drawn when the events queued by the change are processed
+    function(0)
+    application.processEvents()
+    start = time.perf_counter()
+    for frame in range(1, FRAMES + 1):
+        function(frame)
+        application.processEvents()
+        application.processEvents()
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    application_ = application()
+
+    for node_cache in NODE_CACHES:
+        PNodeItem.CACHE_MODE = node_cache
+        graphic_scene = PGraphicsScene()
+        scene, nodes = build_scene(graphic_scene)
+
+        for background_cache in BACKGROUND_CACHES:
+            for update_mode in PGraphicsView.UPDATE_MODES:
+                view = PGraphicsView(graphic_scene, update_mode=update_mode)
+                view.setCacheMode(background_cache)
+                view.resize(VIEWPORT_WIDTH, VIEWPORT_HEIGHT)
+                view.centerOn(0, 0)
+                view.show()
+                application_.processEvents()
+
+                # * a node in the middle of the viewport goes back and forth
+                node = nodes[ROWS * 3 + 5]
+                x, y = scene.node_store.x[node], scene.node_store.y[node]
+                move = frame_time(
+                    application_,
+                    lambda frame: scene.move_node(node, x + frame % 2 * 20, y),
+                )
+                scroll_bar = view.horizontalScrollBar()
+                start_value = scroll_bar.value()
+                pan = frame_time(
+                    application_,
+                    lambda frame: scroll_bar.setValue(start_value + frame * PAN_STEP),
+                )
+
+                print(
+                    f"node cache {node_cache != QGraphicsItem.NoCache:d}, "
+                    f"background cache {background_cache != CacheNone:d}, "
+                    f"{update_mode:>8}: move {move * 1000:6.2f}ms, "
+                    f"pan {pan * 1000:6.2f}ms"
+                )
+                view.close()
+                view.deleteLater()
+                application_.processEvents()
+
+
+if __name__ == "__main__":
+    main()
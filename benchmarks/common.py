@@ -0,0 +1,52 @@
+"""
+Helpers shared by the benchmark scripts.
+
+The benchmarks are meant to be run from the repository root, e.g.
+``python benchmarks/bench_highlighter.py``, they default to the offscreen
+Qt platform so that they also work on a machine without a display.
+``python benchmarks/suite.py`` runs the main ones and writes their results
+as JSON.
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DEMO_FILE = os.path.join(ROOT, "demo_python_pgm.txt")
+
+_application = None
+
+
+def application():
+    """Return the `QApplication`, creating it on the first call."""
+    global _application
+    from PyQt5.QtWidgets import QApplication
+
+    _application = QApplication.instance() or QApplication([])
+    return _application
+
+
+def generate_source(line_count):
+    """Return python source of ``line_count`` lines built from the demo program."""
+    with open(DEMO_FILE, "r") as demofile:
+        demo_lines = demofile.read().splitlines()
+
+    lines = []
+    while len(lines) < line_count:
+        lines.extend(demo_lines)
+    return "\n".join(lines[:line_count])
+
+
+def best_of(function, repeat=3):
+    """Return the best wall clock time of ``repeat`` calls of ``function``."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
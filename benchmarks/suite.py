@@ -0,0 +1,198 @@
+"""
+Runs the benchmarks of the editor and canvas hot paths headless and writes
+their results as JSON, to compare two commits:
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --output after.json --compare before.json
+
+Each result is ``{"value": ..., "unit": ...}``, times are in seconds. With
+``--compare`` the results more than ``--threshold`` worse than the baseline
+are listed, and the exit code is 1 when there is any.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+import common
+from common import application, generate_source
+
+from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtWidgets import QApplication
+
+from bench_grid import frame_time
+from bench_highlighter import blocks_per_second
+from bench_load import (
+    load_bulk,
+    load_streaming,
+    load_virtual,
+    load_virtual_cold,
+    remove_index,
+    timed,
+)
+from bench_number_bar import frame_times, open_editor
+from bench_startup import PHASES, cold_start
+from editor.code_overview import PSyntaxHighlighter
+from editor.widgets import PGraphicsScene
+
+HIGHLIGHTER_LINES = (1_000, 10_000, 100_000)
+LOAD_LINES = (10_000, 100_000, 1_000_000)
+GRID_SIZES = (10, 20, 50)
+# * the zoom levels of `PGraphicsView`, from 0 to 10 with a 1.25 factor
+GRID_SCALES = [1.25 ** (zoom - 10) for zoom in range(0, 11, 2)]
+# * units where a bigger value is better
+HIGHER_IS_BETTER = {"blocks/s"}
+THRESHOLD = 0.1
+# * runs of the measures which are not already the best of a few
+REPEAT = 3
+
+
+def bench_highlighter(results):
+    for line_count in HIGHLIGHTER_LINES:
+        document = QTextDocument()
+        document.setPlainText(generate_source(line_count))
+        # * "uncached" highlights with a token cache that keeps no line
+        for name, warm_cache in (("uncached", False), ("warm_cache", True)):
+            results[f"highlighter.{name}.{line_count}_lines"] = {
+                "value": blocks_per_second(PSyntaxHighlighter, document, warm_cache),
+                "unit": "blocks/s",
+            }
+
+
+def bench_number_bar(results):
+    editor = open_editor()
+    full, row = frame_times(editor.number_bar)
+    results["number_bar.full_paint"] = {"value": full, "unit": "s"}
+    results["number_bar.single_row"] = {"value": row, "unit": "s"}
+    editor.highlighter.stop_async()
+    editor.deleteLater()
+
+
+def bench_grid(results):
+    for grid_size in GRID_SIZES:
+        scene = PGraphicsScene()
+        scene.grid_size = grid_size
+        for scale in GRID_SCALES:
+            results[f"grid.{grid_size}.{scale:.2f}x"] = {
+                "value": min(frame_time(scene, scale) for _ in range(REPEAT)),
+                "unit": "s",
+            }
+
+
+def bench_load(results):
+    with tempfile.TemporaryDirectory() as directory:
+        for line_count in LOAD_LINES:
+            path = os.path.join(directory, f"source_{line_count}.py")
+            with open(path, "w") as source_file:
+                source_file.write(generate_source(line_count))
+            for name, function in (
+                ("bulk", load_bulk),
+                ("streaming", load_streaming),
+                ("virtual_cold", load_virtual_cold),
+                ("virtual", load_virtual),
+            ):
+                results[f"load.{name}.{line_count}_lines"] = {
+                    "value": timed(function, path),
+                    "unit": "s",
+                }
+            remove_index(path)
+
+
+def bench_startup(results):
+    times = cold_start()
+    for phase in PHASES:
+        results[f"startup.{phase}"] = {"value": times[phase], "unit": "s"}
+
+
+BENCHMARKS = {
+    "highlighter": bench_highlighter,
+    "number_bar": bench_number_bar,
+    "grid": bench_grid,
+    "load": bench_load,
+    "startup": bench_startup,
+}
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            cwd=common.ROOT,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+        "platform": platform.platform(),
+        "qt_platform": QApplication.platformName(),
+    }
+
+
+def regressions(results, baseline, threshold):
+    """
+    Return ``(name, baseline value, value)`` of the results worse than the
+    baseline by more than ``threshold``.
+    """
+    worse = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None or old["unit"] != result["unit"] or not old["value"]:
+            continue
+        change = result["value"] / old["value"] - 1
+        if result["unit"] in HIGHER_IS_BETTER:
+            change = -change
+        if change > threshold:
+            worse.append((name, old["value"], result["value"]))
+    return worse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="JSON file to write, stdout by default")
+    parser.add_argument("--compare", help="JSON file of a previous run")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=sorted(BENCHMARKS),
+        help="run only this benchmark, can be repeated",
+    )
+    arguments = parser.parse_args(argv)
+
+    application()
+    results = {}
+    for name in arguments.only or BENCHMARKS:
+        print(f"running {name}", file=sys.stderr)
+        BENCHMARKS[name](results)
+    report = {"environment": environment(), "results": results}
+
+    text = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        worse = regressions(results, baseline, arguments.threshold)
+        for name, old, new in worse:
+            print(f"regression {name}: {old:.6g} -> {new:.6g}", file=sys.stderr)
+        return 1 if worse else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
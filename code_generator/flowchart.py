@@ -0,0 +1,343 @@
+import ast
+
+# * node kinds
+NODE_START = 0
+NODE_END = 1
+NODE_STATEMENT = 2
+NODE_CONDITION = 3
+NODE_LOOP = 4
+NODE_FUNCTION = 5
+NODE_CLASS = 6
+NODE_RETURN = 7
+NODE_BREAK = 8
+NODE_CONTINUE = 9
+NODE_RAISE = 10
+NODE_TRY = 11
+NODE_HANDLER = 12
+
+# * edge kinds
+EDGE_NEXT = 0
+EDGE_TRUE = 1
+EDGE_FALSE = 2
+EDGE_LOOP = 3
+EDGE_BREAK = 4
+EDGE_CONTINUE = 5
+EDGE_BODY = 6
+EDGE_RETURN = 7
+EDGE_EXCEPT = 8
+
+# * size of the nodes before the layout engine places them
+NODE_WIDTH = 160
+NODE_HEIGHT = 40
+NODE_SPACING = 20
+
+# * longest node label, in characters
+LABEL_LENGTH = 40
+
+# * not available before python 3.10 / 3.11
+MATCH_STATEMENTS = (ast.Match,) if hasattr(ast, "Match") else ()
+TRY_STAR_STATEMENTS = (ast.TryStar,) if hasattr(ast, "TryStar") else ()
+
+COMPOUND_STATEMENTS = (
+    ast.If,
+    ast.While,
+    ast.For,
+    ast.AsyncFor,
+    ast.FunctionDef,
+    ast.AsyncFunctionDef,
+    ast.ClassDef,
+    ast.Try,
+    ast.With,
+    ast.AsyncWith,
+    ast.Return,
+    ast.Break,
+    ast.Continue,
+    ast.Raise,
+    *MATCH_STATEMENTS,
+    *TRY_STAR_STATEMENTS,
+)
+
+
+def source_lines(source):
+    """
+    Split ``source`` in the lines `ast` numbers. `str.splitlines` also splits
+    on form feeds and other separators, which would shift the labels.
+    """
+    return source.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+
+class PFlowchart:
+    """
+    Control flow graph of a python source, as node and edge columns ready to
+    be added to a `PScene` in bulk.
+
+    Every node keeps the ``(first, last)`` source line span it came from.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = []
+        self.labels = []
+        self.first_lines = []
+        self.last_lines = []
+
+        self.edge_sources = []
+        self.edge_targets = []
+        self.edge_kinds = []
+
+        # * (node, edge kind) pairs the flow leaves a fragment from
+        self.ends = []
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def add_node(self, kind, label, first_line, last_line):
+        self.kinds.append(kind)
+        self.labels.append(label)
+        self.first_lines.append(first_line)
+        self.last_lines.append(last_line)
+        return len(self.kinds) - 1
+
+    def add_edge(self, source, target, kind=EDGE_NEXT):
+        self.edge_sources.append(source)
+        self.edge_targets.append(target)
+        self.edge_kinds.append(kind)
+
+    def add_to_scene(self, scene, x=0, y=0):
+        """
+        Add the nodes and edges to ``scene`` with two bulk calls, stacked in a
+        column from ``(x, y)`` until they are laid out. Returns the scene ids
+        of the nodes and of the edges, in the order of the flowchart.
+        """
+        count = len(self)
+        step = NODE_HEIGHT + NODE_SPACING
+        nodes = scene.add_nodes(
+            [float(x)] * count,
+            [float(y + index * step) for index in range(count)],
+            [float(NODE_WIDTH)] * count,
+            [float(NODE_HEIGHT)] * count,
+            self.kinds,
+            self.first_lines,
+            self.last_lines,
+            self.labels,
+        )
+
+        # * the scene ids of the nodes are contiguous
+        first = nodes[0] if count else 0
+        edges = scene.add_edges(
+            [first + source for source in self.edge_sources],
+            [first + target for target in self.edge_targets],
+            self.edge_kinds,
+        )
+        return nodes, edges
+
+
+class PFlowchartGenerator:
+    """
+    Builds a `PFlowchart` from python source in a single traversal of its
+    `ast`.
+
+    Consecutive simple statements are merged into one node. If / elif / else,
+    while and for loops (with their else clause), break, continue, return,
+    raise, try, with and match statements get their own nodes. Function and
+    class definitions are nodes of the enclosing flow, their body hangs from
+    them and ends in an end node of its own.
+    """
+
+    def generate(self, source, filename="<source>"):
+        return self.generate_statements(
+            ast.parse(source, filename).body, source_lines(source)
+        )
+
+    def generate_statements(self, statements, lines):
+        """Return the flowchart of a module made of ``statements``."""
+        builder = _PFlowBuilder(lines)
+        last_line = statements[-1].end_lineno if statements else 0
+
+        start = builder.chart.add_node(NODE_START, "start", 1, 1)
+        ends = builder.block(statements, [(start, EDGE_NEXT)])
+        end = builder.chart.add_node(NODE_END, "end", last_line, last_line)
+        builder.connect(ends, end)
+        builder.connect(builder.returns.pop(), end, EDGE_RETURN)
+
+        return builder.chart
+
+    def generate_fragment(self, statements, lines):
+        """
+        Return the flowchart of ``statements`` without start and end nodes.
+        The flow enters it at its first node, and leaves it from `ends`.
+        """
+        builder = _PFlowBuilder(lines)
+        builder.chart.ends = builder.block(statements, [])
+        return builder.chart
+
+
+class _PFlowBuilder:
+    """
+    State of one traversal. ``ends`` lists are the ``(node, edge kind)``
+    pairs whose flow continues into the next statement.
+    """
+
+    def __init__(self, lines) -> None:
+        self.chart = PFlowchart()
+        self.lines = lines
+
+        # * (loop node, breaks) of the enclosing loops
+        self.loops = []
+        # * returns of the enclosing functions, the module one included
+        self.returns = [[]]
+
+    def connect(self, ends, target, kind=None):
+        add_edge = self.chart.add_edge
+        for source, end_kind in ends:
+            add_edge(source, target, end_kind if kind is None else kind)
+
+    def node(self, kind, statement, label=None, last_line=None):
+        first_line = statement.lineno
+        if last_line is None:
+            last_line = statement.end_lineno
+        if label is None:
+            label = self.label(first_line)
+        return self.chart.add_node(kind, label, first_line, last_line)
+
+    def label(self, line_number):
+        text = self.lines[line_number - 1].strip()
+        if len(text) > LABEL_LENGTH:
+            text = text[: LABEL_LENGTH - 1] + "…"
+        return text
+
+    def block(self, statements, ends):
+        """Add a list of statements flowing from ``ends``, return its ends."""
+        simple = []
+
+        for statement in statements:
+            if not isinstance(statement, COMPOUND_STATEMENTS):
+                simple.append(statement)
+                continue
+
+            if simple:
+                ends = self.simple(simple, ends)
+                simple = []
+            ends = self.compound(statement, ends)
+
+        if simple:
+            ends = self.simple(simple, ends)
+        return ends
+
+    def simple(self, statements, ends):
+        first, last = statements[0], statements[-1]
+        node = self.node(NODE_STATEMENT, first, last_line=last.end_lineno)
+        self.connect(ends, node)
+        return [(node, EDGE_NEXT)]
+
+    def compound(self, statement, ends):
+        if isinstance(statement, ast.If):
+            return self.if_statement(statement, ends)
+        if isinstance(statement, (ast.While, ast.For, ast.AsyncFor)):
+            return self.loop(statement, ends)
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return self.definition(statement, ends, NODE_FUNCTION)
+        if isinstance(statement, ast.ClassDef):
+            return self.definition(statement, ends, NODE_CLASS)
+        if isinstance(statement, (ast.With, ast.AsyncWith)):
+            node = self.node(NODE_STATEMENT, statement, last_line=statement.lineno)
+            self.connect(ends, node)
+            return self.block(statement.body, [(node, EDGE_NEXT)])
+        if isinstance(statement, ast.Return):
+            node = self.node(NODE_RETURN, statement)
+            self.connect(ends, node)
+            self.returns[-1].append((node, EDGE_RETURN))
+            return []
+        if isinstance(statement, ast.Break):
+            node = self.node(NODE_BREAK, statement)
+            self.connect(ends, node)
+            if self.loops:
+                self.loops[-1][1].append((node, EDGE_BREAK))
+            return []
+        if isinstance(statement, ast.Continue):
+            node = self.node(NODE_CONTINUE, statement)
+            self.connect(ends, node)
+            if self.loops:
+                self.chart.add_edge(node, self.loops[-1][0], EDGE_CONTINUE)
+            return []
+        if isinstance(statement, ast.Raise):
+            node = self.node(NODE_RAISE, statement)
+            self.connect(ends, node)
+            return []
+        if isinstance(statement, MATCH_STATEMENTS):
+            return self.match(statement, ends)
+        # * try and try / except*
+        return self.try_statement(statement, ends)
+
+    def if_statement(self, statement, ends):
+        last_line = statement.test.end_lineno
+        node = self.node(NODE_CONDITION, statement, last_line=last_line)
+        self.connect(ends, node)
+
+        body_ends = self.block(statement.body, [(node, EDGE_TRUE)])
+        if statement.orelse:
+            # * an elif is an `If` alone in the else branch
+            return body_ends + self.block(statement.orelse, [(node, EDGE_FALSE)])
+        return body_ends + [(node, EDGE_FALSE)]
+
+    def loop(self, statement, ends):
+        header = statement.test if isinstance(statement, ast.While) else statement.iter
+        node = self.node(NODE_LOOP, statement, last_line=header.end_lineno)
+        self.connect(ends, node)
+
+        self.loops.append((node, []))
+        body_ends = self.block(statement.body, [(node, EDGE_TRUE)])
+        _, breaks = self.loops.pop()
+        self.connect(body_ends, node, EDGE_LOOP)
+
+        exits = [(node, EDGE_FALSE)]
+        if statement.orelse:
+            exits = self.block(statement.orelse, exits)
+        return exits + breaks
+
+    def definition(self, statement, ends, kind):
+        # * the header ends where the body starts
+        header_end = max(statement.lineno, statement.body[0].lineno - 1)
+        node = self.node(kind, statement, last_line=header_end)
+        self.connect(ends, node)
+
+        self.returns.append([])
+        loops, self.loops = self.loops, []
+        body_ends = self.block(statement.body, [(node, EDGE_BODY)])
+        self.loops = loops
+
+        label, last_line = "end " + statement.name, statement.end_lineno
+        end = self.chart.add_node(NODE_END, label, last_line, last_line)
+        self.connect(body_ends, end)
+        self.connect(self.returns.pop(), end, EDGE_RETURN)
+
+        return [(node, EDGE_NEXT)]
+
+    def try_statement(self, statement, ends):
+        node = self.node(NODE_TRY, statement, last_line=statement.lineno)
+        self.connect(ends, node)
+
+        body_ends = self.block(statement.body, [(node, EDGE_NEXT)])
+        if statement.orelse:
+            body_ends = self.block(statement.orelse, body_ends)
+
+        for handler in statement.handlers:
+            handler_node = self.node(NODE_HANDLER, handler, last_line=handler.lineno)
+            self.chart.add_edge(node, handler_node, EDGE_EXCEPT)
+            body_ends = body_ends + self.block(
+                handler.body, [(handler_node, EDGE_NEXT)]
+            )
+
+        if statement.finalbody:
+            body_ends = self.block(statement.finalbody, body_ends)
+        return body_ends
+
+    def match(self, statement, ends):
+        node = self.node(
+            NODE_CONDITION, statement, last_line=statement.subject.end_lineno
+        )
+        self.connect(ends, node)
+
+        exits = [(node, EDGE_FALSE)]
+        for case in statement.cases:
+            exits += self.block(case.body, [(node, EDGE_TRUE)])
+        return exits
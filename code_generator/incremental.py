@@ -0,0 +1,399 @@
+import ast
+import bisect
+from collections import OrderedDict
+import time
+
+from code_generator.flowchart import (
+    COMPOUND_STATEMENTS,
+    EDGE_NEXT,
+    NODE_END,
+    NODE_HEIGHT,
+    NODE_START,
+    NODE_WIDTH,
+    PFlowchartGenerator,
+)
+from editor.layout import PLayeredLayout
+
+
+class _PSegment:
+    """Top level statements sharing lines, and their nodes in the scene."""
+
+    __slots__ = (
+        "text",
+        "first_line",
+        "line_count",
+        "simple",
+        "fragment",
+        "nodes",
+        "edges",
+        "xs",
+        "ys",
+        "height",
+        "top",
+    )
+
+    def __init__(self, text, first_line, line_count, simple, fragment) -> None:
+        self.text = text
+        self.first_line = first_line
+        self.line_count = line_count
+        # * only simple statements, merged with simple neighbours into one node
+        self.simple = simple
+        self.fragment = fragment
+        self.nodes = []
+        self.edges = []
+
+        # * layout of the nodes relative to the segment, and where it is placed
+        self.xs = []
+        self.ys = []
+        self.height = 0.0
+        self.top = None
+
+
+class PIncrementalFlowchart:
+    """
+    Keeps the flowchart of a source in a `PScene` up to date while it is
+    edited.
+
+    The source is split in segments, its top level compound statements and
+    the runs of simple statements between them, which make one node. An update
+    compares the new lines with the previous ones and only parses again the
+    segments touched by the changed lines. The flowchart fragment of a
+    segment is cached by its text, and only the nodes and edges of the
+    changed segments, and the edges joining them to their neighbours, are
+    patched in the scene.
+
+    Each segment is laid out on its own with ``layout`` and the segments are
+    stacked from top to bottom, so an edit only lays out the new segments and
+    moves the following ones up or down.
+    """
+
+    def __init__(self, scene, generator=None, cache_size=1024, layout=None) -> None:
+        self.scene = scene
+        self.generator = generator if generator is not None else PFlowchartGenerator()
+        self.layout = layout if layout is not None else PLayeredLayout()
+        self.cache_size = cache_size
+
+        self.lines = []
+        self.segments = []
+        # * segment text -> fragment, least recently used first
+        self._fragments = OrderedDict()
+        # * (left, right) segments -> ids of the edges joining them, None
+        # * stands for the start node on the left and the end node on the right
+        self._joins = {}
+
+        # * the flow runs down x = 0
+        left = -NODE_WIDTH / 2
+        self.start_node = scene.add_node(
+            left, 0.0, NODE_WIDTH, NODE_HEIGHT, NODE_START, 1, 1, "start"
+        )
+        top = NODE_HEIGHT + self.layout.layer_spacing
+        self.end_node = scene.add_node(
+            left, top, NODE_WIDTH, NODE_HEIGHT, NODE_END, 1, 1, "end"
+        )
+        self._joins[(None, None)] = [scene.add_edge(self.start_node, self.end_node)]
+
+        # * what the last update did and how long it took
+        self.statistics = {}
+
+    def update(self, text):
+        """
+        Bring the flowchart up to date with ``text``. Returns False, leaving
+        the flowchart as it was, when the source does not parse.
+        """
+        start_time = time.perf_counter()
+        lines = text.split("\n")
+        old_lines = self.lines
+
+        # * the unchanged lines at the start and at the end of the source
+        limit = min(len(old_lines), len(lines))
+        prefix = 0
+        while prefix < limit and old_lines[prefix] == lines[prefix]:
+            prefix += 1
+        if prefix == len(old_lines) == len(lines):
+            return True
+        suffix = 0
+        while (
+            suffix < limit - prefix
+            and old_lines[-1 - suffix] == lines[-1 - suffix]
+        ):
+            suffix += 1
+
+        # * the changed lines and their neighbours, which may join them
+        change_start = max(prefix - 1, 0)
+        change_end = min(len(old_lines) - suffix + 1, len(old_lines))
+        first, last = self._overlapping_segments(change_start, change_end)
+        # * simple statements of the region may merge with a simple neighbour
+        if first > 0 and self.segments[first - 1].simple:
+            first -= 1
+        if last < len(self.segments) and self.segments[last].simple:
+            last += 1
+
+        region_start, region_end = change_start, change_end
+        if first < last:
+            region_start = min(region_start, self.segments[first].first_line - 1)
+            last_segment = self.segments[last - 1]
+            region_end = max(
+                region_end, last_segment.first_line - 1 + last_segment.line_count
+            )
+        delta = len(lines) - len(old_lines)
+
+        full_parse = False
+        groups = self._parse(lines, region_start, region_end + delta)
+        if groups is None:
+            # * the edit changed the structure around the region
+            full_parse = True
+            first, last = 0, len(self.segments)
+            region_start, region_end = 0, len(old_lines)
+            groups = self._parse(lines, 0, len(lines))
+            if groups is None:
+                return False
+
+        count, removed = self._replace(
+            first, last, groups, region_start, lines, delta
+        )
+        added, moved = self._stack()
+        for left, right in self._boundaries(first, first + count):
+            self._join(left, right)
+        self.lines = lines
+
+        last_line = max(len(lines), 1)
+        self.scene.set_lines(self.end_node, last_line, last_line)
+
+        self.statistics = {
+            "seconds": time.perf_counter() - start_time,
+            "full_parse": full_parse,
+            "parsed_lines": region_end + delta - region_start,
+            "segments": len(self.segments),
+            "nodes_added": added,
+            "nodes_removed": removed,
+            "nodes_moved": moved,
+        }
+        return True
+
+    def _overlapping_segments(self, start, end):
+        """Return the index range of the segments overlapping lines [start, end)."""
+        starts = [segment.first_line - 1 for segment in self.segments]
+        first = bisect.bisect_right(starts, start) - 1
+        if first < 0 or starts[first] + self.segments[first].line_count <= start:
+            first += 1
+        last = bisect.bisect_left(starts, end)
+        return first, max(first, last)
+
+    def _parse(self, lines, start, end):
+        """
+        Parse lines [start, end) and return their top level statements in
+        segments, as (first line, last line, simple, statements), or None on a
+        syntax error. Segment lines are absolute, the line numbers in the
+        statements are relative to ``start``.
+        """
+        try:
+            statements = ast.parse("\n".join(lines[start:end])).body
+        except (SyntaxError, ValueError):
+            return None
+
+        groups = []
+        for statement in statements:
+            decorators = getattr(statement, "decorator_list", None)
+            first_line = decorators[0].lineno if decorators else statement.lineno
+            first_line += start
+            last_line = statement.end_lineno + start
+            simple = not isinstance(statement, COMPOUND_STATEMENTS)
+
+            if groups and (
+                first_line <= groups[-1][1] or (simple and groups[-1][2])
+            ):
+                groups[-1][1] = max(groups[-1][1], last_line)
+                groups[-1][2] = groups[-1][2] and simple
+                groups[-1][3].append(statement)
+            else:
+                groups.append([first_line, last_line, simple, [statement]])
+        return groups
+
+    def _replace(self, first, last, groups, groups_start, lines, delta):
+        """
+        Replace the segments [first, last) by the ``groups`` of statements
+        parsed from ``groups_start`` and shift the following segments by
+        ``delta`` lines. The nodes of the new segments are added to the scene
+        when they are stacked. Returns the number of segments replacing the old
+        ones and the number of nodes removed.
+        """
+        scene = self.scene
+        segments = self.segments
+        old_segments = segments[first:last]
+
+        # * drop the edges joining the replaced segments to their neighbours
+        for left, right in self._boundaries(first, last):
+            for edge in self._joins.pop((left, right), ()):
+                scene.remove_edge(edge)
+
+        # * unchanged segments of the region keep their nodes
+        reusable = {}
+        for segment in old_segments:
+            reusable.setdefault(segment.text, []).append(segment)
+
+        new_segments = []
+        for first_line, last_line, simple, statements in groups:
+            segment_lines = lines[first_line - 1 : last_line]
+            text = "\n".join(segment_lines)
+
+            candidates = reusable.get(text)
+            if candidates:
+                segment = candidates.pop()
+                self._shift(segment, first_line - segment.first_line)
+            else:
+                segment = _PSegment(
+                    text,
+                    first_line,
+                    len(segment_lines),
+                    simple,
+                    self._fragment(
+                        text, statements, segment_lines, first_line - groups_start
+                    ),
+                )
+                self._arrange(segment)
+            new_segments.append(segment)
+
+        removed = 0
+        for candidates in reusable.values():
+            for segment in candidates:
+                removed += len(segment.nodes)
+                for node in segment.nodes:
+                    scene.remove_node(node)
+
+        if delta:
+            for segment in segments[last:]:
+                self._shift(segment, delta)
+
+        segments[first:last] = new_segments
+        return len(new_segments), removed
+
+    def _boundaries(self, first, last):
+        """Yield the (left, right) pairs around the segments [first, last)."""
+        segments = self.segments
+        for index in range(first, last + 1):
+            left = segments[index - 1] if index > 0 else None
+            right = segments[index] if index < len(segments) else None
+            yield left, right
+
+    def _fragment(self, text, statements, segment_lines, first_line):
+        """Return the cached fragment of a segment starting at ``first_line``."""
+        fragment = self._fragments.get(text)
+        if fragment is not None:
+            self._fragments.move_to_end(text)
+            return fragment
+
+        # * fragments are cached with lines relative to the segment
+        for statement in statements:
+            ast.increment_lineno(statement, 1 - first_line)
+        fragment = self.generator.generate_fragment(statements, segment_lines)
+
+        self._fragments[text] = fragment
+        if len(self._fragments) > self.cache_size:
+            self._fragments.popitem(last=False)
+        return fragment
+
+    def _arrange(self, segment):
+        """Lay out the fragment of a new segment, before it is in the scene."""
+        fragment = segment.fragment
+        count = len(fragment)
+        xs, ys = self.layout.arrange(
+            list(zip(fragment.first_lines, range(count))),
+            fragment.edge_sources,
+            fragment.edge_targets,
+            [float(NODE_WIDTH)] * count,
+            [float(NODE_HEIGHT)] * count,
+        )
+        # * the flow enters the segment at x = 0
+        left = xs[0] + NODE_WIDTH / 2
+        segment.xs = [x - left for x in xs]
+        segment.ys = ys
+        segment.height = max(ys) + NODE_HEIGHT
+
+    def _add_to_scene(self, segment):
+        # * added in place, their edges are only routed once
+        fragment = segment.fragment
+        count = len(fragment)
+        offset = segment.first_line - 1
+        first_lines = [line + offset for line in fragment.first_lines]
+
+        nodes = self.scene.add_nodes(
+            segment.xs,
+            [y + segment.top for y in segment.ys],
+            [float(NODE_WIDTH)] * count,
+            [float(NODE_HEIGHT)] * count,
+            fragment.kinds,
+            first_lines,
+            [line + offset for line in fragment.last_lines],
+            fragment.labels,
+        )
+        segment.nodes = list(nodes)
+        segment.edges = list(
+            self.scene.add_edges(
+                [segment.nodes[source] for source in fragment.edge_sources],
+                [segment.nodes[target] for target in fragment.edge_targets],
+                fragment.edge_kinds,
+            )
+        )
+
+    def _stack(self):
+        """
+        Place the segments one below the other, the new segments are added to
+        the scene and only the segments whose top changed are moved. Returns
+        the number of nodes added and moved.
+        """
+        spacing = self.layout.layer_spacing
+        nodes, xs, ys = [], [], []
+        new_segments = []
+
+        top = NODE_HEIGHT + spacing
+        for segment in self.segments:
+            if not segment.nodes:
+                segment.top = top
+                new_segments.append(segment)
+            elif segment.top != top:
+                segment.top = top
+                nodes += segment.nodes
+                xs += segment.xs
+                ys += [y + top for y in segment.ys]
+            top += segment.height + spacing
+
+        if self.scene.node_store.y[self.end_node] != top:
+            nodes.append(self.end_node)
+            xs.append(-NODE_WIDTH / 2)
+            ys.append(top)
+
+        if nodes:
+            self.scene.move_nodes(nodes, xs, ys)
+
+        # * added once the others are in place
+        added = 0
+        for segment in new_segments:
+            self._add_to_scene(segment)
+            added += len(segment.nodes)
+        return added, len(nodes)
+
+    def _shift(self, segment, delta):
+        if not delta:
+            return
+        segment.first_line += delta
+
+        store = self.scene.node_store
+        for node in segment.nodes:
+            self.scene.set_lines(
+                node, store.first_line[node] + delta, store.last_line[node] + delta
+            )
+
+    def _join(self, left, right):
+        if left is None:
+            ends = [(self.start_node, EDGE_NEXT)]
+        else:
+            ends = [(left.nodes[node], kind) for node, kind in left.fragment.ends]
+        target = self.end_node if right is None else right.nodes[0]
+
+        self._joins[(left, right)] = list(
+            self.scene.add_edges(
+                [source for source, _ in ends],
+                [target] * len(ends),
+                [kind for _, kind in ends],
+            )
+        )
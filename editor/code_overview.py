@@ -1,25 +1,104 @@
+import bisect
+from collections import deque
+import os
+import time
+
 from PyQt5.QtWidgets import (
     QPlainTextEdit,
+    QScrollBar,
     QTextEdit,
     QWidget,
 )
-from PyQt5.QtCore import QRect, Qt, QRegExp
+from PyQt5.QtCore import (
+    QCoreApplication,
+    QPoint,
+    QPointF,
+    QRect,
+    Qt,
+    QThread,
+    QTimer,
+    pyqtSignal,
+)
 from PyQt5.QtGui import (
     QColor,
     QFont,
     QFontMetricsF,
     QPainter,
+    QStaticText,
     QSyntaxHighlighter,
     QTextFormat,
     QTextCharFormat,
+    QTextCursor,
     QTextDocument,
 )
 
 import globals
+from editor.highlight_worker import PHighlightWorker
+from editor.loader import iter_source, read_source
+from editor.mapped_source import PMappedSource, build_line_index, index_path
+from editor.search_index import PSearchIndex, compile_pattern
+from editor.search_worker import PSearchWorker
+from editor.structure_index import PStructureIndex
+from editor.tokenizer import NORMAL_STATE, PTokenCache, PTokenizer
 
 
 class PCodeOverview(QPlainTextEdit):
+    """
+    Code editor with line numbers.
+
+    Files bigger than `VIRTUAL_SIZE` are shown read only in a virtual mode:
+    the file stays memory mapped in a `PMappedSource` and only the visible
+    lines and `WINDOW_MARGIN` lines around them are in the document. The
+    document is refilled when the view scrolls near its ends, so `first_line`
+    is the line of the file of its first block, highlighted from the lexer
+    state it starts in in the file. The scroll bar of the editor is replaced
+    by one over the whole file.
+
+    `find` and `find_all` search the lines kept in a `PSearchIndex`, built
+    on the first search and then updated by the edits. In the virtual mode
+    they search the lines in the document.
+
+    The brackets and the indentation of the lines are kept in a
+    `PStructureIndex`, built in the background after a load and then
+    updated by the edits. The bracket at the cursor and the one matching it
+    are highlighted, and the lines indented under a line can be folded from
+    the markers of the number bar, which hides their blocks.
+    """
+
+    # * files bigger than this (in bytes) are loaded in chunks
+    STREAM_SIZE = 8 * 1024 * 1024
+    STREAM_CHUNK_SIZE = 256 * 1024
+    # * seconds spent inserting chunks per event loop iteration
+    STREAM_SLICE = 0.02
+    # * files bigger than this are shown in the virtual mode
+    VIRTUAL_SIZE = 256 * 1024 * 1024
+    # * lines kept in the document above and below the visible ones
+    WINDOW_MARGIN = 1000
+    # * time after an edit before the matches of `find_all` are searched
+    # * again, in ms
+    SEARCH_DELAY = 300
+    # * edits of more characters than this drop the search index, the next
+    # * search builds it again
+    SEARCH_INDEX_EDIT_SIZE = 64 * 1024
+    # * matches of `find_all` highlighted at most, in the visible lines
+    MAX_MATCH_SELECTIONS = 1000
+    # * edits of more characters than this build the structure index again
+    STRUCTURE_EDIT_SIZE = 64 * 1024
+
+    fileLoaded = pyqtSignal(str)
+    # * generation, pattern, chunks of the search index
+    searchRequested = pyqtSignal(int, object, object)
+    # * matches found by `find_all` so far, whether it is done
+    searchProgress = pyqtSignal(int, bool)
+    # * lines folded or unfolded, see `folded_regions`
+    foldsChanged = pyqtSignal()
+
     class PNumberBar(QWidget):
+        # * bound of the cached line number texts
+        STATIC_TEXT_CACHE_SIZE = 4096
+        # * room on the left for the fold markers
+        FOLD_MARKER_WIDTH = 12
+
         def __init__(self, editor):
             QWidget.__init__(self, editor)
 
@@ -30,60 +109,123 @@ class PCodeOverview(QPlainTextEdit):
             self.editor.blockCountChanged.connect(self.updateWidth)
             self.editor.updateRequest.connect(self.updateContents)
             self.font = QFont()
+            self.bold_font = QFont(self.font)
+            self.bold_font.setBold(True)
             self.number_bar_color = QColor("#e8e8e8")
+            self.number_color = QColor("#717171")
+            self.current_number_color = QColor("#000000")
+
+            # * pre laid out line numbers, keyed by (line number, bold)
+            self.static_texts = {}
+            # * keyed by whether the lines under the marker are folded
+            self.fold_markers = {}
+            for folded, marker in ((False, "▾"), (True, "▸")):
+                static_text = QStaticText(marker)
+                static_text.setTextFormat(Qt.PlainText)
+                static_text.prepare(font=self.font)
+                self.fold_markers[folded] = static_text
+
+        def staticText(self, number, bold):
+            key = (number, bold)
+            static_text = self.static_texts.get(key)
+            if static_text is None:
+                if len(self.static_texts) >= self.STATIC_TEXT_CACHE_SIZE:
+                    self.static_texts.clear()
+                static_text = QStaticText(str(number))
+                static_text.setTextFormat(Qt.PlainText)
+                static_text.prepare(font=self.bold_font if bold else self.font)
+                self.static_texts[key] = static_text
+            return static_text
 
         def paintEvent(self, event):
             painter = QPainter(self)
-            painter.fillRect(event.rect(), self.number_bar_color)
+            rect = event.rect()
+            painter.fillRect(rect, self.number_bar_color)
 
-            block = self.editor.firstVisibleBlock()
+            editor = self.editor
+            block = editor.firstVisibleBlock()
+            current_block_number = editor.textCursor().blockNumber() + editor.first_line
+            width = self.width()
 
-            # Iterate over all visible text blocks in the document.
-            while block.isValid():
-                block_number = block.blockNumber()
-                block_top = (
-                    self.editor.blockBoundingGeometry(block)
-                    .translated(self.editor.contentOffset())
-                    .top()
-                )
+            # * with no line wrapping every block is one line high, so the top
+            # * of the first block is enough to place all the visible ones
+            block_top = (
+                editor.blockBoundingGeometry(block)
+                .translated(editor.contentOffset())
+                .top()
+            )
+            line_height = editor.blockBoundingRect(block).height()
 
-                # Check if the position of the block is out side of the visible area.
-                if not block.isVisible() or block_top >= event.rect().bottom():
-                    break
+            current_line = None
+            painter.setFont(self.font)
+            painter.setPen(self.number_color)
+            structure = editor.structure
 
-                # We want the line number for the selected line to be bold.
-                if block_number == self.editor.textCursor().blockNumber():
-                    self.font.setBold(True)
-                    painter.setPen(QColor("#000000"))
-                else:
-                    self.font.setBold(False)
-                    painter.setPen(QColor("#717171"))
-                painter.setFont(self.font)
+            # Iterate over the visible text blocks inside the painted area.
+            while block.isValid() and block_top <= rect.bottom():
+                if not block.isVisible():
+                    block = block.next()
+                    continue
 
-                # Draw the line number right justified at the position of the line.
-                paint_rect = QRect(
-                    0, block_top, self.width(), self.editor.fontMetrics().height()
-                )
-                painter.drawText(paint_rect, Qt.AlignRight, str(block_number + 1))
+                if block_top + line_height >= rect.top():
+                    if structure is not None:
+                        self.drawFoldMarker(painter, block.blockNumber(), block_top)
+                    block_number = block.blockNumber() + editor.first_line
+                    # We want the line number for the selected line to be bold.
+                    if block_number == current_block_number:
+                        current_line = (block_number, block_top)
+                    else:
+                        static_text = self.staticText(block_number + 1, False)
+                        painter.drawStaticText(
+                            QPointF(width - static_text.size().width(), block_top),
+                            static_text,
+                        )
 
+                block_top += line_height
                 block = block.next()
 
+            if current_line is not None:
+                block_number, block_top = current_line
+                static_text = self.staticText(block_number + 1, True)
+                painter.setFont(self.bold_font)
+                painter.setPen(self.current_number_color)
+                painter.drawStaticText(
+                    QPointF(width - static_text.size().width(), block_top),
+                    static_text,
+                )
+
             painter.end()
 
             QWidget.paintEvent(self, event)
 
+        def drawFoldMarker(self, painter, line, top):
+            editor = self.editor
+            folded = line in editor.folds
+            if folded or editor.structure.is_fold_header(line):
+                painter.drawStaticText(QPointF(0, top), self.fold_markers[folded])
+
         def getWidth(self):
-            count = self.editor.blockCount()
-            width = self.fontMetrics().width(str(count))
+            count = self.editor.line_count()
+            width = self.fontMetrics().width(str(count)) + self.FOLD_MARKER_WIDTH
             return width
 
+        def mousePressEvent(self, event):
+            editor = self.editor
+            if event.x() >= self.FOLD_MARKER_WIDTH or editor.structure is None:
+                return
+            line = editor.cursorForPosition(QPoint(0, event.y())).blockNumber()
+            if line in editor.folds or editor.structure.is_fold_header(line):
+                editor.toggle_fold(editor.first_line + line)
+
         def updateWidth(self):
             width = self.getWidth()
             # * adding initial spacing to the line numbers (on the left side)
             width += 6
             if self.width() != width:
                 self.setFixedWidth(width)
-                self.editor.setViewportMargins(width, 0, 0, 0)
+                margins = self.editor.viewportMargins()
+                margins.setLeft(width)
+                self.editor.setViewportMargins(margins)
 
         def updateContents(self, rect, scroll):
             if scroll:
@@ -93,8 +235,12 @@ class PCodeOverview(QPlainTextEdit):
 
             if rect.contains(self.editor.viewport().rect()):
                 font_size = self.editor.currentCharFormat().font().pointSize()
-                self.font.setPointSize(font_size)
-                self.font.setStyle(QFont.StyleNormal)
+                if font_size != self.font.pointSize():
+                    self.font.setPointSize(font_size)
+                    self.font.setStyle(QFont.StyleNormal)
+                    self.bold_font = QFont(self.font)
+                    self.bold_font.setBold(True)
+                    self.static_texts.clear()
                 self.updateWidth()
 
     def __init__(
@@ -104,7 +250,7 @@ class PCodeOverview(QPlainTextEdit):
         super(PCodeOverview, self).__init__()
 
         # * setting font of the editor
-        self.setFont((QFont(globals.DEFAULT_FONT_BOLD, 10)))
+        self.setFont(globals.font(globals.DEFAULT_FONT_BOLD, 10))
         self.setLineWrapMode(QPlainTextEdit.NoWrap)
 
         # * setting Tab space to "4 spaces"
@@ -113,25 +259,377 @@ class PCodeOverview(QPlainTextEdit):
         # * Make the editor read only
         self.setReadOnly(False)
 
+        # * virtual mode, the lines [first_line, _window_end) of `source` are
+        # * in the document
+        self.source = None
+        self.first_line = 0
+        self._window_end = 0
+        # * lexer states at the start of some lines of `source`, sorted by
+        # * line, see `_line_state`
+        self._state_lines = []
+        self._states = []
+        self._index_steps = None
+        self._index_timer = QTimer(self)
+        self._index_timer.setSingleShot(True)
+        self._index_timer.timeout.connect(self._index_next_chunks)
+        self._filling = False
+        self.file_scroll_bar = QScrollBar(Qt.Vertical, self)
+        self.file_scroll_bar.hide()
+        self.file_scroll_bar.valueChanged.connect(self.scroll_to_line)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+
         self.number_bar = self.PNumberBar(self)
 
         self.current_line_number = None
         self.currentLineColor = self.palette().alternateBase()
+        self._current_line_selection = None
+
+        # * line run by the traced script
+        self.trace_line_number = None
+        self.traceLineColor = QColor("#FFE8A3")
         self.cursorPositionChanged.connect(self.highligtCurrentLine)
-        self.debug_text()
 
         # if syntax_highlighter is not None:  # add highlighter to textdocument
-        self.highlighter = PSyntaxHighlighter(self.document())
+        # * large documents are highlighted in the background, viewport first
+        self.highlighter = PSyntaxHighlighter(self.document(), asynchronous=True)
+        self.verticalScrollBar().valueChanged.connect(self.prioritize_visible_lines)
+
+        # * find and find all, the matches are (line, column, length)
+        self.matchColor = QColor("#C5E1A5")
+        self.matches = []
+        self.search_truncated = False
+        self._search_index = None
+        self._search_pattern = None
+        self._search_generation = 0
+        self._search_thread = None
+        self._search_worker = None
+        self._match_selections = []
+        self._match_lines = None
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.SEARCH_DELAY)
+        self._search_timer.timeout.connect(self._search_all)
+        self.document().contentsChange.connect(self._update_search_index)
+        self.updateRequest.connect(self._update_match_selections)
 
-    def debug_text(self):
+        # * bracket matching and folding, `structure` is None until it is built
+        self.structure = None
+        self.bracketColor = QColor("#B4D7FF")
+        self.unmatchedBracketColor = QColor("#FFB4B4")
+        self._bracket_selections = []
+        self._structure_steps = None
+        self._structure_block_count = self.blockCount()
+        self._structure_timer = QTimer(self)
+        self._structure_timer.setSingleShot(True)
+        self._structure_timer.timeout.connect(self._index_next_structure)
+        self.document().contentsChange.connect(self._update_structure)
+        self.cursorPositionChanged.connect(self._on_cursor_moved)
+        # * folds, the line the folded lines hang on -> the last of them, as
+        # * lines of the document
+        self.folds = {}
+
+        # * streaming file loading
+        self.file_path = None
+        self._stream = None
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setSingleShot(True)
+        self._stream_timer.timeout.connect(self._load_next_chunks)
+
+    def load_file(self, path, streaming=None, virtual=None):
         """
-        adds a simple python script to the editor
+        Replace the content of the editor with the file at ``path``.
+
+        The file is inserted as one document operation with the highlighter
+        detached. Files bigger than `STREAM_SIZE` (or any file when
+        ``streaming`` is True) are appended in chunks from the event loop, so
+        the UI stays responsive while they load. Files bigger than
+        `VIRTUAL_SIZE` (or any file when ``virtual`` is True) are shown in the
+        virtual mode, once the offsets of their lines are indexed, from the
+        event loop as well unless the index of a previous load is still
+        valid. `fileLoaded` is emitted once the file is in the editor.
         """
-        demofile = open("demo_python_pgm.txt", "r")
-        for line in demofile.readlines():
-            self.appendPlainText(line.removesuffix("\n"))
+        self._stream = None
+        self._index_steps = None
+        self._close_source()
+        self.highlighter.setDocument(None)
+
+        size = os.path.getsize(path)
+        if virtual is None:
+            virtual = size > self.VIRTUAL_SIZE
+        if virtual:
+            self.setReadOnly(True)
+            self.clear()
+            index_file_path = index_path(path)
+            if PMappedSource.is_index_valid(path, index_file_path):
+                self._open_source(path, index_file_path)
+            else:
+                steps = build_line_index(path, index_file_path)
+                self._index_steps = (path, index_file_path, steps)
+                self._index_timer.start(0)
+            return
+        self.setReadOnly(False)
+
+        if streaming is None:
+            streaming = size > self.STREAM_SIZE
+
+        if not streaming:
+            self.setPlainText(read_source(path))
+            self._finish_loading(path)
+            return
+
+        self.document().setUndoRedoEnabled(False)
+        self.clear()
+        self._stream = (path, iter_source(path, self.STREAM_CHUNK_SIZE))
+        self._stream_timer.start(0)
+
+    def _load_next_chunks(self):
+        if self._stream is None:
+            return
+        path, chunks = self._stream
+        deadline = time.perf_counter() + self.STREAM_SLICE
+
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for chunk in chunks:
+            cursor.insertText(chunk)
+            if time.perf_counter() > deadline:
+                cursor.endEditBlock()
+                self._stream_timer.start(0)
+                return
+        cursor.endEditBlock()
+
+        self._stream = None
+        self.document().setUndoRedoEnabled(True)
+        self._finish_loading(path)
 
-        # self.setPlainText(str(*demofile.readlines()))
+    def _index_next_chunks(self):
+        if self._index_steps is None:
+            return
+        path, index_file_path, steps = self._index_steps
+        deadline = time.perf_counter() + self.STREAM_SLICE
+        for _ in steps:
+            if time.perf_counter() > deadline:
+                self._index_timer.start(0)
+                return
+
+        self._index_steps = None
+        self._open_source(path, index_file_path)
+
+    def _open_source(self, path, index_file_path):
+        self.source = PMappedSource(path, index_file_path)
+        self._state_lines, self._states = [0], [NORMAL_STATE]
+        self.document().setUndoRedoEnabled(False)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        margins = self.viewportMargins()
+        margins.setRight(self.file_scroll_bar.sizeHint().width())
+        self.setViewportMargins(margins)
+        self.file_scroll_bar.show()
+        self._fill_window(0)
+        self._update_file_scroll_bar()
+        self.number_bar.updateWidth()
+        self._finish_loading(path)
+
+    def _close_source(self):
+        if self.source is None:
+            return
+        self.source.close()
+        self.source = None
+        self.first_line = self._window_end = 0
+        self._state_lines, self._states = [], []
+        self.highlighter.start_state = NORMAL_STATE
+        self.file_scroll_bar.hide()
+        margins = self.viewportMargins()
+        margins.setRight(0)
+        self.setViewportMargins(margins)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.document().setUndoRedoEnabled(True)
+
+    def is_loading(self):
+        """Whether a file is still being streamed or indexed."""
+        return self._stream is not None or self._index_steps is not None
+
+    def is_virtual(self):
+        """Whether only a window of the file is in the document."""
+        return self.source is not None
+
+    def line_count(self):
+        """Number of lines of the file, not only of the document."""
+        if self.source is not None:
+            return self.source.line_count
+        return self.blockCount()
+
+    def visible_line_count(self):
+        line_spacing = self.fontMetrics().lineSpacing()
+        return max(self.viewport().height() // line_spacing, 1)
+
+    def scroll_to_line(self, line):
+        """Scroll the (0 based) ``line`` of the file to the top of the view."""
+        if self.source is None:
+            self.verticalScrollBar().setValue(line)
+            return
+        if not (
+            self.first_line <= line
+            and line + self.visible_line_count() <= self._window_end
+        ):
+            self._fill_window(line)
+        self.verticalScrollBar().setValue(line - self.first_line)
+
+    def _on_scrolled(self, value):
+        if self.source is None or self._filling:
+            return
+        line = self.first_line + value
+        # * refilled before the view reaches an end of the window
+        margin = self.WINDOW_MARGIN // 2
+        if (self.first_line > 0 and line - self.first_line < margin) or (
+            self._window_end < self.source.line_count
+            and self._window_end - line - self.visible_line_count() < margin
+        ):
+            self._fill_window(line)
+        self.file_scroll_bar.blockSignals(True)
+        self.file_scroll_bar.setValue(line)
+        self.file_scroll_bar.blockSignals(False)
+
+    def _fill_window(self, top_line):
+        """
+        Put the lines around ``top_line`` in the document, the cursor stays.
+
+        The first block is highlighted from the lexer state its line starts in
+        in the file. The search and structure indexes are not built again,
+        `_move_indexes` moves them to the new window.
+        """
+        cursor_line = self.first_line + self.textCursor().blockNumber()
+        first = max(top_line - self.WINDOW_MARGIN, 0)
+        last = min(
+            top_line + self.visible_line_count() + self.WINDOW_MARGIN,
+            self.source.line_count,
+        )
+        old_first, old_end = self.first_line, self._window_end
+
+        self._filling = True
+        self.highlighter.setDocument(None)
+        self.highlighter.start_state = self._line_state(first)
+        self.first_line, self._window_end = first, last
+        self.setPlainText(self.source.text(first, last))
+        self.highlighter.setDocument(self.document())
+        self._move_indexes(old_first, old_end)
+
+        if not first <= cursor_line < last:
+            cursor_line = min(max(top_line, first), last - 1)
+        self.current_line_number = None
+        self.setTextCursor(
+            QTextCursor(self.document().findBlockByNumber(cursor_line - first))
+        )
+        self.verticalScrollBar().setValue(top_line - first)
+        self._filling = False
+        self.highligtCurrentLine()
+
+    def _line_state(self, line):
+        """
+        Return the lexer state at the start of the (0 based) ``line`` of
+        `source`, from the closest line before it whose state is cached. Only
+        the lines with a triple quote can change the state, so only they are
+        read and tokenized, and the state of ``line`` is cached in turn.
+        """
+        index = bisect.bisect_right(self._state_lines, line) - 1
+        known, state = self._state_lines[index], self._states[index]
+        if known == line:
+            return state
+
+        source = self.source
+        tokenize = self.highlighter.token_cache.tokenize
+        for number in source.lines_containing(("'''", '"""'), known, line):
+            _, state = tokenize(source.text(number, number + 1), state)
+        self._state_lines.insert(index + 1, line)
+        self._states.insert(index + 1, state)
+        return state
+
+    def _move_indexes(self, old_first, old_end):
+        """
+        Move the search and structure indexes from the lines ``[old_first,
+        old_end)`` of `source` to the ones of the window: the lines that left
+        it are removed and the ones that entered it are added. They are built
+        again when the two windows do not overlap.
+        """
+        first, last = self.first_line, self._window_end
+        self._structure_block_count = self.blockCount()
+        if self.folds:
+            # * the blocks were replaced, none of them is hidden anymore
+            self.folds = {}
+            self.foldsChanged.emit()
+
+        edits = None
+        if max(first, old_first) < min(last, old_end):
+            text = self.source.text
+            edits = []
+            if last < old_end:
+                edits.append((last - old_first, old_end - last, []))
+            elif last > old_end:
+                lines = text(old_end, last).split("\n")
+                edits.append((old_end - old_first, 0, lines))
+            if first > old_first:
+                edits.append((0, first - old_first, []))
+            elif first < old_first:
+                # * with the first line, so the lines after it are tokenized
+                # * again while the state they start in changed
+                edits.append((0, 1, text(first, old_first + 1).split("\n")))
+
+        index = self._search_index
+        if index is not None:
+            for start, count, lines in edits or ():
+                index.replace_lines(start, count, lines)
+            if edits is None or index.line_count != self.blockCount():
+                self._search_index = None
+        if self._search_pattern is not None:
+            self._search_timer.start()
+
+        structure = self.structure
+        if edits is None or structure is None or self._structure_steps is not None:
+            self._build_structure()
+            return
+        # * from the event loop as the builds, after the highlighter, so the
+        # * lines are tokenized from its token cache
+        self.structure = None
+        self._structure_steps = (structure, self._move_structure(structure, edits))
+        self._structure_timer.start(0)
+
+    def _move_structure(self, structure, edits):
+        """Apply ``edits`` to ``structure``, a generator yielding after each."""
+        structure.start_state = self.highlighter.start_state
+        for start, count, lines in edits:
+            # * the edits of the first lines come last, once the index has the
+            # * lines of the document after them
+            following = ()
+            if not start:
+                block = self.document().findBlockByNumber(len(lines))
+                following = _block_texts(block)
+            structure.replace_lines(start, count, lines, following)
+            yield
+
+    def _update_file_scroll_bar(self):
+        viewport = self.viewport().geometry()
+        self.file_scroll_bar.setGeometry(
+            viewport.right() + 1,
+            viewport.top(),
+            self.file_scroll_bar.sizeHint().width(),
+            viewport.height(),
+        )
+        visible_line_count = self.visible_line_count()
+        self.file_scroll_bar.setRange(
+            0, max(self.source.line_count - visible_line_count, 0)
+        )
+        self.file_scroll_bar.setPageStep(visible_line_count)
+
+    def _finish_loading(self, path):
+        self.file_path = path
+        self.moveCursor(QTextCursor.Start)
+        self.highlighter.setDocument(self.document())
+        if self.structure is None and self._structure_steps is None:
+            self._build_structure()
+        self.fileLoaded.emit(path)
+
+    def prioritize_visible_lines(self):
+        self.highlighter.prioritize(self.firstVisibleBlock().blockNumber())
 
     def resizeEvent(self, *e):
         # if self.DISPLAY_LINE_NUMBERS:  # resize number_bar widget
@@ -141,6 +639,13 @@ class PCodeOverview(QPlainTextEdit):
 
         QPlainTextEdit.resizeEvent(self, *e)
 
+        if self.source is not None:
+            self._update_file_scroll_bar()
+
+    def paintEvent(self, event):
+        # * a Python override, so that `PInstrumentation` can time it
+        super().paintEvent(event)
+
     def highligtCurrentLine(self):
         new_current_line_number = self.textCursor().blockNumber()
         if new_current_line_number != self.current_line_number:
@@ -150,7 +655,499 @@ class PCodeOverview(QPlainTextEdit):
             hi_selection.format.setProperty(QTextFormat.FullWidthSelection, True)
             hi_selection.cursor = self.textCursor()
             hi_selection.cursor.clearSelection()
-            self.setExtraSelections([hi_selection])
+            self._current_line_selection = hi_selection
+            self._update_extra_selections()
+
+    def show_lines(self, first_line, last_line):
+        """Put the cursor on the (1 based) ``first_line`` and scroll to the lines."""
+        if self.source is not None and not (
+            self.first_line < first_line and last_line <= self._window_end
+        ):
+            self._fill_window(first_line - 1)
+        document = self.document()
+        last_block = document.findBlockByNumber(last_line - 1 - self.first_line)
+        if last_block.isValid():
+            # * the whole span is shown when it fits
+            self.setTextCursor(QTextCursor(last_block))
+        block = document.findBlockByNumber(first_line - 1 - self.first_line)
+        if block.isValid():
+            self.setTextCursor(QTextCursor(block))
+
+    def set_trace_line(self, line_number):
+        """Highlight the (0 based) line the traced script runs, None clears it."""
+        if line_number != self.trace_line_number:
+            self.trace_line_number = line_number
+            self._update_extra_selections()
+
+    def _update_extra_selections(self):
+        selections = []
+        if self._current_line_selection is not None:
+            selections.append(self._current_line_selection)
+
+        block = None
+        if self.trace_line_number is not None:
+            block = self.document().findBlockByNumber(
+                self.trace_line_number - self.first_line
+            )
+        if block is not None and block.isValid():
+            trace_selection = QTextEdit.ExtraSelection()
+            trace_selection.format.setBackground(self.traceLineColor)
+            trace_selection.format.setProperty(QTextFormat.FullWidthSelection, True)
+            trace_selection.cursor = QTextCursor(block)
+            selections.append(trace_selection)
+
+        selections.extend(self._match_selections)
+        selections.extend(self._bracket_selections)
+        self.setExtraSelections(selections)
+
+    def search_index(self):
+        """Return the `PSearchIndex` of the document, building it if needed."""
+        if self._search_index is None:
+            self._search_index = PSearchIndex()
+            self._search_index.set_lines(self.toPlainText().split("\n"))
+        return self._search_index
+
+    def find(
+        self,
+        text,
+        backward=False,
+        regex=False,
+        case_sensitive=False,
+        include_selection=False,
+    ):
+        """
+        Select the next match of ``text`` after the cursor, or the previous
+        one when ``backward``, wrapping around the document. With
+        ``include_selection`` the match may start where the selection does,
+        to grow it while the text is typed. Returns whether there is a match,
+        raises `re.error` for an invalid ``regex``.
+        """
+        pattern = compile_pattern(text, regex, case_sensitive)
+        index = self.search_index()
+        cursor = self.textCursor()
+        if backward or include_selection:
+            position = cursor.selectionStart()
+        else:
+            position = cursor.selectionEnd()
+        block = self.document().findBlock(position)
+        found = index.find(
+            pattern, block.blockNumber(), position - block.position(), backward
+        )
+        if found is None:
+            # * wrapping around
+            if backward:
+                last = index.line_count - 1
+                found = index.find(pattern, last, len(index.line(last)), True)
+            else:
+                found = index.find(pattern, 0, 0)
+        if found is None:
+            return False
+
+        line, column, length = found
+        start = self.document().findBlockByNumber(line).position() + column
+        cursor.setPosition(start)
+        cursor.setPosition(start + length, QTextCursor.KeepAnchor)
+        self.setTextCursor(cursor)
+        return True
+
+    def find_all(self, text, regex=False, case_sensitive=False):
+        """
+        Highlight all the matches of ``text``. They are searched in a
+        background thread, `searchProgress` is emitted as they come in, and
+        only the ones in the visible lines are given an extra selection. They
+        are searched again after the edits until `clear_search`. Raises
+        `re.error` for an invalid ``regex``.
+        """
+        self._search_pattern = compile_pattern(text, regex, case_sensitive)
+        self._search_all()
+
+    def clear_search(self):
+        self._search_pattern = None
+        self._search_timer.stop()
+        self._reset_search()
+        self._update_extra_selections()
+
+    def stop_search(self):
+        """Stop the background search thread for good."""
+        self.clear_search()
+        if self._search_thread is None:
+            return
+        self._search_worker.generation = -1
+        self._search_thread.quit()
+        self._search_thread.wait()
+        self._search_thread = None
+
+    def _reset_search(self):
+        """Drop the running background search and its matches."""
+        self._search_generation += 1
+        if self._search_worker is not None:
+            self._search_worker.generation = self._search_generation
+        self.matches = []
+        self.search_truncated = False
+        self._match_selections = []
+        self._match_lines = None
+
+    def _search_all(self):
+        self._search_timer.stop()
+        if self._search_pattern is None:
+            return
+        if self._search_thread is None:
+            self._search_thread = QThread(self)
+            self._search_worker = PSearchWorker()
+            self._search_worker.moveToThread(self._search_thread)
+            self.searchRequested.connect(self._search_worker.search)
+            self._search_worker.matchesFound.connect(self._on_matches_found)
+            self._search_worker.finished.connect(self._on_search_finished)
+            QCoreApplication.instance().aboutToQuit.connect(self.stop_search)
+            self._search_thread.start()
+
+        self._reset_search()
+        self._update_extra_selections()
+        self.searchRequested.emit(
+            self._search_generation,
+            self._search_pattern,
+            self.search_index().chunks(),
+        )
+
+    def _on_matches_found(self, generation, matches):
+        if generation != self._search_generation:
+            return
+        self.matches.extend(matches)
+        self._match_lines = None
+        self._update_match_selections()
+        self.searchProgress.emit(len(self.matches), False)
+
+    def _on_search_finished(self, generation, truncated):
+        if generation == self._search_generation:
+            self.search_truncated = truncated
+            self.searchProgress.emit(len(self.matches), True)
+
+    def _update_match_selections(self, *args):
+        """Give the matches in the visible lines an extra selection."""
+        if not self.matches:
+            return
+        first = self.firstVisibleBlock().blockNumber()
+        last = first + self.visible_line_count()
+        if (first, last) == self._match_lines:
+            return
+        self._match_lines = (first, last)
+
+        document = self.document()
+        # * the matches may be older than the last edit
+        end_position = document.characterCount() - 1
+        start = bisect.bisect_left(self.matches, (first,))
+        end = bisect.bisect_left(self.matches, (last + 1,))
+        end = min(end, start + self.MAX_MATCH_SELECTIONS)
+        selections = []
+        block_line = None
+        for line, column, length in self.matches[start:end]:
+            if line != block_line:
+                block_line = line
+                block = document.findBlockByNumber(line)
+            if not block.isValid():
+                continue
+            selection = QTextEdit.ExtraSelection()
+            selection.format.setBackground(self.matchColor)
+            selection.cursor = QTextCursor(document)
+            position = min(block.position() + column, end_position)
+            selection.cursor.setPosition(position)
+            selection.cursor.setPosition(
+                min(position + length, end_position), QTextCursor.KeepAnchor
+            )
+            selections.append(selection)
+
+        self._match_selections = selections
+        self._update_extra_selections()
+
+    def _update_search_index(self, position, removed, added):
+        """Replace the lines of an edit in the search index."""
+        if self._filling:
+            # * moved to the new window by `_move_indexes`
+            return
+        index = self._search_index
+        if index is None or removed + added > self.SEARCH_INDEX_EDIT_SIZE:
+            self._search_index = None
+            if self._search_pattern is not None:
+                self._search_timer.start()
+            return
+
+        document = self.document()
+        block = document.findBlock(position)
+        first = block.blockNumber()
+        # * the old lines the removed text spanned
+        remaining = position - block.position() + removed
+        last = first
+        while last < index.line_count - 1 and remaining > len(index.line(last)):
+            remaining -= len(index.line(last)) + 1
+            last += 1
+
+        end_block = document.findBlock(position + added)
+        if not end_block.isValid():
+            end_block = document.lastBlock()
+        lines = []
+        for _ in range(end_block.blockNumber() - first + 1):
+            lines.append(block.text())
+            block = block.next()
+
+        # * e.g. a character typed over the same one, nothing to do
+        if removed == added and len(lines) == last - first + 1:
+            if all(index.line(first + i) == text for i, text in enumerate(lines)):
+                return
+
+        index.replace_lines(first, last - first + 1, lines)
+        if index.line_count != document.blockCount():
+            self._search_index = None
+        if self._search_pattern is not None:
+            self._search_timer.start()
+
+    # & Bracket matching and folding
+
+    def _build_structure(self):
+        """Index the structure of the document from scratch, from the event loop."""
+        self.structure = None
+        structure = PStructureIndex(self.highlighter.token_cache.tokenize)
+        structure.start_state = self.highlighter.start_state
+        lines = self.toPlainText().split("\n")
+        self._structure_steps = (structure, structure.build(lines))
+        self._structure_block_count = self.blockCount()
+        self._structure_timer.start(0)
+        self._match_brackets()
+
+    def _index_next_structure(self):
+        if self._structure_steps is None:
+            return
+        structure, steps = self._structure_steps
+        deadline = time.perf_counter() + self.STREAM_SLICE
+        for _ in steps:
+            if time.perf_counter() > deadline:
+                self._structure_timer.start(0)
+                return
+
+        self._structure_steps = None
+        self.structure = structure
+        self._match_brackets()
+        self.number_bar.update()
+
+    def _update_structure(self, position, removed, added):
+        """Index the lines of an edit again, and move the folds after it."""
+        if self._filling:
+            return
+        document = self.document()
+        block_count = document.blockCount()
+        block = document.findBlock(position)
+        first = block.blockNumber()
+        end_block = document.findBlock(position + added)
+        if not end_block.isValid():
+            end_block = document.lastBlock()
+        count = end_block.blockNumber() - first + 1
+        # * the old lines the edit replaced
+        old_count = count - block_count + self._structure_block_count
+        self._structure_block_count = block_count
+        if self.folds:
+            self._move_folds(first, old_count, count)
+
+        if self.is_loading():
+            # * indexed once the file is loaded
+            self.structure = self._structure_steps = None
+            return
+        if (
+            self.structure is None
+            or removed + added > self.STRUCTURE_EDIT_SIZE
+            or old_count < 1
+        ):
+            self._build_structure()
+            return
+
+        lines = []
+        for _ in range(count):
+            lines.append(block.text())
+            block = block.next()
+        self.structure.replace_lines(first, old_count, lines, _block_texts(block))
+        if self.structure.line_count != block_count:
+            self._build_structure()
+
+    def _on_cursor_moved(self):
+        block = self.textCursor().block()
+        if not block.isVisible():
+            # * e.g. a match found in folded lines
+            self._unfold_line(block.blockNumber())
+        self._match_brackets()
+
+    def _match_brackets(self):
+        """Highlight the bracket at or before the cursor and the one matching it."""
+        selections = []
+        structure = self.structure
+        cursor = self.textCursor()
+        if structure is not None and not cursor.hasSelection():
+            block = cursor.block()
+            line = block.blockNumber()
+            column = cursor.positionInBlock()
+            brackets = dict(structure.brackets(line, block.text()))
+            if column not in brackets:
+                column -= 1
+            if column in brackets:
+                document = self.document()
+                found = structure.match(
+                    line,
+                    column,
+                    lambda number: document.findBlockByNumber(number).text(),
+                )
+                if found is None:
+                    color = self.unmatchedBracketColor
+                else:
+                    color = self.bracketColor
+                    match_line, match_column = found
+                    match_block = document.findBlockByNumber(match_line)
+                    selections.append(
+                        self._bracket_selection(match_block, match_column, color)
+                    )
+                selections.append(self._bracket_selection(block, column, color))
+
+        if selections or self._bracket_selections:
+            self._bracket_selections = selections
+            self._update_extra_selections()
+
+    def _bracket_selection(self, block, column, color):
+        selection = QTextEdit.ExtraSelection()
+        selection.format.setBackground(color)
+        selection.cursor = QTextCursor(block)
+        selection.cursor.setPosition(block.position() + column)
+        selection.cursor.setPosition(
+            block.position() + column + 1, QTextCursor.KeepAnchor
+        )
+        return selection
+
+    def toggle_fold(self, line=None):
+        """
+        Fold the lines indented under the (0 based) ``line`` of the file, or
+        under the closest line above it they are indented under, or unfold
+        them when they are folded. None is the cursor line.
+        """
+        if self.structure is None:
+            return
+        if line is None:
+            line = self.textCursor().blockNumber()
+        else:
+            line -= self.first_line
+        if line in self.folds:
+            self._unfold(line)
+        else:
+            header = self._fold_header(line)
+            if header is None:
+                return
+            self._fold(header)
+        self.foldsChanged.emit()
+
+    def unfold_all(self):
+        if not self.folds:
+            return
+        self.folds = {}
+        self._set_lines_visible(0, self.blockCount() - 1, True)
+        self.foldsChanged.emit()
+
+    def folded_regions(self):
+        """Return the ``(first, last)`` (0 based) lines of the file folded away."""
+        first_line = self.first_line
+        return [
+            (first_line + header + 1, first_line + last)
+            for header, last in sorted(self.folds.items())
+        ]
+
+    def _fold_header(self, line):
+        """The line ``line`` is folded under, None when it is not indented."""
+        structure = self.structure
+        if structure.is_fold_header(line):
+            return line
+        indent = structure.indent(line)
+        if indent < 0:
+            # * a blank line, in the block of the closest line above
+            indent = float("inf")
+        for number in range(line - 1, -1, -1):
+            if indent == 0:
+                return None
+            number_indent = structure.indent(number)
+            if 0 <= number_indent < indent:
+                region = structure.fold_region(number)
+                if region is not None and region[1] >= line:
+                    return number
+                indent = number_indent
+        return None
+
+    def _fold(self, header):
+        first, last = self.structure.fold_region(header)
+        self.folds[header] = last
+        if first <= self.textCursor().blockNumber() <= last:
+            cursor = QTextCursor(self.document().findBlockByNumber(header))
+            cursor.movePosition(QTextCursor.EndOfBlock)
+            self.setTextCursor(cursor)
+        self._set_lines_visible(first, last, False)
+
+    def _unfold(self, header):
+        self._show_folded_lines(header, self.folds.pop(header))
+
+    def _show_folded_lines(self, header, last):
+        """Show the lines up to ``last`` under ``header``, but nested folds."""
+        line = start = header + 1
+        while line <= last:
+            if line in self.folds:
+                self._set_lines_visible(start, line, True)
+                line = start = self.folds[line] + 1
+            else:
+                line += 1
+        self._set_lines_visible(start, last, True)
+
+    def _unfold_line(self, line):
+        """Unfold the folds hiding ``line``."""
+        for header, last in list(self.folds.items()):
+            if header < line <= last and header in self.folds:
+                self._unfold(header)
+        self.foldsChanged.emit()
+
+    def _move_folds(self, first, old_count, count):
+        """Move the folds after an edit, the ones it touched are unfolded."""
+        delta = count - old_count
+        old_last = first + old_count - 1
+        folds = {}
+        touched = []
+        for header, last in self.folds.items():
+            if last < first:
+                folds[header] = last
+            elif header > old_last:
+                folds[header + delta] = last + delta
+            elif header == first == old_last and not delta:
+                # * an edit of the line the fold hangs on
+                folds[header] = last
+            else:
+                touched.append((header, last + delta))
+
+        self.folds = folds
+        if touched:
+            for header, last in touched:
+                self._show_folded_lines(header, last)
+            self.foldsChanged.emit()
+
+    def _set_lines_visible(self, first, last, visible):
+        last = min(last, self.blockCount() - 1)
+        if first > last:
+            return
+        document = self.document()
+        block = document.findBlockByNumber(first)
+        start = block.position()
+        for _ in range(last - first + 1):
+            block.setVisible(visible)
+            end = block.position() + block.length()
+            block = block.next()
+        # * lays the blocks out again, a hidden block takes no room
+        document.markContentsDirty(start, end - start)
+        self.viewport().update()
+        self.number_bar.update()
+
+
+def _block_texts(block):
+    """Yield the texts of ``block`` and of the blocks after it."""
+    while block.isValid():
+        yield block.text()
+        block = block.next()
 
 
 def format(color, style=""):
@@ -262,141 +1259,253 @@ class PSyntaxHighlighter(QSyntaxHighlighter):
         "\]",
     ]
 
-    def __init__(self, parent: QTextDocument) -> None:
+    # * the compiled tokenizer, shared by every highlighter instance, it is
+    # * built by `tokenizer` on the first highlighted block
+    _tokenizer = None
+
+    # * documents with more blocks are highlighted in a background thread
+    ASYNC_BLOCK_COUNT = 5_000
+    # * seconds spent applying background results per event loop iteration
+    ASYNC_APPLY_SLICE = 0.008
+
+    # * generation, lines, state of the first line
+    tokenizeRequested = pyqtSignal(int, object, int)
+    # * every block of the document was highlighted in the background
+    asyncFinished = pyqtSignal()
+
+    def __init__(
+        self, parent: QTextDocument, cache_size=4096, asynchronous=False
+    ) -> None:
         super().__init__(parent)
 
-        # Multi-line strings (expression, flag, style)
-        self.tri_single = (QRegExp("'''"), 1, self.STYLES["string2"])
-        self.tri_double = (QRegExp('"""'), 2, self.STYLES["string2"])
+        self._token_cache = None
+        self._cache_size = cache_size
+        # * state the first block starts in, the document can be a window of a
+        # * bigger file starting inside a string
+        self.start_state = NORMAL_STATE
 
-        rules = []
+        # * background highlighting
+        self.asynchronous = asynchronous
+        self._async_thread = None
+        self._async_worker = None
+        self._async_generation = 0
+        self._async_lines = None
+        self._async_results = {}
+        self._async_applied = set()
+        self._async_queue = deque()
+        self._async_worker_done = False
+        # * the whole document was highlighted in the background, the edits are
+        # * then highlighted synchronously until `setDocument`
+        self._async_finished = False
+        self._async_timer = QTimer(self)
+        self._async_timer.setSingleShot(True)
+        self._async_timer.timeout.connect(self._apply_async_results)
+        # * `QSyntaxHighlighter` sets ``parent`` without `setDocument`
+        if parent is not None:
+            self._watch_document(parent)
 
-        # Keyword, operator, and brace rules
-        rules += [
-            (r"\b%s\b" % w, 0, self.STYLES["keyword"])
-            for w in PSyntaxHighlighter.KEYWORDS
-        ]
-        rules += [
-            (r"%s" % o, 0, self.STYLES["operator"])
-            for o in PSyntaxHighlighter.OPERATORS
-        ]
-        rules += [
-            (r"%s" % b, 0, self.STYLES["brace"]) for b in PSyntaxHighlighter.BRACES
-        ]
+    @staticmethod
+    def tokenizer():
+        """Return the shared `PTokenizer`, compiling it on the first call."""
+        if PSyntaxHighlighter._tokenizer is None:
+            PSyntaxHighlighter._tokenizer = PTokenizer(
+                PSyntaxHighlighter.KEYWORDS,
+                PSyntaxHighlighter.OPERATORS,
+                PSyntaxHighlighter.BRACES,
+            )
+        return PSyntaxHighlighter._tokenizer
 
-        # All other rules
-        rules += [
-            # 'self'
-            (r"\bself\b", 0, self.STYLES["self"]),
-            # 'def' followed by an identifier
-            (r"\bdef\b\s*(\w+)", 1, self.STYLES["defclass"]),
-            # 'class' followed by an identifier
-            (r"\bclass\b\s*(\w+)", 1, self.STYLES["defclass"]),
-            # Numeric literals
-            (r"\b[+-]?[0-9]+[lL]?\b", 0, self.STYLES["numbers"]),
-            (r"\b[+-]?0[xX][0-9A-Fa-f]+[lL]?\b", 0, self.STYLES["numbers"]),
-            (
-                r"\b[+-]?[0-9]+(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?\b",
-                0,
-                self.STYLES["numbers"],
-            ),
-            # Double-quoted string, possibly containing escape sequences
-            (r'"[^"\\]*(\\.[^"\\]*)*"', 0, self.STYLES["string"]),
-            # Single-quoted string, possibly containing escape sequences
-            (r"'[^'\\]*(\\.[^'\\]*)*'", 0, self.STYLES["string"]),
-            # From '#' until a newline
-            (r"#[^\n]*", 0, self.STYLES["comment"]),
-        ]
+    @property
+    def token_cache(self):
+        if self._token_cache is None:
+            self._token_cache = PTokenCache(self.tokenizer(), self._cache_size)
+        return self._token_cache
 
-        # Build a QRegExp for each pattern
-        self.rules = [(QRegExp(pat), index, fmt) for (pat, index, fmt) in rules]
+    def cache_statistics(self):
+        """Return the hit / miss statistics of the token cache."""
+        return self.token_cache.statistics()
 
     def highlightBlock(self, text):
-        """Apply syntax highlighting to the given block of text."""
-        self.triple_quoutes_within_strings = []
-        # Do other syntax formatting
-        for expression, nth, format in self.rules:
-            index = expression.indexIn(text, 0)
-            if index >= 0:
-                # if there is a string we check
-                # if there are some triple quotes within the string
-                # they will be ignored if they are matched again
-                inner_index = self.tri_single[0].indexIn(text, index + 1)
-                if (
-                    expression.pattern()
-                    in [
-                        r'"[^"\\]*(\\.[^"\\]*)*"',
-                        r"'[^'\\]*(\\.[^'\\]*)*'",
-                    ]
-                    and inner_index != -1
-                ):
-                    # if inner_index == -1:
-                    # inner_index = self.tri_double[0].indexIn(text, index + 1)
-
-                    # if inner_index != -1:
-                    # else:
-                    triple_quote_indexes = range(inner_index, inner_index + 3)
-                    self.triple_quoutes_within_strings.extend(triple_quote_indexes)
-
-            while index >= 0:
-                # skipping triple quotes within strings
-                if index in self.triple_quoutes_within_strings:
-                    index += 1
-                    expression.indexIn(text, index)
-                    continue
+        """
+        Apply syntax highlighting to the given block of text.
 
-                # We actually want the index of the nth match
-                index = expression.pos(nth)
-                length = len(expression.cap(nth))
-                self.setFormat(index, length, format)
-                index = expression.indexIn(text, index + length)
-
-        self.setCurrentBlockState(0)
-
-        # Do multi-line strings
-        # in_multiline = self.match_multiline(text, *self.tri_single)
-        # if not in_multiline:
-        # in_multiline = self.match_multiline(text, *self.tri_double)
-
-    def match_multiline(self, text, delimiter, in_state, style):
-        """Do highlighting of multi-line strings. ``delimiter`` should be a
-        ``QRegExp`` for triple-single-quotes or triple-double-quotes, and
-        ``in_state`` should be a unique integer to represent the corresponding
-        state changes when inside those strings. Returns True if we're still
-        inside a multi-line string when this function is finished.
+        The lexer state (inside a triple quoted string or not) is stored as the
+        block state, `QSyntaxHighlighter` then only moves on to the next block
+        while the state at the end of the edited block keeps changing, so an
+        edit costs a single block unless it opens or closes a docstring.
         """
-        # * If inside triple-single quotes, start at 0
-        if self.previousBlockState() == in_state:
-            start = 0
-            add = 0
-        # * Otherwise, look for the delimiter on this line
-        else:
-            start = delimiter.indexIn(text)
-            # * skipping triple quotes within strings
-            if start in self.triple_quoutes_within_strings:
-                return False
-            # * Move past this match
-            add = delimiter.matchedLength()
-
-        # * As long as there's a delimiter match on this line...
-        while start >= 0:
-            # * Look for the ending delimiter
-            end = delimiter.indexIn(text, start + add)
-            # * Ending delimiter on this line?
-            if end >= add:
-                length = end - start + add + delimiter.matchedLength()
-                self.setCurrentBlockState(0)
-            # * No; multi-line string
-            else:
-                self.setCurrentBlockState(in_state)
-                length = len(text) - start + add
-            # * Apply formatting
-            self.setFormat(start, length, style)
-            # * Look for the next match
-            start = delimiter.indexIn(text, start + length)
-
-        # * Return True if still inside a multi-line string, False otherwise
-        if self.currentBlockState() == in_state:
-            return True
-        else:
-            return False
+        result = None
+        if self._async_lines is not None:
+            result = self._async_result(text)
+            if result is None:
+                # * not tokenized yet, shown as plain text until its turn, the
+                # * blocks after it do not start from a stale state
+                self.setCurrentBlockState(-1)
+                return
+
+        if result is None:
+            result = self._tokenize(text)
+        spans, state = result
+
+        styles = self.STYLES
+        for start, length, style in spans:
+            self.setFormat(start, length, styles[style])
+
+        self.setCurrentBlockState(state)
+
+    # & Background highlighting
+
+    def highlight_async(self):
+        """
+        Tokenize the whole document in a background thread.
+
+        Blocks are shown as plain text until their chunk is tokenized, the
+        results are then applied in time sliced batches on the GUI thread, and
+        `asyncFinished` is emitted once they all are. Started by `setDocument`
+        and when the document grows past `ASYNC_BLOCK_COUNT` blocks, if the
+        highlighter is asynchronous.
+        """
+        if self._async_thread is None:
+            self._async_thread = QThread(self)
+            self._async_worker = PHighlightWorker(self.tokenizer())
+            self._async_worker.moveToThread(self._async_thread)
+            self.tokenizeRequested.connect(self._async_worker.tokenize)
+            self._async_worker.chunkReady.connect(self._on_async_chunk_ready)
+            self._async_worker.finished.connect(self._on_async_finished)
+            QCoreApplication.instance().aboutToQuit.connect(self.stop_async)
+            self._async_thread.start()
+
+        self._reset_async()
+        self._async_lines = self.document().toPlainText().split("\n")
+        self.tokenizeRequested.emit(
+            self._async_generation, self._async_lines, self.start_state
+        )
+
+    def prioritize(self, line_number):
+        """Make the background thread tokenize ``line_number`` next."""
+        if self._async_worker is not None:
+            self._async_worker.priority_line = line_number
+
+    def stop_async(self):
+        """
+        Stop the background thread for good, the pending results are dropped
+        and the following blocks are highlighted synchronously.
+        """
+        self.asynchronous = False
+        if self._async_thread is None:
+            return
+        self._reset_async()
+        self._async_worker.generation = -1
+        self._async_thread.quit()
+        self._async_thread.wait()
+        self._async_thread = None
+
+    def setDocument(self, document):
+        # * a background job only applies to the document it was started on
+        self._reset_async()
+        self._async_finished = False
+        previous = self.document()
+        if previous is not None:
+            previous.blockCountChanged.disconnect(self._on_async_block_count)
+        super().setDocument(document)
+        if document is not None:
+            self._watch_document(document)
+
+    def _watch_document(self, document):
+        document.blockCountChanged.connect(self._on_async_block_count)
+        if self._needs_async(document.blockCount()):
+            self.highlight_async()
+
+    def _needs_async(self, block_count):
+        """Whether the document should be highlighted in the background now."""
+        return (
+            self.asynchronous
+            and self._async_lines is None
+            and not self._async_finished
+            and block_count > self.ASYNC_BLOCK_COUNT
+        )
+
+    def _reset_async(self):
+        """Drop the running background job and its pending results."""
+        self._async_generation += 1
+        if self._async_worker is not None:
+            self._async_worker.generation = self._async_generation
+        self._async_lines = None
+        self._async_results = {}
+        self._async_applied = set()
+        self._async_queue.clear()
+        self._async_worker_done = False
+
+    def _tokenize(self, text):
+        state = self.previousBlockState()
+        if state < 0:
+            # * the first block, or one after a block not highlighted yet
+            first = self.currentBlock().blockNumber() == 0
+            state = self.start_state if first else NORMAL_STATE
+        return self.token_cache.tokenize(text, state)
+
+    def _async_result(self, text):
+        """
+        Return the background result of the current block, or None if it has
+        not been tokenized yet.
+        """
+        number = self.currentBlock().blockNumber()
+        if number >= len(self._async_lines) or self._async_lines[number] != text:
+            # * edited since the snapshot was taken
+            return self._tokenize(text)
+
+        result = self._async_results.get(number)
+        if result is None:
+            return None
+        self._async_applied.add(number)
+        return result
+
+    def _on_async_chunk_ready(self, generation, first_line, results):
+        if generation != self._async_generation:
+            return
+
+        for line_number, result in enumerate(results, first_line):
+            self._async_results[line_number] = result
+            self._async_applied.discard(line_number)
+
+        self._async_queue.append((first_line, first_line + len(results)))
+        self._async_timer.start(0)
+
+    def _on_async_finished(self, generation):
+        if generation == self._async_generation:
+            self._async_worker_done = True
+            self._async_timer.start(0)
+
+    def _on_async_block_count(self, block_count):
+        if self._needs_async(block_count):
+            self.highlight_async()
+        elif self._async_lines is not None and block_count != len(self._async_lines):
+            # * lines were added or removed, the snapshot line numbers are stale
+            self.highlight_async()
+
+    def _apply_async_results(self):
+        deadline = time.perf_counter() + self.ASYNC_APPLY_SLICE
+        queue = self._async_queue
+
+        while queue:
+            first_line, last_line = queue.popleft()
+            block = self.document().findBlockByNumber(first_line)
+
+            for line_number in range(first_line, last_line):
+                if not block.isValid():
+                    break
+                if line_number not in self._async_applied:
+                    self.rehighlightBlock(block)
+                block = block.next()
+
+                if time.perf_counter() > deadline:
+                    if line_number + 1 < last_line:
+                        queue.appendleft((line_number + 1, last_line))
+                    self._async_timer.start(0)
+                    return
+
+        if self._async_worker_done:
+            # * every block is highlighted, edits are highlighted synchronously
+            self._reset_async()
+            self._async_finished = True
+            self.asyncFinished.emit()
@@ -0,0 +1,147 @@
+import re
+
+from PyQt5.QtCore import QEvent, Qt, QTimer
+from PyQt5.QtWidgets import QHBoxLayout, QLabel, QLineEdit, QToolButton, QWidget
+
+
+class PFindBar(QWidget):
+    """
+    Find bar of a `PCodeOverview`.
+
+    The text is searched from the cursor while it is typed, and all its
+    matches are highlighted once the typing stops for `FIND_ALL_DELAY`.
+    Enter goes to the next match, Shift+Enter to the previous one, Escape
+    closes the bar and clears the matches.
+    """
+
+    # * idle time after a key press before all the matches are searched, in ms
+    FIND_ALL_DELAY = 200
+
+    def __init__(self, editor, parent=None) -> None:
+        super().__init__(parent)
+
+        self.editor = editor
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(4, 2, 4, 2)
+        self.setLayout(layout)
+
+        self.line_edit = QLineEdit()
+        self.line_edit.setPlaceholderText("Find")
+        self.line_edit.textEdited.connect(self.on_text_edited)
+        self.line_edit.installEventFilter(self)
+        layout.addWidget(self.line_edit)
+
+        self.case_button = self._tool_button("Aa", "Match case", checkable=True)
+        self.regex_button = self._tool_button(".*", "Regular expression", True)
+        self.case_button.toggled.connect(self.on_options_changed)
+        self.regex_button.toggled.connect(self.on_options_changed)
+        previous_button = self._tool_button("↑", "Previous match (Shift+Enter)")
+        previous_button.clicked.connect(self.find_previous)
+        next_button = self._tool_button("↓", "Next match (Enter)")
+        next_button.clicked.connect(self.find_next)
+
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+
+        close_button = self._tool_button("×", "Close (Escape)")
+        close_button.clicked.connect(self.close_bar)
+
+        self._find_all_timer = QTimer(self)
+        self._find_all_timer.setSingleShot(True)
+        self._find_all_timer.setInterval(self.FIND_ALL_DELAY)
+        self._find_all_timer.timeout.connect(self.find_all)
+        self.editor.searchProgress.connect(self.on_search_progress)
+
+    def _tool_button(self, text, tool_tip, checkable=False):
+        button = QToolButton()
+        button.setText(text)
+        button.setToolTip(tool_tip)
+        button.setCheckable(checkable)
+        self.layout().addWidget(button)
+        return button
+
+    def open(self):
+        """Show the bar, with the selected text of the editor when there is one."""
+        selected = self.editor.textCursor().selectedText()
+        # * a selection of several lines holds paragraph separators
+        if selected and " " not in selected:
+            self.line_edit.setText(selected)
+        self.show()
+        self.line_edit.setFocus()
+        self.line_edit.selectAll()
+        self.find_all()
+
+    def close_bar(self):
+        self._find_all_timer.stop()
+        self.editor.clear_search()
+        self.count_label.clear()
+        self.hide()
+        self.editor.setFocus()
+
+    def find_next(self):
+        self._find(backward=False)
+
+    def find_previous(self):
+        self._find(backward=True)
+
+    def find_all(self):
+        self._find_all_timer.stop()
+        text = self.line_edit.text()
+        if not text:
+            self.editor.clear_search()
+            self.count_label.clear()
+            return
+        try:
+            self.editor.find_all(
+                text, self.regex_button.isChecked(), self.case_button.isChecked()
+            )
+        except re.error:
+            self.editor.clear_search()
+            self.count_label.setText("invalid pattern")
+
+    def on_text_edited(self, text):
+        self._find(backward=False, include_selection=True)
+        self._find_all_timer.start()
+
+    def on_options_changed(self):
+        self._find(backward=False, include_selection=True)
+        self.find_all()
+
+    def on_search_progress(self, count, finished):
+        if not self.isVisible():
+            return
+        if not finished:
+            self.count_label.setText(f"{count} matches…")
+        elif self.editor.search_truncated:
+            self.count_label.setText(f"{count}+ matches")
+        else:
+            self.count_label.setText(f"{count} matches")
+
+    def eventFilter(self, watched, event):
+        if watched is self.line_edit and event.type() == QEvent.KeyPress:
+            if event.key() in (Qt.Key_Return, Qt.Key_Enter):
+                self._find(backward=bool(event.modifiers() & Qt.ShiftModifier))
+                return True
+            if event.key() == Qt.Key_Escape:
+                self.close_bar()
+                return True
+        return super().eventFilter(watched, event)
+
+    def _find(self, backward, include_selection=False):
+        text = self.line_edit.text()
+        if not text:
+            return
+        try:
+            found = self.editor.find(
+                text,
+                backward,
+                self.regex_button.isChecked(),
+                self.case_button.isChecked(),
+                include_selection,
+            )
+        except re.error:
+            self.count_label.setText("invalid pattern")
+            return
+        if not found:
+            self.count_label.setText("no matches")
@@ -0,0 +1,171 @@
+from PyQt5.QtCore import QPointF, QRectF, Qt
+from PyQt5.QtGui import QColor, QPen, QPolygonF
+from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+
+from code_generator.flowchart import (
+    NODE_CLASS,
+    NODE_CONDITION,
+    NODE_END,
+    NODE_FUNCTION,
+    NODE_LOOP,
+    NODE_START,
+)
+import globals
+
+
+# * zoom below which the items are drawn without their details
+DETAIL_MIN_SCALE = 0.4
+
+
+def level_of_detail(painter):
+    """Return the scale the painter draws the scene at, 1 at 100% zoom."""
+    return QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+        painter.worldTransform()
+    )
+
+
+class PNodeItem(QGraphicsItem):
+    """
+    Graphics item of a flowchart node, it reads its size, kind and label from
+    the `PNodeStore` of the `PScene` instead of keeping copies.
+
+    Zoomed out below `DETAIL_MIN_SCALE` it is a plain rectangle, the rounded
+    corners and the label would not be readable.
+
+    Nodes only change when they move, they are drawn once per zoom level into
+    a pixmap with `CACHE_MODE`, and the pixmap is copied on the next frames.
+    """
+
+    CACHE_MODE = QGraphicsItem.DeviceCoordinateCache
+
+    # * fill colour per node kind
+    KIND_COLORS = {
+        NODE_START: QColor("#3BA55D"),
+        NODE_END: QColor("#ED4245"),
+        NODE_CONDITION: QColor("#FAA61A"),
+        NODE_LOOP: QColor("#5865F2"),
+        NODE_FUNCTION: QColor("#EB459E"),
+        NODE_CLASS: QColor("#EB459E"),
+    }
+    DEFAULT_COLOR = QColor("#4F545C")
+    ACTIVE_PEN = QPen(QColor("#FFFFFF"), 2)
+    CURRENT_PEN = QPen(QColor("#00B0F4"), 2)
+
+    def __init__(self, scene_model, node) -> None:
+        super().__init__()
+
+        self.scene_model = scene_model
+        self.node = node
+
+        store = scene_model.node_store
+        self.setPos(store.x[node], store.y[node])
+        self.setZValue(1)
+        self.setCacheMode(self.CACHE_MODE)
+        # * outlined, e.g. the node running in a trace
+        self.active = False
+        # * outlined in another colour, the node of the cursor line
+        self.current = False
+        # * asked for on every frame, the size of a node does not change
+        self._rect = QRectF(0, 0, store.width[node], store.height[node])
+
+    def boundingRect(self):
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        store = self.scene_model.node_store
+        rect = self.boundingRect()
+        color = self.KIND_COLORS.get(store.kind[self.node], self.DEFAULT_COLOR)
+
+        outline = None
+        if self.active:
+            outline = self.ACTIVE_PEN
+        elif self.current:
+            outline = self.CURRENT_PEN
+
+        if level_of_detail(painter) < DETAIL_MIN_SCALE:
+            painter.fillRect(rect, color)
+            if outline is not None:
+                painter.setPen(outline)
+                painter.drawRect(rect)
+            return
+
+        painter.setBrush(color)
+        if outline is not None:
+            # * inside the bounding rect with the outline
+            painter.setPen(outline)
+            painter.drawRoundedRect(rect.adjusted(1, 1, -1, -1), 6, 6)
+        else:
+            painter.setPen(Qt.NoPen)
+            painter.drawRoundedRect(rect, 6, 6)
+
+        painter.setPen(QColor("#FFFFFF"))
+        painter.setFont(globals.font(point_size=9))
+        painter.drawText(
+            rect.adjusted(6, 0, -6, 0),
+            Qt.AlignVCenter | Qt.AlignLeft,
+            store.label[self.node],
+        )
+
+
+class PEdgeItem(QGraphicsItem):
+    """
+    Graphics item of a flowchart edge, drawn along its route from the
+    `PEdgeRouter` of the `PScene`.
+
+    Zoomed out below `DETAIL_MIN_SCALE` it is drawn with a one pixel pen, and
+    the bends closer than `SIMPLIFY_PIXELS` on screen are skipped.
+    """
+
+    SIMPLIFY_PIXELS = 4
+
+    def __init__(self, scene_model, edge) -> None:
+        super().__init__()
+
+        self.scene_model = scene_model
+        self.edge = edge
+        self.pen = QPen(QColor("#B9BBBE"))
+        self.pen.setWidth(2)
+        self.simple_pen = QPen(self.pen.color())
+        self.simple_pen.setCosmetic(True)
+        # * bounding rect of the route, until it is dropped
+        self._rect = None
+
+    def update_geometry(self):
+        """Call before the route of the edge is dropped."""
+        self.prepareGeometryChange()
+        self._rect = None
+
+    def points(self):
+        return [QPointF(x, y) for x, y in self.scene_model.router.route(self.edge)]
+
+    def boundingRect(self):
+        if self._rect is None:
+            x, y, width, height = self.scene_model.router.rect(self.edge)
+            self._rect = QRectF(x, y, width, height).adjusted(-2, -2, 2, 2)
+        return self._rect
+
+    def simplified_points(self, scale):
+        """
+        Return the points of the route without the bends closer than
+        `SIMPLIFY_PIXELS` to the last kept point, at the zoom ``scale``.
+        """
+        route = self.scene_model.router.route(self.edge)
+        distance = self.SIMPLIFY_PIXELS / scale
+        last_x, last_y = route[0]
+        points = [QPointF(last_x, last_y)]
+        for x, y in route[1:-1]:
+            if abs(x - last_x) + abs(y - last_y) >= distance:
+                points.append(QPointF(x, y))
+                last_x, last_y = x, y
+        points.append(QPointF(*route[-1]))
+        return points
+
+    def paint(self, painter, option, widget=None):
+        scale = level_of_detail(painter)
+        if scale < DETAIL_MIN_SCALE:
+            painter.setPen(self.simple_pen)
+            painter.drawPolyline(QPolygonF(self.simplified_points(scale)))
+            return
+
+        painter.setPen(self.pen)
+        painter.drawPolyline(QPolygonF(self.points()))
@@ -0,0 +1,305 @@
+from array import array
+
+from editor.lazy_import import lazy_import
+
+# * numpy is optional, the columns are plain arrays, it is loaded on first use
+numpy = lazy_import("numpy")
+
+
+class PNodeStore:
+    """
+    Struct of arrays storage of the flowchart nodes.
+
+    A node is a row id, its position, size, kind and source line range live
+    in one `array` column each instead of one python object per node.
+    Removed rows are recycled by the following insertions.
+    """
+
+    def __init__(self) -> None:
+        self.x = array("d")
+        self.y = array("d")
+        self.width = array("d")
+        self.height = array("d")
+        self.kind = array("B")
+        self.first_line = array("l")
+        self.last_line = array("l")
+        self.label = []
+        self.alive = bytearray()
+
+        self._free_rows = []
+
+    def __len__(self):
+        return len(self.alive) - len(self._free_rows)
+
+    def __iter__(self):
+        """Iterate over the ids of the nodes in the store."""
+        return (node for node, alive in enumerate(self.alive) if alive)
+
+    def __contains__(self, node):
+        return 0 <= node < len(self.alive) and self.alive[node] == 1
+
+    def add(
+        self, x, y, width, height, kind=0, first_line=0, last_line=0, label=""
+    ):
+        """Add a node and return its id."""
+        if self._free_rows:
+            node = self._free_rows.pop()
+            self.x[node], self.y[node] = x, y
+            self.width[node], self.height[node] = width, height
+            self.kind[node] = kind
+            self.first_line[node], self.last_line[node] = first_line, last_line
+            self.label[node] = label
+            self.alive[node] = 1
+            return node
+
+        self.x.append(x)
+        self.y.append(y)
+        self.width.append(width)
+        self.height.append(height)
+        self.kind.append(kind)
+        self.first_line.append(first_line)
+        self.last_line.append(last_line)
+        self.label.append(label)
+        self.alive.append(1)
+        return len(self.alive) - 1
+
+    def add_many(
+        self,
+        xs,
+        ys,
+        widths,
+        heights,
+        kinds=None,
+        first_lines=None,
+        last_lines=None,
+        labels=None,
+    ):
+        """
+        Append nodes from equally long sequences, one per column, and return
+        the range of their ids. Missing kinds and line ranges are 0, missing
+        labels are empty.
+        """
+        count = len(xs)
+        columns = (ys, widths, heights, kinds, first_lines, last_lines, labels)
+        if any(column is not None and len(column) != count for column in columns):
+            raise ValueError("the node columns do not have the same length")
+
+        first = len(self.alive)
+        self.x.extend(xs)
+        self.y.extend(ys)
+        self.width.extend(widths)
+        self.height.extend(heights)
+        self.kind.extend(kinds if kinds is not None else bytes(count))
+        zeros = array("l", bytes(count * self.first_line.itemsize))
+        self.first_line.extend(first_lines if first_lines is not None else zeros)
+        self.last_line.extend(last_lines if last_lines is not None else zeros)
+        self.label.extend(labels if labels is not None else [""] * count)
+        self.alive.extend(b"\x01" * count)
+        return range(first, first + count)
+
+    def remove(self, node):
+        self.alive[node] = 0
+        self.label[node] = ""
+        self._free_rows.append(node)
+
+    def rect(self, node):
+        return (self.x[node], self.y[node], self.width[node], self.height[node])
+
+    def move(self, node, x, y):
+        self.x[node], self.y[node] = x, y
+
+    def move_many(self, nodes, xs, ys):
+        """Move each of ``nodes`` to the matching ``(xs, ys)`` position."""
+        if numpy is not None:
+            rows = numpy.fromiter(nodes, dtype=numpy.intp, count=len(nodes))
+            numpy.frombuffer(self.x, dtype=numpy.float64)[rows] = xs
+            numpy.frombuffer(self.y, dtype=numpy.float64)[rows] = ys
+            return
+
+        x_column, y_column = self.x, self.y
+        for node, x, y in zip(nodes, xs, ys):
+            x_column[node] = x
+            y_column[node] = y
+
+    def translate(self, dx, dy, nodes=None):
+        """Move ``nodes`` (every node when None) by ``(dx, dy)``."""
+        if nodes is None and numpy is not None:
+            numpy.frombuffer(self.x, dtype=numpy.float64)[:] += dx
+            numpy.frombuffer(self.y, dtype=numpy.float64)[:] += dy
+            return
+
+        if nodes is None:
+            self.x = array("d", map(float(dx).__add__, self.x))
+            self.y = array("d", map(float(dy).__add__, self.y))
+            return
+
+        x_column, y_column = self.x, self.y
+        for node in nodes:
+            x_column[node] += dx
+            y_column[node] += dy
+
+    def bounding_rect(self):
+        """Return the ``(x, y, width, height)`` rect enclosing every node."""
+        if not len(self):
+            return (0.0, 0.0, 0.0, 0.0)
+
+        if numpy is not None:
+            alive = numpy.frombuffer(self.alive, dtype=numpy.uint8).view(bool)
+            x = numpy.frombuffer(self.x, dtype=numpy.float64)[alive]
+            y = numpy.frombuffer(self.y, dtype=numpy.float64)[alive]
+            width = numpy.frombuffer(self.width, dtype=numpy.float64)[alive]
+            height = numpy.frombuffer(self.height, dtype=numpy.float64)[alive]
+            left, top = float(x.min()), float(y.min())
+            right, bottom = float((x + width).max()), float((y + height).max())
+        elif self._free_rows:
+            rows = list(self)
+            left = min(self.x[node] for node in rows)
+            top = min(self.y[node] for node in rows)
+            right = max(self.x[node] + self.width[node] for node in rows)
+            bottom = max(self.y[node] + self.height[node] for node in rows)
+        else:
+            left, top = min(self.x), min(self.y)
+            right = max(map(float.__add__, self.x, self.width))
+            bottom = max(map(float.__add__, self.y, self.height))
+
+        return (left, top, right - left, bottom - top)
+
+
+class PEdgeStore:
+    """Struct of arrays storage of the flowchart edges, see `PNodeStore`."""
+
+    def __init__(self) -> None:
+        self.source = array("l")
+        self.target = array("l")
+        self.kind = array("B")
+        self.alive = bytearray()
+
+        self._free_rows = []
+
+    def __len__(self):
+        return len(self.alive) - len(self._free_rows)
+
+    def __iter__(self):
+        return (edge for edge, alive in enumerate(self.alive) if alive)
+
+    def __contains__(self, edge):
+        return 0 <= edge < len(self.alive) and self.alive[edge] == 1
+
+    def add(self, source, target, kind=0):
+        """Add an edge between two node ids and return its id."""
+        if self._free_rows:
+            edge = self._free_rows.pop()
+            self.source[edge], self.target[edge] = source, target
+            self.kind[edge] = kind
+            self.alive[edge] = 1
+            return edge
+
+        self.source.append(source)
+        self.target.append(target)
+        self.kind.append(kind)
+        self.alive.append(1)
+        return len(self.alive) - 1
+
+    def add_many(self, sources, targets, kinds=None):
+        """Append edges from equally long sequences and return their ids."""
+        count = len(sources)
+        if len(targets) != count or (kinds is not None and len(kinds) != count):
+            raise ValueError("the edge columns do not have the same length")
+
+        first = len(self.alive)
+        self.source.extend(sources)
+        self.target.extend(targets)
+        self.kind.extend(kinds if kinds is not None else bytes(count))
+        self.alive.extend(b"\x01" * count)
+        return range(first, first + count)
+
+    def remove(self, edge):
+        self.alive[edge] = 0
+        self._free_rows.append(edge)
+
+    def ends(self, edge):
+        return self.source[edge], self.target[edge]
+
+
+class PNode:
+    """Lightweight handle to a node of a `PNodeStore`."""
+
+    __slots__ = ("store", "id")
+
+    def __init__(self, store, node) -> None:
+        self.store = store
+        self.id = node
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PNode)
+            and other.store is self.store
+            and other.id == self.id
+        )
+
+    def __hash__(self):
+        return hash(self.id)
+
+    @property
+    def x(self):
+        return self.store.x[self.id]
+
+    @property
+    def y(self):
+        return self.store.y[self.id]
+
+    @property
+    def width(self):
+        return self.store.width[self.id]
+
+    @property
+    def height(self):
+        return self.store.height[self.id]
+
+    @property
+    def kind(self):
+        return self.store.kind[self.id]
+
+    @property
+    def label(self):
+        return self.store.label[self.id]
+
+    @property
+    def lines(self):
+        """The ``(first, last)`` source lines of the node."""
+        return self.store.first_line[self.id], self.store.last_line[self.id]
+
+    def rect(self):
+        return self.store.rect(self.id)
+
+
+class PEdge:
+    """Lightweight handle to an edge of a `PEdgeStore`."""
+
+    __slots__ = ("store", "id")
+
+    def __init__(self, store, edge) -> None:
+        self.store = store
+        self.id = edge
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PEdge)
+            and other.store is self.store
+            and other.id == self.id
+        )
+
+    def __hash__(self):
+        return hash(self.id)
+
+    @property
+    def source(self):
+        return self.store.source[self.id]
+
+    @property
+    def target(self):
+        return self.store.target[self.id]
+
+    @property
+    def kind(self):
+        return self.store.kind[self.id]
@@ -0,0 +1,68 @@
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from editor.tokenizer import NORMAL_STATE
+
+
+class PHighlightWorker(QObject):
+    """
+    Tokenizes a snapshot of a document in a background thread.
+
+    The lines are tokenized in chunks, the chunk under the viewport
+    (`priority_line`) first and then the rest of the document from the top.
+    The first line starts in ``start_state``. A chunk tokenized before the
+    state it starts in is known assumes `NORMAL_STATE`, and is tokenized
+    again when the sequential pass finds that it actually starts inside a
+    triple quoted string.
+    """
+
+    # * generation, first line of the chunk, [(spans, end_state), ...]
+    chunkReady = pyqtSignal(int, int, object)
+    # * generation
+    finished = pyqtSignal(int)
+
+    def __init__(self, tokenizer, chunk_size=256) -> None:
+        super().__init__()
+
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+
+        # * written from the GUI thread, a job stops as soon as it is outdated
+        self.generation = 0
+        self.priority_line = 0
+
+    @pyqtSlot(int, object, int)
+    def tokenize(self, generation, lines, start_state):
+        chunk_size = self.chunk_size
+        chunk_count = (len(lines) + chunk_size - 1) // chunk_size
+
+        # * state each chunk was tokenized with, and the state at its end
+        start_states = [None] * chunk_count
+        end_states = [None] * chunk_count
+        sequential = 0
+
+        while sequential < chunk_count:
+            if generation != self.generation:
+                return
+
+            chunk = self.priority_line // chunk_size
+            if not 0 <= chunk < chunk_count or start_states[chunk] is not None:
+                chunk = sequential
+
+            state = end_states[chunk - 1] if chunk else start_state
+            if state is None:
+                state = NORMAL_STATE
+
+            if start_states[chunk] != state:
+                start_states[chunk] = state
+                first_line = chunk * chunk_size
+                results = []
+                for text in lines[first_line : first_line + chunk_size]:
+                    spans, state = self.tokenizer.tokenize(text, state)
+                    results.append((spans, state))
+                end_states[chunk] = state
+                self.chunkReady.emit(generation, first_line, results)
+
+            if chunk == sequential:
+                sequential += 1
+
+        self.finished.emit(generation)
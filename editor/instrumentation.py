@@ -0,0 +1,266 @@
+from collections import deque
+import functools
+import json
+import math
+import time
+
+from PyQt5.QtCore import QObject, QRectF, Qt, QTimer
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import QWidget
+
+import globals
+
+
+class PHistogram:
+    """
+    Durations of one hot path, in log scale buckets of a quarter of an octave
+    from 1 µs up, so percentiles are known within ~19% whatever the count.
+    The last `RECENT` durations are also kept as they are.
+    """
+
+    BUCKETS = 4 * 24
+    RECENT = 120
+
+    def __init__(self) -> None:
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=self.RECENT)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+        microseconds = seconds * 1e6
+        bucket = int(4 * math.log2(microseconds)) + 1 if microseconds >= 1 else 0
+        self.counts[min(bucket, self.BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket of the ``fraction`` percentile."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper_bound(bucket), self.max)
+        return self.max
+
+    @staticmethod
+    def upper_bound(bucket):
+        """Upper bound of ``bucket``, in seconds."""
+        return 2 ** (bucket / 4) * 1e-6
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            # * upper bound of the bucket -> count, the empty ones left out
+            "buckets": {
+                f"{self.upper_bound(bucket):.3g}": count
+                for bucket, count in enumerate(self.counts)
+                if count
+            },
+        }
+
+
+class PInstrumentation(QObject):
+    """
+    Timing of the hot paths of the editor and stalls of the event loop.
+
+    `enable` replaces the methods of `targets`, ``{name: (class, method
+    name)}``, by wrappers adding their duration to the histogram of ``name``,
+    and starts a timer which measures how late the event loop runs it. A
+    timer later than `stall_threshold` is recorded as a stall. `disable` puts
+    the methods back, so the instrumentation costs nothing while it is off.
+
+    Qt only calls the wrapper of a virtual method, e.g. ``paintEvent``, when
+    the class already overrides it in Python.
+    """
+
+    # * period of the event loop probe, in ms
+    PROBE_INTERVAL = 16
+    STALL_THRESHOLD = 0.1
+    # * stalls kept, the most recent ones
+    MAX_STALLS = 1000
+
+    def __init__(self, targets, parent=None, stall_threshold=STALL_THRESHOLD):
+        super().__init__(parent)
+
+        self.targets = targets
+        self.stall_threshold = stall_threshold
+        self.enabled = False
+
+        self.histograms = {}
+        # * (time since enabled, duration) of the stalls
+        self.stalls = deque(maxlen=self.MAX_STALLS)
+        self._originals = {}
+        self._started = 0.0
+
+        self._probe = QTimer(self)
+        self._probe.setInterval(self.PROBE_INTERVAL)
+        self._probe.setTimerType(Qt.PreciseTimer)
+        self._probe.timeout.connect(self._on_probe)
+        self._last_probe = 0.0
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._started = time.perf_counter()
+        for name, (owner, method_name) in self.targets.items():
+            # * None when the method is inherited, it is deleted again
+            original = owner.__dict__.get(method_name)
+            self._originals[name] = original
+            method = getattr(owner, method_name)
+            setattr(owner, method_name, self._wrap(name, method))
+
+        self._last_probe = time.perf_counter()
+        self._probe.start()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._probe.stop()
+        for name, (owner, method_name) in self.targets.items():
+            original = self._originals.pop(name)
+            if original is None:
+                delattr(owner, method_name)
+            else:
+                setattr(owner, method_name, original)
+
+    def reset(self):
+        self.histograms.clear()
+        self.stalls.clear()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = PHistogram()
+        return histogram
+
+    def to_dict(self):
+        return {
+            "stall_threshold": self.stall_threshold,
+            "histograms": {
+                name: histogram.to_dict()
+                for name, histogram in sorted(self.histograms.items())
+            },
+            "stalls": [
+                {"at": at, "duration": duration} for at, duration in self.stalls
+            ],
+        }
+
+    def dump(self, path):
+        """Write the histograms and the stalls to ``path`` as JSON."""
+        with open(path, "w") as dump_file:
+            json.dump(self.to_dict(), dump_file, indent=2)
+
+    def _wrap(self, name, method):
+        histogram = self.histogram(name)
+        add = histogram.add
+        perf_counter = time.perf_counter
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                add(perf_counter() - start)
+
+        return timed
+
+    def _on_probe(self):
+        now = time.perf_counter()
+        # * how late the event loop ran the probe
+        latency = max(now - self._last_probe - self.PROBE_INTERVAL / 1000, 0.0)
+        self._last_probe = now
+        self.histogram("event_loop.latency").add(latency)
+        if latency > self.stall_threshold:
+            self.stalls.append((now - self._started, latency))
+
+
+class PInstrumentationOverlay(QWidget):
+    """
+    Shows the durations of the last calls of the hot paths of a
+    `PInstrumentation` over its parent widget, and the stalls.
+    """
+
+    # * time between two repaints, in ms
+    REFRESH_INTERVAL = 250
+    BACKGROUND = QColor(0, 0, 0, 180)
+
+    def __init__(self, instrumentation, parent) -> None:
+        super().__init__(parent)
+
+        self.instrumentation = instrumentation
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setFont(globals.font(point_size=9))
+
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(self.REFRESH_INTERVAL)
+        self._refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self._refresh_timer.start()
+        self.refresh()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._refresh_timer.stop()
+        super().hideEvent(event)
+
+    def lines(self):
+        """The text shown, a line per hot path."""
+        lines = ["name  last  p50  p95  max (ms)"]
+        for name, histogram in sorted(self.instrumentation.histograms.items()):
+            if not histogram.count:
+                continue
+            last = histogram.recent[-1] if histogram.recent else 0.0
+            lines.append(
+                f"{name}  {last * 1000:.2f}  {histogram.percentile(0.5) * 1000:.2f}"
+                f"  {histogram.percentile(0.95) * 1000:.2f}"
+                f"  {histogram.max * 1000:.2f}"
+            )
+        stalls = self.instrumentation.stalls
+        if stalls:
+            at, duration = stalls[-1]
+            lines.append(
+                f"{len(stalls)} stalls, last {duration * 1000:.0f}ms at {at:.1f}s"
+            )
+        return lines
+
+    def refresh(self):
+        # * in the top right corner of the parent, as big as the text
+        metrics = self.fontMetrics()
+        lines = self.lines()
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 16
+        height = metrics.lineSpacing() * len(lines) + 8
+        parent = self.parentWidget()
+        self.setGeometry(parent.width() - width - 8, 8, width, height)
+        self.raise_()
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.BACKGROUND)
+        painter.setPen(QColor("#FFFFFF"))
+        line_spacing = self.fontMetrics().lineSpacing()
+        for index, line in enumerate(self.lines()):
+            painter.drawText(
+                QRectF(8, 4 + index * line_spacing, self.width() - 8, line_spacing),
+                Qt.AlignLeft | Qt.AlignVCenter,
+                line,
+            )
+        painter.end()
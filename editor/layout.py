@@ -0,0 +1,348 @@
+from code_generator.flowchart import NODE_SPACING
+from editor.lazy_import import lazy_import
+
+# * numpy is optional, layers are then packed in source order, it is loaded
+# * on the first layout
+numpy = lazy_import("numpy")
+
+# * crossings between up to this many edges are counted by comparing all pairs
+CROSSING_MATRIX_SIZE = 512
+
+
+class PLayeredLayout:
+    """
+    Sugiyama style layered layout of the flowchart in a `PScene`.
+
+    1. Edges going up in source order (loops, continue) are reversed, which
+       leaves an acyclic graph.
+    2. Nodes get the rank of the longest path reaching them, edges spanning
+       several ranks get one dummy node per crossed rank.
+    3. Crossings are reduced by sweeps sorting each rank by the barycenter
+       of its neighbours in the rank above (down) or below (up). The new order
+       is kept when it lowers the crossings on both sides of the rank.
+    4. Nodes are pulled towards the centers of their neighbours, and pushed
+       apart to ``node_spacing``, keeping the order of their rank.
+
+    Steps 3 and 4 use numpy, step 4 works on every rank at once. Without
+    numpy the ranks are packed in source order, centered on x = 0.
+    """
+
+    def __init__(
+        self,
+        layer_spacing=NODE_SPACING * 2,
+        node_spacing=NODE_SPACING,
+        order_sweeps=4,
+        coordinate_sweeps=8,
+    ) -> None:
+        self.layer_spacing = layer_spacing
+        self.node_spacing = node_spacing
+        self.order_sweeps = order_sweeps
+        self.coordinate_sweeps = coordinate_sweeps
+
+    def apply(self, scene, nodes=None, x=0.0, y=0.0):
+        """
+        Lay out ``nodes`` (the whole graph when None) from ``(x, y)`` and move
+        them in one batch. The other nodes keep their position.
+        """
+        nodes, xs, ys = self.layout(scene, nodes)
+        scene.move_nodes(
+            nodes, [value + x for value in xs], [value + y for value in ys]
+        )
+        return nodes
+
+    def layout(self, scene, nodes=None):
+        """
+        Return ``(nodes, xs, ys)``, the top left corners of ``nodes`` (every
+        node of the scene when None) laid out from ``(0, 0)``. Only the edges
+        between the given nodes are taken into account.
+        """
+        store = scene.node_store
+        nodes = list(store if nodes is None else nodes)
+        if not nodes:
+            return nodes, [], []
+
+        index = {node: position for position, node in enumerate(nodes)}
+        sources, targets = [], []
+        edge_store = scene.edge_store
+        edges = set()
+        for node in nodes:
+            edges.update(scene.node_edges[node])
+        for edge in edges:
+            source, target = edge_store.ends(edge)
+            if source in index and target in index:
+                sources.append(index[source])
+                targets.append(index[target])
+
+        widths = [store.width[node] for node in nodes]
+        heights = [store.height[node] for node in nodes]
+        # * source order, the ids break the ties
+        keys = [(store.first_line[node], node) for node in nodes]
+
+        xs, ys = self.arrange(keys, sources, targets, widths, heights)
+        return nodes, xs, ys
+
+    def arrange(self, keys, sources, targets, widths, heights):
+        """
+        Return ``(xs, ys)``, the layout of a graph given by its nodes sort
+        ``keys`` and sizes, and its edges as positions into them. Lets a graph
+        be laid out before it is added to a scene.
+        """
+        if not keys:
+            return [], []
+
+        ranks, uppers, lowers = _ranks(keys, sources, targets)
+        if numpy is None:
+            xs, ys = self._pack(keys, ranks, widths, heights)
+        else:
+            xs, ys = self._place(keys, ranks, uppers, lowers, widths, heights)
+        return xs, ys
+
+    def _pack(self, keys, ranks, widths, heights):
+        rank_count = max(ranks) + 1
+        members = [[] for _ in range(rank_count)]
+        for node in sorted(range(len(keys)), key=keys.__getitem__):
+            members[ranks[node]].append(node)
+
+        xs, ys = [0.0] * len(keys), [0.0] * len(keys)
+        top = 0.0
+        for rank_nodes in members:
+            total = sum(widths[node] for node in rank_nodes)
+            total += self.node_spacing * (len(rank_nodes) - 1)
+            height = max((heights[node] for node in rank_nodes), default=0.0)
+
+            left = -total / 2
+            for node in rank_nodes:
+                xs[node] = left
+                ys[node] = top + (height - heights[node]) / 2
+                left += widths[node] + self.node_spacing
+            top += height + self.layer_spacing
+        return xs, ys
+
+    def _place(self, keys, ranks, uppers, lowers, widths, heights):
+        count = len(keys)
+        order = sorted(range(count), key=keys.__getitem__)
+        source_order = numpy.empty(count, dtype=numpy.float64)
+        source_order[order] = numpy.arange(count)
+
+        rank = numpy.asarray(ranks, dtype=numpy.int64)
+        upper = numpy.asarray(uppers, dtype=numpy.int64)
+        lower = numpy.asarray(lowers, dtype=numpy.int64)
+
+        # * long edges become chains of dummy nodes, one per crossed rank
+        span = rank[lower] - rank[upper]
+        long_edges = span > 1
+        dummy_counts = span[long_edges] - 1
+        dummy_total = int(dummy_counts.sum())
+        if dummy_total:
+            first_dummy = numpy.cumsum(dummy_counts) - dummy_counts
+            owner = numpy.repeat(numpy.arange(len(dummy_counts)), dummy_counts)
+            step = numpy.arange(dummy_total) - first_dummy[owner]
+            long_upper, long_lower = upper[long_edges], lower[long_edges]
+
+            dummies = numpy.arange(count, count + dummy_total)
+            above = numpy.concatenate(([0], dummies[:-1]))
+            above[first_dummy] = long_upper
+            last_dummy = first_dummy + dummy_counts - 1
+
+            upper = numpy.concatenate(
+                (upper[~long_edges], above, dummies[last_dummy])
+            )
+            lower = numpy.concatenate((lower[~long_edges], dummies, long_lower))
+            rank = numpy.concatenate((rank, rank[long_upper][owner] + step + 1))
+            # * dummies start next to the node their edge comes from
+            source_order = numpy.concatenate(
+                (source_order, source_order[long_upper][owner] + 0.5)
+            )
+
+        total = count + dummy_total
+        width = numpy.zeros(total)
+        width[:count] = widths
+        height = numpy.zeros(total)
+        height[:count] = heights
+
+        rank_count = int(rank.max()) + 1
+        rank_start = numpy.cumsum(numpy.bincount(rank, minlength=rank_count))
+        rank_start = numpy.concatenate(([0], rank_start[:-1]))
+
+        position = self._order(rank, rank_start, source_order, upper, lower)
+        x = self._coordinates(rank, rank_start, position, upper, lower, width)
+
+        rank_height = numpy.zeros(rank_count)
+        numpy.maximum.at(rank_height, rank, height)
+        rank_top = numpy.cumsum(rank_height + self.layer_spacing)
+        rank_top = rank_top - rank_height - self.layer_spacing
+        y = rank_top[rank] + (rank_height[rank] - height) / 2
+
+        x -= x[:count].min()
+        return x[:count].tolist(), y[:count].tolist()
+
+    def _order(self, rank, rank_start, initial, upper, lower):
+        """Return the position of every node in its rank."""
+        total = len(rank)
+        rank_count = len(rank_start)
+        sorted_nodes = numpy.lexsort((initial, rank))
+        rank_end = numpy.append(rank_start[1:], total)
+        members = [
+            sorted_nodes[first:last] for first, last in zip(rank_start, rank_end)
+        ]
+        position = numpy.empty(total, dtype=numpy.int64)
+        for rank_nodes in members:
+            position[rank_nodes] = numpy.arange(len(rank_nodes))
+
+        # * every edge now joins two consecutive ranks, grouped by upper rank
+        by_gap = numpy.argsort(rank[upper], kind="stable")
+        upper, lower = upper[by_gap], lower[by_gap]
+        gap_start = numpy.searchsorted(rank[upper], numpy.arange(rank_count + 1))
+
+        for sweep in range(self.order_sweeps):
+            # * downwards each rank follows the one above it, then upwards
+            downwards = sweep % 2 == 0
+            if downwards:
+                ranks = range(1, rank_count)
+            else:
+                ranks = range(rank_count - 2, -1, -1)
+
+            for moving_rank in ranks:
+                first_above = gap_start[moving_rank - 1] if moving_rank else 0
+                above = slice(first_above, gap_start[moving_rank])
+                below = slice(gap_start[moving_rank], gap_start[moving_rank + 1])
+                if downwards:
+                    moving, fixed = lower[above], upper[above]
+                else:
+                    moving, fixed = upper[below], lower[below]
+                if not len(moving):
+                    continue
+
+                rank_nodes = members[moving_rank]
+                size = len(rank_nodes)
+                slots = position[moving]
+                weights = numpy.bincount(slots, minlength=size)
+                sums = numpy.bincount(slots, position[fixed], minlength=size)
+                # * nodes without neighbours on that side keep their place
+                barycenter = numpy.where(
+                    weights > 0, sums / numpy.maximum(weights, 1), numpy.arange(size)
+                )
+                new_order = numpy.argsort(barycenter, kind="stable")
+                new_slots = numpy.empty(size, dtype=numpy.int64)
+                new_slots[new_order] = numpy.arange(size)
+
+                # * kept only if the crossings on both sides of the rank drop
+                above_upper = position[upper[above]]
+                above_lower = position[lower[above]]
+                below_upper = position[upper[below]]
+                below_lower = position[lower[below]]
+                before = _crossings(above_upper, above_lower) + _crossings(
+                    below_upper, below_lower
+                )
+                after = _crossings(above_upper, new_slots[above_lower]) + _crossings(
+                    new_slots[below_upper], below_lower
+                )
+                if after < before:
+                    rank_nodes = members[moving_rank] = rank_nodes[new_order]
+                    position[rank_nodes] = numpy.arange(size)
+        return position
+
+    def _coordinates(self, rank, rank_start, position, upper, lower, width):
+        """Return the left x of every node, its rank order is kept."""
+        total = len(rank)
+        # * nodes in rank order
+        sorted_nodes = numpy.lexsort((position, rank))
+        sorted_rank = rank[sorted_nodes]
+        sorted_width = width[sorted_nodes]
+
+        # * offset of each node from the first one of its rank when packed
+        advance = sorted_width + self.node_spacing
+        packed = numpy.cumsum(advance) - advance
+        packed -= packed[rank_start[sorted_rank]]
+
+        x = numpy.empty(total)
+        x[sorted_nodes] = packed - (packed + sorted_width)[
+            numpy.searchsorted(sorted_rank, sorted_rank, side="right") - 1
+        ] / 2
+
+        both_sources = numpy.concatenate((upper, lower))
+        both_targets = numpy.concatenate((lower, upper))
+        for sweep in range(self.coordinate_sweeps):
+            # * towards the neighbours above, below, and both
+            if sweep % 3 == 0:
+                moving, fixed = lower, upper
+            elif sweep % 3 == 1:
+                moving, fixed = upper, lower
+            else:
+                moving, fixed = both_targets, both_sources
+            center = x + width / 2
+            weights = numpy.bincount(moving, minlength=total)
+            sums = numpy.bincount(moving, center[fixed], minlength=total)
+            wanted = numpy.where(
+                weights > 0, sums / numpy.maximum(weights, 1) - width / 2, x
+            )
+
+            # * x - packed has to be non decreasing in each rank: the left
+            # * and right passes only move nodes right and left, the average
+            # * of both is kept
+            free = wanted[sorted_nodes] - packed
+            spread = float(free.max() - free.min()) + 1.0
+            lift = sorted_rank * spread
+            left = numpy.maximum.accumulate(free + lift) - lift
+            right = numpy.minimum.accumulate((free + lift)[::-1])[::-1] - lift
+            x[sorted_nodes] = (left + right) / 2 + packed
+        return x
+
+
+def _ranks(keys, sources, targets):
+    """
+    Return the rank of every node, and the edges going down as ``(uppers,
+    lowers)``. An edge going up in source order is reversed, self loops are
+    dropped.
+    """
+    count = len(keys)
+    order = sorted(range(count), key=keys.__getitem__)
+    place = [0] * count
+    for position, node in enumerate(order):
+        place[node] = position
+
+    uppers, lowers = [], []
+    for source, target in zip(sources, targets):
+        if place[source] < place[target]:
+            uppers.append(source)
+            lowers.append(target)
+        elif place[source] > place[target]:
+            uppers.append(target)
+            lowers.append(source)
+
+    # * longest path, the edges are relaxed in the order of their upper node
+    ranks = [0] * count
+    for edge in sorted(range(len(uppers)), key=lambda edge: place[uppers[edge]]):
+        upper, lower = uppers[edge], lowers[edge]
+        if ranks[lower] <= ranks[upper]:
+            ranks[lower] = ranks[upper] + 1
+    return ranks, uppers, lowers
+
+
+def _crossings(upper_slots, lower_slots):
+    """Number of crossings between the edges joining two ranks."""
+    count = len(upper_slots)
+    if count <= CROSSING_MATRIX_SIZE:
+        upper_order = upper_slots[:, None] - upper_slots[None, :]
+        lower_order = lower_slots[:, None] - lower_slots[None, :]
+        return int(numpy.count_nonzero(upper_order * lower_order < 0)) // 2
+
+    # * inversions of the lower ends taken in the order of the upper ends,
+    # * counted with a binary indexed tree
+    lower_ends = lower_slots[numpy.lexsort((lower_slots, upper_slots))].tolist()
+    size = max(lower_ends) + 1
+    tree = [0] * (size + 1)
+    crossings = 0
+    for seen, slot in enumerate(lower_ends):
+        # * ends seen so far at or left of slot
+        index, not_greater = slot + 1, 0
+        while index > 0:
+            not_greater += tree[index]
+            index -= index & -index
+        crossings += seen - not_greater
+
+        index = slot + 1
+        while index <= size:
+            tree[index] += 1
+            index += index & -index
+    return crossings
@@ -0,0 +1,100 @@
+class PLineIndex:
+    """
+    Index of the source line spans of the nodes of a flowchart, both ways.
+
+    The lines are cut in buckets of ``bucket_lines`` lines, and every node is
+    stored in each bucket its span ``[first, last]`` overlaps, like the cells
+    of `PSpatialIndex` in one dimension. Finding the nodes of a line only
+    looks at one bucket, and changing the span of a node only touches the
+    buckets it leaves or enters, so shifting the lines of a node by a few
+    lines is usually free.
+    """
+
+    def __init__(self, bucket_lines=32) -> None:
+        self.bucket_lines = bucket_lines
+        # * bucket -> set of nodes
+        self._buckets = {}
+        # * node -> (first, last), the reverse map
+        self._spans = {}
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __contains__(self, node):
+        return node in self._spans
+
+    def lines(self, node):
+        """Return the ``(first, last)`` lines of ``node``."""
+        return self._spans[node]
+
+    def insert(self, node, first, last):
+        if node in self._spans:
+            self.move(node, first, last)
+            return
+        self._spans[node] = (first, last)
+        buckets = self._buckets
+        for bucket in self._bucket_range(first, last):
+            nodes = buckets.get(bucket)
+            if nodes is None:
+                nodes = buckets[bucket] = set()
+            nodes.add(node)
+
+    def remove(self, node):
+        first, last = self._spans.pop(node)
+        buckets = self._buckets
+        for bucket in self._bucket_range(first, last):
+            nodes = buckets[bucket]
+            nodes.discard(node)
+            if not nodes:
+                del buckets[bucket]
+
+    def move(self, node, first, last):
+        """Change the span of a node already in the index."""
+        old_first, old_last = self._spans[node]
+        old_range = self._bucket_range(old_first, old_last)
+        new_range = self._bucket_range(first, last)
+        self._spans[node] = (first, last)
+        if old_range == new_range:
+            return
+
+        buckets = self._buckets
+        for bucket in old_range:
+            if bucket not in new_range:
+                nodes = buckets[bucket]
+                nodes.discard(node)
+                if not nodes:
+                    del buckets[bucket]
+        for bucket in new_range:
+            if bucket not in old_range:
+                nodes = buckets.get(bucket)
+                if nodes is None:
+                    nodes = buckets[bucket] = set()
+                nodes.add(node)
+
+    def at(self, line):
+        """Return the nodes whose span contains ``line``."""
+        spans = self._spans
+        found = []
+        for node in self._buckets.get(line // self.bucket_lines, ()):
+            first, last = spans[node]
+            if first <= line <= last:
+                found.append(node)
+        return found
+
+    def within(self, first, last):
+        """Return the nodes whose span is inside ``[first, last]``."""
+        spans = self._spans
+        found = set()
+        for bucket in self._bucket_range(first, last):
+            for node in self._buckets.get(bucket, ()):
+                node_first, node_last = spans[node]
+                if first <= node_first and node_last <= last:
+                    found.add(node)
+        return found
+
+    def clear(self):
+        self._buckets.clear()
+        self._spans.clear()
+
+    def _bucket_range(self, first, last):
+        return range(first // self.bucket_lines, last // self.bucket_lines + 1)
@@ -0,0 +1,54 @@
+import codecs
+import mmap
+import os
+
+# * files bigger than this are read through a memory map
+MMAP_SIZE = 1024 * 1024
+
+
+def read_source(path, encoding="utf-8"):
+    """
+    Read and decode a source file in one pass, with universal newlines.
+    Big files are memory mapped, so they are decoded without an extra copy.
+    """
+    with open(path, "rb") as source_file:
+        if os.fstat(source_file.fileno()).st_size < MMAP_SIZE:
+            text = source_file.read().decode(encoding, errors="replace")
+        else:
+            with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                text = str(mapped, encoding, errors="replace")
+
+    return normalize_newlines(text)
+
+
+def iter_source(path, chunk_size=1024 * 1024, encoding="utf-8"):
+    """
+    Yield the decoded text of a source file in chunks of about
+    ``chunk_size`` bytes, every chunk but the last one ends with a newline.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+
+    with open(path, "rb") as source_file:
+        if os.fstat(source_file.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, len(mapped), chunk_size):
+                text = pending + decoder.decode(mapped[offset : offset + chunk_size])
+
+                # * a "\r\n" pair may be split between two chunks
+                cut = text.rfind("\n") + 1
+                pending = text[cut:]
+                if cut:
+                    yield normalize_newlines(text[:cut])
+
+    text = pending + decoder.decode(b"", final=True)
+    if text:
+        yield normalize_newlines(text)
+
+
+def normalize_newlines(text):
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
@@ -0,0 +1,187 @@
+import array
+import bisect
+import hashlib
+from itertools import accumulate, islice
+import mmap
+import os
+import struct
+
+from editor.lazy_import import lazy_import
+
+# * optional, the line offsets are found ~10 times faster with it
+numpy = lazy_import("numpy")
+
+# * the line offsets indexes, kept between the sessions
+INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "proi", "line_index")
+# * bytes scanned for newlines per step of `build_line_index`
+SCAN_CHUNK_SIZE = 16 * 1024 * 1024
+
+MAGIC = b"PROILIX1"
+# * magic, size and modification time of the file, line count
+HEADER = struct.Struct("=8sQqQ")
+OFFSET = struct.Struct("=Q")
+
+
+def index_path(path, index_dir=INDEX_DIR):
+    """Path of the line offsets index of the file at ``path``."""
+    key = os.path.realpath(path).encode("utf-8", "surrogateescape")
+    return os.path.join(index_dir, hashlib.sha1(key).hexdigest() + ".lines")
+
+
+def build_line_index(path, index_file_path, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Write the offsets of the starts of the lines of the file at ``path`` to
+    ``index_file_path``, followed by the size of the file + 1, as if it ended
+    with a newline. The file is scanned in chunks of ``chunk_size`` bytes and
+    the offsets are written as they are found, so the memory used does not
+    depend on the size of the file. A generator, it yields the fraction of
+    the file scanned after each chunk.
+    """
+    os.makedirs(os.path.dirname(index_file_path), exist_ok=True)
+    temporary_path = index_file_path + ".tmp"
+
+    with open(path, "rb") as source_file, open(temporary_path, "wb") as index_file:
+        status = os.fstat(source_file.fileno())
+        size = status.st_size
+        index_file.write(HEADER.pack(MAGIC, size, status.st_mtime_ns, 0))
+        array.array("Q", [0]).tofile(index_file)
+        line_count = 1
+
+        if size:
+            with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(0, size, chunk_size):
+                    chunk = mapped[offset : offset + chunk_size]
+                    line_count += _write_line_starts(chunk, offset, index_file)
+                    yield min(offset + chunk_size, size) / size
+
+        array.array("Q", [size + 1]).tofile(index_file)
+        index_file.seek(0)
+        index_file.write(HEADER.pack(MAGIC, size, status.st_mtime_ns, line_count))
+
+    os.replace(temporary_path, index_file_path)
+
+
+def _write_line_starts(chunk, base, index_file):
+    """Write the offsets following the newlines of ``chunk``, return their count."""
+    if numpy is not None:
+        starts = numpy.flatnonzero(numpy.frombuffer(chunk, numpy.uint8) == 10)
+        starts += base + 1
+        starts.astype(numpy.uint64).tofile(index_file)
+        return len(starts)
+
+    # * the cumulated lengths of the lines, each + 1 for its newline
+    lines = chunk.split(b"\n")
+    lengths = map((1).__add__, map(len, islice(lines, len(lines) - 1)))
+    starts = array.array("Q", islice(accumulate(lengths, initial=base), 1, None))
+    starts.tofile(index_file)
+    return len(starts)
+
+
+class PMappedSource:
+    """
+    A source file kept memory mapped with the offsets of its lines, so any
+    range of lines is read without reading the lines before it.
+
+    The offsets come from the index at `index_path`, which is memory mapped
+    as well and built by `build_line_index` when it is missing or older than
+    the file. Only the pages of the lines read are loaded, whatever the size
+    of the file.
+    """
+
+    def __init__(self, path, index_file_path=None, encoding="utf-8") -> None:
+        self.path = path
+        self.encoding = encoding
+        if index_file_path is None:
+            index_file_path = index_path(path)
+
+        self._source_file = open(path, "rb")
+        self._index_file = open(index_file_path, "rb")
+        size = os.fstat(self._source_file.fileno()).st_size
+        self._source = b""
+        if size:
+            self._source = mmap.mmap(
+                self._source_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.line_count = HEADER.unpack_from(self._index)[3]
+        # * the offsets as a sequence, bisected by `line_of`
+        self._offsets = memoryview(self._index)[HEADER.size :].cast("Q")
+
+    def __len__(self):
+        return self.line_count
+
+    @staticmethod
+    def is_index_valid(path, index_file_path):
+        """Whether the index at ``index_file_path`` is the one of ``path`` now."""
+        try:
+            status = os.stat(path)
+            with open(index_file_path, "rb") as index_file:
+                header = index_file.read(HEADER.size)
+                index_size = os.fstat(index_file.fileno()).st_size
+        except OSError:
+            return False
+        if len(header) != HEADER.size:
+            return False
+        magic, size, mtime_ns, line_count = HEADER.unpack(header)
+        return (
+            magic == MAGIC
+            and size == status.st_size
+            and mtime_ns == status.st_mtime_ns
+            and index_size == HEADER.size + OFFSET.size * (line_count + 1)
+        )
+
+    def offset(self, line):
+        """Offset in the file of the start of the (0 based) ``line``."""
+        return OFFSET.unpack_from(self._index, HEADER.size + OFFSET.size * line)[0]
+
+    def text(self, first, last):
+        """Return the decoded lines ``[first, last)``, without the last newline."""
+        first = max(first, 0)
+        last = min(last, self.line_count)
+        if first >= last:
+            return ""
+        data = self._source[self.offset(first) : self.offset(last) - 1]
+        text = str(data, self.encoding, errors="replace")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+            if text.endswith("\r"):
+                text = text[:-1]
+        return text
+
+    def line_of(self, offset):
+        """Return the (0 based) line holding the byte at ``offset``."""
+        return bisect.bisect_right(self._offsets, offset, 0, self.line_count) - 1
+
+    def lines_containing(self, needles, first, last):
+        """
+        Yield in order the (0 based) lines in ``[first, last)`` containing one
+        of the ``needles`` strings. The bytes are searched with `mmap.find`,
+        only the lines found are decoded by the caller.
+        """
+        first = max(first, 0)
+        last = min(last, self.line_count)
+        if first >= last or not self._source:
+            return
+        source = self._source
+        end = self.offset(last) - 1
+        needles = [needle.encode(self.encoding) for needle in needles]
+        # * next offset of each needle, searched again once it is passed
+        found = [source.find(needle, self.offset(first), end) for needle in needles]
+        while True:
+            offsets = [offset for offset in found if offset >= 0]
+            if not offsets:
+                return
+            line = self.line_of(min(offsets))
+            yield line
+            start = self.offset(line + 1)
+            for number, offset in enumerate(found):
+                if 0 <= offset < start:
+                    found[number] = source.find(needles[number], start, end)
+
+    def close(self):
+        if self._source:
+            self._source.close()
+        self._offsets.release()
+        self._index.close()
+        self._source_file.close()
+        self._index_file.close()
@@ -0,0 +1,198 @@
+from editor.spatial_index import PSpatialIndex
+
+
+class PEdgeRouter:
+    """
+    Orthogonal routes of the edges of a `PScene`, around the nodes and with
+    their bends on the grid.
+
+    An edge leaves its source from the bottom and enters its target from the
+    top. Going down, its horizontal run is just above the target. When that
+    route is blocked, or for an edge going up (a loop), it runs in the gaps
+    below the source and above the target, and through a channel right of the
+    nodes in between.
+
+    Routes are computed when they are asked for and cached, ``on_route`` is
+    called with the edge and the bounding rect of each new route. Their
+    segments are kept in a spatial index, so when nodes move only the edges
+    of these nodes and the routes passing near them are dropped.
+    """
+
+    GRID_SIZE = 20
+    # * initial width of the band searched for a channel
+    BAND_WIDTH = 320
+
+    def __init__(self, scene, grid_size=GRID_SIZE, on_route=None) -> None:
+        self.scene = scene
+        self.grid_size = grid_size
+        self.on_route = on_route
+
+        # * edge -> tuple of the (x, y) points of its route
+        self.routes = {}
+        # * (edge, segment number) -> rect of the segment
+        self.segments = PSpatialIndex()
+
+    def route(self, edge):
+        """Return the points of the route of ``edge``, from source to target."""
+        points = self.routes.get(edge)
+        if points is None:
+            points = self.routes[edge] = self._route(edge)
+            for number, (start, end) in enumerate(zip(points, points[1:])):
+                self.segments.insert((edge, number), _segment_rect(start, end))
+            if self.on_route is not None:
+                self.on_route(edge, self.rect(edge))
+        return points
+
+    def rect(self, edge):
+        """Return the bounding rect ``(x, y, width, height)`` of the route."""
+        points = self.route(edge)
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        return (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+    def edges_near(self, rects):
+        """
+        Return the cached edges whose route passes within a grid step of one
+        of ``rects``.
+        """
+        grid = self.grid_size
+        edges = set()
+        for x, y, width, height in rects:
+            found = self.segments.query(
+                (x - grid, y - grid, width + 2 * grid, height + 2 * grid)
+            )
+            edges.update(edge for edge, _ in found)
+        return edges
+
+    def invalidate(self, edges):
+        """Drop the routes of ``edges``, they are routed again when asked for."""
+        for edge in edges:
+            points = self.routes.pop(edge, None)
+            if points is not None:
+                for number in range(len(points) - 1):
+                    self.segments.remove((edge, number))
+
+    def clear(self):
+        self.routes.clear()
+        self.segments.clear()
+
+    def _route(self, edge):
+        scene = self.scene
+        source, target = scene.edge_store.ends(edge)
+        source_x, source_y, source_width, source_height = scene.node_store.rect(
+            source
+        )
+        target_x, target_y, target_width, _ = scene.node_store.rect(target)
+        ends = (source, target)
+
+        source_bottom = source_y + source_height
+        start_x = self._anchor(source_x, source_width)
+        end_x = self._anchor(target_x, target_width)
+        start, end = (start_x, source_bottom), (end_x, target_y)
+
+        if source_bottom < target_y:
+            if start_x == end_x:
+                points = (start, end)
+            else:
+                # * the horizontal run is just above the target
+                run_y = self._snap(target_y - self.grid_size / 2)
+                if not source_bottom < run_y < target_y:
+                    run_y = (source_bottom + target_y) / 2
+                points = (start, (start_x, run_y), (end_x, run_y), end)
+            if not self._blocked(points, ends):
+                return points
+
+        # * around the nodes in the way, through a channel on their right,
+        # * leaving below the source and entering above the target
+        half = self.grid_size / 2
+        leave_y = self._snap(source_bottom + half)
+        if not source_bottom < leave_y <= source_bottom + half:
+            leave_y = source_bottom + half
+        enter_y = self._snap(target_y - half)
+        if not target_y - half <= enter_y < target_y:
+            enter_y = target_y - half
+        if enter_y < leave_y < target_y:
+            # * ends too close for both runs
+            leave_y = enter_y = (source_bottom + target_y) / 2
+
+        channel_x = self._channel(
+            max(start_x, end_x), min(leave_y, enter_y), max(leave_y, enter_y), ends
+        )
+        return (
+            start,
+            (start_x, leave_y),
+            (channel_x, leave_y),
+            (channel_x, enter_y),
+            (end_x, enter_y),
+            end,
+        )
+
+    def _channel(self, right, top, bottom, ignored):
+        """
+        Return the first grid line right of ``right`` where a vertical run
+        from ``top`` to ``bottom`` is clear of the nodes.
+        """
+        nodes = self.scene.nodes
+        half = self.grid_size / 2
+        channel_x = left = self._snap_up(right + half)
+        # * a band from the first candidate, widened until the channel is in it
+        width = self.BAND_WIDTH
+        while True:
+            blocking = sorted(
+                rect
+                for rect in (
+                    nodes.rect(node)
+                    for node in nodes.query((left, top, width, bottom - top))
+                    if node not in ignored
+                )
+                if top < rect[1] + rect[3] and rect[1] < bottom
+            )
+            # * by left side, a node can only push the channel further right
+            for x, _, node_width, _ in blocking:
+                if channel_x <= x:
+                    break
+                if channel_x < x + node_width:
+                    channel_x = self._snap_up(x + node_width + half)
+            if channel_x <= left + width:
+                return channel_x
+            width *= 2
+
+    def _blocked(self, points, ignored):
+        """Whether a segment of the route goes through a node, other than its ends."""
+        nodes = self.scene.nodes
+        for start, end in zip(points, points[1:]):
+            segment = _segment_rect(start, end)
+            for node in nodes.query(segment):
+                if node not in ignored and _crosses(segment, nodes.rect(node)):
+                    return True
+        return False
+
+    def _anchor(self, x, width):
+        """x of the grid line closest to the middle of ``[x, x + width]``."""
+        middle = x + width / 2
+        snapped = self._snap(middle)
+        return snapped if x < snapped < x + width else middle
+
+    def _snap(self, value):
+        return round(value / self.grid_size) * self.grid_size
+
+    def _snap_up(self, value):
+        grid = self.grid_size
+        return -(-value // grid) * grid
+
+
+def _segment_rect(start, end):
+    (x1, y1), (x2, y2) = start, end
+    return (min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1))
+
+
+def _crosses(segment, rect):
+    """Whether the segment rect goes through the inside of ``rect``."""
+    x, y, width, height = segment
+    rect_x, rect_y, rect_width, rect_height = rect
+    return (
+        x < rect_x + rect_width
+        and rect_x < x + width
+        and y < rect_y + rect_height
+        and rect_y < y + height
+    )
@@ -0,0 +1,173 @@
+import bisect
+from itertools import accumulate
+import re
+
+
+def compile_pattern(text, regex=False, case_sensitive=False):
+    """
+    Return what `PSearchIndex` searches for ``text``: the text itself for a
+    case sensitive plain search, found with `str.find`, a compiled regular
+    expression otherwise. Raises `re.error` for an invalid ``regex``.
+    """
+    if not regex and case_sensitive:
+        return text
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile(text if regex else re.escape(text), flags)
+
+
+def iter_matches(text, pattern, offset=0):
+    """
+    Yield the ``(start, end)`` of the matches of ``pattern`` in ``text``,
+    leaving out the empty ones and, like `QTextDocument.find`, the ones
+    spanning several lines.
+    """
+    if isinstance(pattern, str):
+        find = text.find
+        length = len(pattern)
+        start = find(pattern, offset)
+        while start >= 0:
+            yield start, start + length
+            start = find(pattern, start + length)
+        return
+
+    find_newline = text.find
+    for match in pattern.finditer(text, offset):
+        start, end = match.span()
+        if end > start and find_newline("\n", start, end) < 0:
+            yield start, end
+
+
+class PSearchIndex:
+    """
+    Lines of a document, kept for searching it.
+
+    The lines are cut in chunks of about ``chunk_lines`` lines, and the text
+    of each chunk is joined once with newlines, so a search runs `str.find`
+    or a regular expression over a few big strings instead of walking the
+    blocks of the document, and the line of a match is found by bisecting
+    the starts of the lines of its chunk. `replace_lines` only rebuilds the
+    chunks an edit touches.
+    """
+
+    def __init__(self, chunk_lines=256) -> None:
+        self.chunk_lines = chunk_lines
+        self.set_lines([""])
+
+    def __len__(self):
+        return self.line_count
+
+    def set_lines(self, lines):
+        size = self.chunk_lines
+        self._chunks = [lines[i : i + size] for i in range(0, len(lines), size)]
+        if not self._chunks:
+            self._chunks = [[""]]
+        # * joined text and line starts of the chunks, None until needed
+        self._texts = [None] * len(self._chunks)
+        self._starts = [None] * len(self._chunks)
+        # * first line of each chunk
+        self._firsts = []
+        self._update_firsts(0)
+
+    def line(self, line):
+        chunk = self._chunk_of(line)
+        return self._chunks[chunk][line - self._firsts[chunk]]
+
+    def replace_lines(self, first, count, lines):
+        """Replace the ``count`` lines from ``first`` by ``lines``."""
+        start_chunk = self._chunk_of(first)
+        end_chunk = self._chunk_of(first + count - 1) if count else start_chunk
+        start_line = self._firsts[start_chunk]
+
+        merged = []
+        for chunk in self._chunks[start_chunk : end_chunk + 1]:
+            merged.extend(chunk)
+        merged[first - start_line : first - start_line + count] = lines
+        size = self.chunk_lines
+        if len(merged) <= 2 * size:
+            chunks = [merged] if merged else []
+        else:
+            chunks = [merged[i : i + size] for i in range(0, len(merged), size)]
+
+        self._chunks[start_chunk : end_chunk + 1] = chunks
+        self._texts[start_chunk : end_chunk + 1] = [None] * len(chunks)
+        self._starts[start_chunk : end_chunk + 1] = [None] * len(chunks)
+        if not self._chunks:
+            self.set_lines([""])
+            return
+        self._update_firsts(start_chunk)
+
+    def chunks(self):
+        """Return the ``(first line, text)`` of the chunks, a snapshot."""
+        return [(first, self._text(chunk)) for chunk, first in enumerate(self._firsts)]
+
+    def find(self, pattern, line, column, backward=False):
+        """
+        Return the ``(line, column, length)`` of the first match of
+        ``pattern`` starting at or after ``(line, column)``, or the last one
+        starting before it when ``backward``, None when there is none.
+        """
+        chunk = self._chunk_of(line)
+        offset = self._line_starts(chunk)[line - self._firsts[chunk]] + column
+        if backward:
+            chunks = range(chunk, -1, -1)
+        else:
+            chunks = range(chunk, len(self._chunks))
+
+        for index in chunks:
+            text = self._text(index)
+            if index != chunk:
+                offset = len(text) + 1 if backward else 0
+            found = self._search(text, pattern, offset, backward)
+            if found is not None:
+                start, end = found
+                starts = self._line_starts(index)
+                number = bisect.bisect_right(starts, start) - 1
+                return self._firsts[index] + number, start - starts[number], end - start
+        return None
+
+    @staticmethod
+    def _search(text, pattern, offset, backward):
+        if not backward:
+            return next(iter_matches(text, pattern, offset), None)
+
+        if isinstance(pattern, str):
+            # * the matches starting before ``offset``
+            start = text.rfind(pattern, 0, offset + len(pattern) - 1)
+            return None if start < 0 else (start, start + len(pattern))
+        found = None
+        for start, end in iter_matches(text, pattern):
+            if start >= offset:
+                break
+            found = (start, end)
+        return found
+
+    def _chunk_of(self, line):
+        line = min(max(line, 0), self.line_count - 1)
+        return bisect.bisect_right(self._firsts, line) - 1
+
+    def _text(self, chunk):
+        text = self._texts[chunk]
+        if text is None:
+            text = self._texts[chunk] = "\n".join(self._chunks[chunk])
+        return text
+
+    def _line_starts(self, chunk):
+        starts = self._starts[chunk]
+        if starts is None:
+            lines = self._chunks[chunk]
+            lengths = map((1).__add__, map(len, lines[:-1]))
+            starts = self._starts[chunk] = list(accumulate(lengths, initial=0))
+        return starts
+
+    def _update_firsts(self, start_chunk):
+        firsts = self._firsts
+        del firsts[start_chunk:]
+        line = 0
+        if start_chunk:
+            line = firsts[start_chunk - 1] + len(self._chunks[start_chunk - 1])
+        for chunk in self._chunks[start_chunk:]:
+            firsts.append(line)
+            line += len(chunk)
+        self.line_count = line
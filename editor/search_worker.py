@@ -0,0 +1,71 @@
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from editor.search_index import iter_matches
+
+
+class PSearchWorker(QObject):
+    """
+    Finds all the matches of a pattern in a snapshot of the chunks of a
+    `PSearchIndex` in a background thread.
+
+    The matches are sent in the order of the document, in batches of at most
+    `batch_size` matches and at least every `batch_interval` seconds, so
+    they show up while the rest of the document is searched. The search
+    stops after `max_matches` matches.
+    """
+
+    # * generation, [(line, column, length), ...]
+    matchesFound = pyqtSignal(int, object)
+    # * generation, whether the search stopped at `max_matches`
+    finished = pyqtSignal(int, bool)
+
+    def __init__(self, batch_size=1000, batch_interval=0.05, max_matches=100_000):
+        super().__init__()
+
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_matches = max_matches
+
+        # * written from the GUI thread, a job stops as soon as it is outdated
+        self.generation = 0
+
+    @pyqtSlot(int, object, object)
+    def search(self, generation, pattern, chunks):
+        batch = []
+        count = 0
+        sent = time.perf_counter()
+
+        for first_line, text in chunks:
+            if generation != self.generation:
+                return
+
+            line = first_line
+            line_start = position = 0
+            for start, end in iter_matches(text, pattern):
+                newlines = text.count("\n", position, start)
+                if newlines:
+                    line += newlines
+                    line_start = text.rfind("\n", position, start) + 1
+                position = start
+                batch.append((line, start - line_start, end - start))
+
+                count += 1
+                if count >= self.max_matches:
+                    self.matchesFound.emit(generation, batch)
+                    self.finished.emit(generation, True)
+                    return
+                if len(batch) >= self.batch_size:
+                    self.matchesFound.emit(generation, batch)
+                    batch = []
+                    sent = time.perf_counter()
+
+            if batch and time.perf_counter() - sent > self.batch_interval:
+                self.matchesFound.emit(generation, batch)
+                batch = []
+                sent = time.perf_counter()
+
+        if batch:
+            self.matchesFound.emit(generation, batch)
+        self.finished.emit(generation, False)
@@ -0,0 +1,199 @@
+import math
+
+
+class PSpatialIndex:
+    """
+    Uniform grid hash of the items of a scene.
+
+    Every item is stored with its bounding rect ``(x, y, width, height)`` in
+    each cell of ``cell_size`` scene units it overlaps, so inserting, moving
+    and removing an item costs the number of cells it covers, and a region
+    query only looks at the cells under the region.
+    """
+
+    def __init__(self, cell_size=256) -> None:
+        self.cell_size = cell_size
+        # * (column, row) -> set of items
+        self._cells = {}
+        # * item -> (rect, cell range)
+        self._items = {}
+        # * cell range ever occupied, it bounds the nearest item search
+        self._bounds = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def rect(self, item):
+        return self._items[item][0]
+
+    def insert(self, item, rect):
+        if item in self._items:
+            self.remove(item)
+
+        cell_range = self._cell_range(rect)
+        self._items[item] = (rect, cell_range)
+        self._grow_bounds(cell_range)
+
+        cells = self._cells
+        for cell in self._iter_cells(cell_range):
+            bucket = cells.get(cell)
+            if bucket is None:
+                bucket = cells[cell] = set()
+            bucket.add(item)
+
+    def remove(self, item):
+        _, cell_range = self._items.pop(item)
+
+        cells = self._cells
+        for cell in self._iter_cells(cell_range):
+            bucket = cells[cell]
+            bucket.discard(item)
+            if not bucket:
+                del cells[cell]
+
+    def move(self, item, rect):
+        """Update the bounding rect of an item already in the index."""
+        _, cell_range = self._items[item]
+        if self._cell_range(rect) == cell_range:
+            # * still in the same cells, only the rect changes
+            self._items[item] = (rect, cell_range)
+        else:
+            self.insert(item, rect)
+
+    def query(self, rect):
+        """Return the set of items whose bounding rect intersects ``rect``."""
+        x, y, width, height = rect
+        right, bottom = x + width, y + height
+        first_column, first_row, last_column, last_row = self._cell_range(rect)
+
+        cells = self._cells
+        cell_count = (last_column - first_column + 1) * (last_row - first_row + 1)
+        if cell_count > len(cells):
+            # * a huge region, walk the occupied cells instead
+            buckets = [
+                bucket
+                for (column, row), bucket in cells.items()
+                if first_column <= column <= last_column
+                and first_row <= row <= last_row
+            ]
+        else:
+            buckets = [
+                cells[cell]
+                for cell in self._iter_cells(
+                    (first_column, first_row, last_column, last_row)
+                )
+                if cell in cells
+            ]
+
+        items = self._items
+        found = set()
+        for bucket in buckets:
+            for item in bucket:
+                if item in found:
+                    continue
+                item_x, item_y, item_width, item_height = items[item][0]
+                if (
+                    item_x <= right
+                    and item_y <= bottom
+                    and item_x + item_width >= x
+                    and item_y + item_height >= y
+                ):
+                    found.add(item)
+        return found
+
+    def nearest(self, x, y, max_distance=math.inf):
+        """
+        Return the item whose bounding rect is the closest to the point
+        ``(x, y)``, or None if there is none within ``max_distance``.
+        """
+        if not self._items:
+            return None
+
+        cell_size = self.cell_size
+        column, row = int(x // cell_size), int(y // cell_size)
+        cells, items = self._cells, self._items
+
+        best, best_distance = None, max_distance
+        # * the farthest ring that can hold an item
+        first_column, first_row, last_column, last_row = self._bounds
+        max_ring = max(
+            abs(column - first_column),
+            abs(column - last_column),
+            abs(row - first_row),
+            abs(row - last_row),
+        )
+
+        for ring in range(max_ring + 1):
+            # * nothing in this ring can be closer than its inner border
+            if (ring - 1) * cell_size > best_distance:
+                break
+
+            for cell in self._ring_cells(column, row, ring):
+                for item in cells.get(cell, ()):
+                    distance = _rect_distance(items[item][0], x, y)
+                    if distance < best_distance or (
+                        distance == best_distance and best is None
+                    ):
+                        best, best_distance = item, distance
+
+        return best
+
+    def clear(self):
+        self._cells.clear()
+        self._items.clear()
+        self._bounds = None
+
+    def _grow_bounds(self, cell_range):
+        if self._bounds is None:
+            self._bounds = cell_range
+            return
+        first_column, first_row, last_column, last_row = self._bounds
+        self._bounds = (
+            min(first_column, cell_range[0]),
+            min(first_row, cell_range[1]),
+            max(last_column, cell_range[2]),
+            max(last_row, cell_range[3]),
+        )
+
+    def _cell_range(self, rect):
+        x, y, width, height = rect
+        cell_size = self.cell_size
+        return (
+            int(x // cell_size),
+            int(y // cell_size),
+            int((x + width) // cell_size),
+            int((y + height) // cell_size),
+        )
+
+    @staticmethod
+    def _iter_cells(cell_range):
+        first_column, first_row, last_column, last_row = cell_range
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                yield column, row
+
+    @staticmethod
+    def _ring_cells(column, row, ring):
+        if ring == 0:
+            yield column, row
+            return
+        for offset in range(-ring, ring + 1):
+            yield column + offset, row - ring
+            yield column + offset, row + ring
+        for offset in range(-ring + 1, ring):
+            yield column - ring, row + offset
+            yield column + ring, row + offset
+
+
+def _rect_distance(rect, x, y):
+    """Distance from the point ``(x, y)`` to ``rect``, 0 when it is inside."""
+    rect_x, rect_y, width, height = rect
+    dx = max(rect_x - x, 0, x - rect_x - width)
+    dy = max(rect_y - y, 0, y - rect_y - height)
+    return math.hypot(dx, dy)
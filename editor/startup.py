@@ -0,0 +1,48 @@
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QWidget
+
+
+class PStartupTiming(QObject):
+    """
+    Measures the startup of a `PWindow` from ``start``, a `time.perf_counter`
+    taken when the process started: the time to its first paint, and the
+    time until it is interactive, when its startup is finished and the
+    events queued until then are handled.
+
+    `finished` is emitted with ``{"first_paint": seconds, "interactive":
+    seconds}``.
+    """
+
+    finished = pyqtSignal(dict)
+
+    def __init__(self, window, start, parent=None) -> None:
+        super().__init__(parent)
+
+        self.window = window
+        self.start = start
+        self.times = {}
+
+        # * only until the first paint, it sees every event of the application
+        QApplication.instance().installEventFilter(self)
+        window.startupFinished.connect(self._on_startup_finished)
+
+    def eventFilter(self, watched, event):
+        if (
+            event.type() == QEvent.Paint
+            and isinstance(watched, QWidget)
+            and watched.window() is self.window
+        ):
+            QApplication.instance().removeEventFilter(self)
+            # * after the paint events of this round
+            QTimer.singleShot(0, lambda: self._mark("first_paint"))
+        return False
+
+    def _on_startup_finished(self):
+        QTimer.singleShot(0, lambda: self._mark("interactive"))
+
+    def _mark(self, name):
+        self.times[name] = time.perf_counter() - self.start
+        if len(self.times) == 2:
+            self.finished.emit(dict(self.times))
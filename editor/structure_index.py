@@ -0,0 +1,394 @@
+import bisect
+
+from editor.tokenizer import NORMAL_STATE
+
+OPEN_BRACKETS = {"(": ")", "[": "]", "{": "}"}
+CLOSE_BRACKETS = {")": "(", "]": "[", "}": "{"}
+TAB_SIZE = 4
+
+
+class PStructureIndex:
+    """
+    Bracket pairs and indentation fold regions of a document.
+
+    Every line is summed up by a record ``(delta, min prefix, max suffix,
+    end state, indent)``: the brackets outside of strings and comments count
+    +1 when they open and -1 when they close, ``delta`` is their sum, ``min
+    prefix`` the lowest running sum from the start of the line and ``max
+    suffix`` the highest one from its end. ``end state`` is the lexer state
+    of `PTokenizer` at the end of the line, ``indent`` its indentation, -1
+    for a blank line or one inside a string.
+
+    The records are kept in chunks of about ``chunk_lines`` lines, and the
+    chunks are the leaves of a segment tree holding the same three sums for
+    every range of chunks. The bracket matching a bracket is found by
+    walking down the tree to the first chunk where the depth gets back to 0,
+    in O(log n), and only that chunk and line are looked at more closely.
+
+    An edit only tokenizes its lines again, and the lines after it while the
+    lexer state at their end changes, as `QSyntaxHighlighter` does.
+    """
+
+    def __init__(self, tokenize, chunk_lines=128) -> None:
+        # * ``tokenize(text, state)`` returns the spans and the end state
+        self.tokenize = tokenize
+        self.chunk_lines = chunk_lines
+        # * state the first line starts in, a window of a bigger file can
+        # * start inside a string
+        self.start_state = NORMAL_STATE
+        # * equal records are shared, most lines have the same few ones
+        self._records = {}
+        self.set_lines([""])
+
+    def __len__(self):
+        return self.line_count
+
+    def set_lines(self, lines):
+        for _ in self.build(lines):
+            pass
+
+    def build(self, lines, step_lines=2048):
+        """
+        Index ``lines`` from scratch. A generator, it yields after every
+        ``step_lines`` lines, the index is only usable once it is done.
+        """
+        records = []
+        state = self.start_state
+        for number, text in enumerate(lines):
+            record = self._record(text, state)
+            records.append(record)
+            state = record[3]
+            if number % step_lines == step_lines - 1:
+                yield
+        if not records:
+            records.append(self._record("", NORMAL_STATE))
+
+        size = self.chunk_lines
+        self._chunks = [records[i : i + size] for i in range(0, len(records), size)]
+        self._update_firsts(0)
+        self._build_tree()
+
+    def replace_lines(self, first, count, lines, following=()):
+        """
+        Replace the ``count`` lines from ``first`` by ``lines``. ``following``
+        iterates over the texts of the lines after them, they are tokenized
+        again while their end state changes. Returns how many were.
+        """
+        state = self._record_at(first - 1)[3] if first else self.start_state
+        # * the state the lines after the replaced ones were tokenized with
+        expected = self._record_at(first + count - 1)[3] if count else state
+        records = []
+        for text in lines:
+            record = self._record(text, state)
+            records.append(record)
+            state = record[3]
+
+        end = first + count
+        for text in following:
+            if state == expected or end >= self.line_count:
+                break
+            expected = self._record_at(end)[3]
+            record = self._record(text, state)
+            records.append(record)
+            state = record[3]
+            end += 1
+
+        self._replace_records(first, end - first, records)
+        return end - first - count
+
+    def brackets(self, line, text):
+        """Return the ``(column, bracket)`` of ``line`` outside of strings."""
+        state = self._record_at(line - 1)[3] if line else self.start_state
+        spans, _ = self.tokenize(text, state)
+        brackets = []
+        for start, length, style in spans:
+            if style == "brace":
+                brackets.append((start, _utf16_char(text, start)))
+        return brackets
+
+    def match(self, line, column, line_text):
+        """
+        Return the ``(line, column)`` of the bracket matching the one at
+        ``(line, column)``, or None when there is no bracket there or it is
+        not matched. ``line_text(line)`` returns the text of a line.
+        """
+        brackets = self.brackets(line, line_text(line))
+        for index, (start, bracket) in enumerate(brackets):
+            if start == column:
+                break
+        else:
+            return None
+
+        if bracket in OPEN_BRACKETS:
+            found = self._match_forward(line, brackets[index + 1 :], line_text)
+            pair = OPEN_BRACKETS[bracket]
+        else:
+            found = self._match_backward(line, brackets[:index], line_text)
+            pair = CLOSE_BRACKETS[bracket]
+        if found is None:
+            return None
+        match_line, match_column, match_bracket = found
+        return (match_line, match_column) if match_bracket == pair else None
+
+    def indent(self, line):
+        return self._record_at(line)[4]
+
+    def is_fold_header(self, line):
+        """Whether the next line with an indentation is indented more."""
+        indent = self.indent(line)
+        if indent < 0:
+            return False
+        for number in range(line + 1, self.line_count):
+            next_indent = self.indent(number)
+            if next_indent >= 0:
+                return next_indent > indent
+        return False
+
+    def fold_region(self, line):
+        """
+        Return the ``(first, last)`` lines folded under the header ``line``,
+        the following lines indented more than it, or None.
+        """
+        indent = self.indent(line)
+        if indent < 0:
+            return None
+        last = line
+        for number in range(line + 1, self.line_count):
+            next_indent = self.indent(number)
+            if next_indent < 0:
+                continue
+            if next_indent <= indent:
+                break
+            last = number
+        return (line + 1, last) if last > line else None
+
+    # & Records
+
+    def _record(self, text, state):
+        spans, end_state = self.tokenize(text, state)
+        signs = [
+            1 if _utf16_char(text, start) in OPEN_BRACKETS else -1
+            for start, length, style in spans
+            if style == "brace"
+        ]
+        delta = min_prefix = 0
+        for sign in signs:
+            delta += sign
+            if delta < min_prefix:
+                min_prefix = delta
+        # * the highest running sum from the end of the line
+        max_suffix = running = 0
+        for sign in reversed(signs):
+            running += sign
+            if running > max_suffix:
+                max_suffix = running
+
+        stripped = text.lstrip(" \t")
+        if not stripped or state != NORMAL_STATE:
+            indent = -1
+        else:
+            indent = len(text) - len(stripped)
+            if "\t" in text[:indent]:
+                indent = len(text[:indent].expandtabs(TAB_SIZE))
+
+        record = (delta, min_prefix, max_suffix, end_state, indent)
+        return self._records.setdefault(record, record)
+
+    def _record_at(self, line):
+        chunk = bisect.bisect_right(self._firsts, line) - 1
+        return self._chunks[chunk][line - self._firsts[chunk]]
+
+    def _replace_records(self, first, count, records):
+        start_chunk = bisect.bisect_right(self._firsts, first) - 1
+        end_chunk = start_chunk
+        if count:
+            last = min(first + count - 1, self.line_count - 1)
+            end_chunk = bisect.bisect_right(self._firsts, last) - 1
+        start_line = self._firsts[start_chunk]
+
+        merged = []
+        for chunk in self._chunks[start_chunk : end_chunk + 1]:
+            merged.extend(chunk)
+        merged[first - start_line : first - start_line + count] = records
+        size = self.chunk_lines
+        if len(merged) <= 2 * size:
+            chunks = [merged] if merged else []
+        else:
+            chunks = [merged[i : i + size] for i in range(0, len(merged), size)]
+
+        chunk_count = len(self._chunks)
+        self._chunks[start_chunk : end_chunk + 1] = chunks
+        if not self._chunks:
+            self._chunks = [[self._record("", NORMAL_STATE)]]
+        self._update_firsts(start_chunk)
+        if len(self._chunks) != chunk_count:
+            self._build_tree()
+        else:
+            for chunk in range(start_chunk, start_chunk + len(chunks)):
+                self._update_tree(chunk)
+
+    def _update_firsts(self, start_chunk):
+        firsts = self._firsts if start_chunk else []
+        del firsts[start_chunk:]
+        line = 0
+        if start_chunk:
+            line = firsts[start_chunk - 1] + len(self._chunks[start_chunk - 1])
+        for chunk in self._chunks[start_chunk:]:
+            firsts.append(line)
+            line += len(chunk)
+        self._firsts = firsts
+        self.line_count = line
+
+    # & Segment tree of the chunks
+
+    @staticmethod
+    def _summary(records):
+        """``(delta, min prefix, max suffix)`` of consecutive records."""
+        delta = min_prefix = 0
+        for record in records:
+            if delta + record[1] < min_prefix:
+                min_prefix = delta + record[1]
+            delta += record[0]
+        max_suffix = running = 0
+        for record in reversed(records):
+            if running + record[2] > max_suffix:
+                max_suffix = running + record[2]
+            running += record[0]
+        return delta, min_prefix, max_suffix
+
+    def _build_tree(self):
+        size = 1
+        while size < len(self._chunks):
+            size *= 2
+        self._size = size
+        self._tree = [(0, 0, 0)] * (2 * size)
+        for chunk, records in enumerate(self._chunks):
+            self._tree[size + chunk] = self._summary(records)
+        tree = self._tree
+        for node in range(size - 1, 0, -1):
+            tree[node] = self._merge(tree[2 * node], tree[2 * node + 1])
+
+    def _update_tree(self, chunk):
+        node = self._size + chunk
+        self._tree[node] = self._summary(self._chunks[chunk])
+        node //= 2
+        tree = self._tree
+        while node:
+            tree[node] = self._merge(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+
+    @staticmethod
+    def _merge(left, right):
+        return (
+            left[0] + right[0],
+            min(left[1], left[0] + right[1]),
+            max(right[2], right[0] + left[2]),
+        )
+
+    def _nodes(self, start, end):
+        """The nodes covering the chunks ``[start, end)``, from left to right."""
+        left, right = [], []
+        start += self._size
+        end += self._size
+        while start < end:
+            if start & 1:
+                left.append(start)
+                start += 1
+            if end & 1:
+                end -= 1
+                right.append(end)
+            start //= 2
+            end //= 2
+        return left + right[::-1]
+
+    # & Matching
+
+    def _match_forward(self, line, brackets, line_text):
+        """Find the close bracket of ``depth`` 1 after ``brackets`` of ``line``."""
+        depth = 1
+        for column, bracket in brackets:
+            depth += 1 if bracket in OPEN_BRACKETS else -1
+            if depth == 0:
+                return line, column, bracket
+
+        chunk = bisect.bisect_right(self._firsts, line) - 1
+        records = self._chunks[chunk]
+        first = self._firsts[chunk]
+        for offset in range(line - first + 1, len(records)):
+            if depth + records[offset][1] <= 0:
+                return self._match_in_line(first + offset, depth, line_text, True)
+            depth += records[offset][0]
+
+        tree = self._tree
+        for node in self._nodes(chunk + 1, len(self._chunks)):
+            if depth + tree[node][1] > 0:
+                depth += tree[node][0]
+                continue
+            while node < self._size:
+                node *= 2
+                if depth + tree[node][1] > 0:
+                    depth += tree[node][0]
+                    node += 1
+            chunk = node - self._size
+            first = self._firsts[chunk]
+            for offset, record in enumerate(self._chunks[chunk]):
+                if depth + record[1] <= 0:
+                    return self._match_in_line(first + offset, depth, line_text, True)
+                depth += record[0]
+        return None
+
+    def _match_backward(self, line, brackets, line_text):
+        """Find the open bracket of ``depth`` 1 before ``brackets`` of ``line``."""
+        depth = 1
+        for column, bracket in reversed(brackets):
+            depth += -1 if bracket in OPEN_BRACKETS else 1
+            if depth == 0:
+                return line, column, bracket
+
+        chunk = bisect.bisect_right(self._firsts, line) - 1
+        records = self._chunks[chunk]
+        first = self._firsts[chunk]
+        for offset in range(line - first - 1, -1, -1):
+            if records[offset][2] >= depth:
+                return self._match_in_line(first + offset, depth, line_text, False)
+            depth -= records[offset][0]
+
+        tree = self._tree
+        for node in reversed(self._nodes(0, chunk)):
+            if tree[node][2] < depth:
+                depth -= tree[node][0]
+                continue
+            while node < self._size:
+                node = 2 * node + 1
+                if tree[node][2] < depth:
+                    depth -= tree[node][0]
+                    node -= 1
+            chunk = node - self._size
+            first = self._firsts[chunk]
+            records = self._chunks[chunk]
+            for offset in range(len(records) - 1, -1, -1):
+                if records[offset][2] >= depth:
+                    return self._match_in_line(first + offset, depth, line_text, False)
+                depth -= records[offset][0]
+        return None
+
+    def _match_in_line(self, line, depth, line_text, forward):
+        """The bracket of ``line`` where ``depth``, carried into it, gets to 0."""
+        brackets = self.brackets(line, line_text(line))
+        if not forward:
+            brackets.reverse()
+        for column, bracket in brackets:
+            opening = bracket in OPEN_BRACKETS
+            depth += (1 if opening else -1) if forward else (-1 if opening else 1)
+            if depth == 0:
+                return line, column, bracket
+        return None
+
+
+def _utf16_char(text, position):
+    """The character at the UTF-16 ``position`` of ``text``, as spans index it."""
+    if text.isascii():
+        return text[position]
+    return text.encode("utf-16-le")[2 * position : 2 * position + 2].decode(
+        "utf-16-le", errors="replace"
+    )
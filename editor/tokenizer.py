@@ -0,0 +1,189 @@
+import re
+from collections import OrderedDict
+
+# * lexer states carried from one block to the next
+NORMAL_STATE = 0
+TRI_SINGLE_STATE = 1
+TRI_DOUBLE_STATE = 2
+
+TRIPLE_QUOTES = {TRI_SINGLE_STATE: "'''", TRI_DOUBLE_STATE: '"""'}
+
+
+class PTokenizer:
+    """
+    Single pass tokenizer used by `PSyntaxHighlighter`.
+
+    All the highlighting rules are merged into one alternation with named
+    groups, so every block is scanned exactly once and the result is a list
+    of non overlapping ``(start, length, style)`` spans, where ``style`` is a
+    key of `PSyntaxHighlighter.STYLES`.
+
+    Triple quoted strings can span several blocks, the lexer state at the
+    end of a block is returned with its spans and has to be passed in when
+    tokenizing the next block.
+    """
+
+    def __init__(self, keywords, operators, braces) -> None:
+        # * longest operators first, so "**" wins over "*" and "<=" over "<"
+        operators = sorted(operators, key=len, reverse=True)
+
+        # * the order of the alternatives is the priority of the rules,
+        # * comments and strings swallow everything that is inside them
+        self.pattern = re.compile(
+            "|".join(
+                [
+                    r"(?P<comment>#.*)",
+                    r"(?P<string2>'''|\"\"\")",
+                    r'(?P<string>"[^"\\]*(?:\\.[^"\\]*)*"'
+                    r"|'[^'\\]*(?:\\.[^'\\]*)*')",
+                    r"(?P<defclass_keyword>\b(?:def|class)\b)",
+                    r"(?P<self>\bself\b)",
+                    r"(?P<keyword>\b(?:%s)\b)" % "|".join(keywords),
+                    r"(?P<numbers>\b(?:0[xX][0-9A-Fa-f]+"
+                    r"|[0-9]+(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)[lL]?\b)",
+                    # * identifiers are consumed so that no number or keyword
+                    # * is matched in the middle of a name
+                    r"(?P<identifier>[^\W\d]\w*)",
+                    r"(?P<operator>%s)" % "|".join(operators),
+                    r"(?P<brace>%s)" % "|".join(braces),
+                ]
+            )
+        )
+
+    def tokenize(self, text, state=NORMAL_STATE):
+        """
+        Return the ``(start, length, style)`` spans of a single line, and the
+        lexer state at its end. ``state`` is the state the line starts in.
+        """
+        spans = []
+        after_defclass = False
+        position = 0
+
+        # * continue a triple quoted string opened in a previous block
+        if state != NORMAL_STATE:
+            position = self._string2_end(text, 0, state)
+            if position < 0:
+                return self._spans(text, [(0, len(text), "string2")]), state
+            spans.append((0, position, "string2"))
+            state = NORMAL_STATE
+
+        while True:
+            match = self.pattern.search(text, position)
+            if match is None:
+                break
+            kind = match.lastgroup
+            start, end = match.span()
+            position = end
+
+            if kind == "string2":
+                state = TRI_SINGLE_STATE if text[start] == "'" else TRI_DOUBLE_STATE
+                position = self._string2_end(text, end, state)
+                if position < 0:
+                    spans.append((start, len(text) - start, "string2"))
+                    break
+                spans.append((start, position - start, "string2"))
+                state = NORMAL_STATE
+                after_defclass = False
+                continue
+
+            if kind == "identifier":
+                # * the name following `def` / `class`
+                if after_defclass:
+                    spans.append((start, end - start, "defclass"))
+                after_defclass = False
+                continue
+
+            after_defclass = kind == "defclass_keyword"
+            if after_defclass:
+                kind = "keyword"
+            spans.append((start, end - start, kind))
+
+        return self._spans(text, spans), state
+
+    @staticmethod
+    def _string2_end(text, position, state):
+        """
+        Return the index just after the triple quotes closing the string of
+        ``state``, searching from ``position``, or -1 if it is not closed.
+        """
+        end = text.find(TRIPLE_QUOTES[state], position)
+        return end + 3 if end >= 0 else -1
+
+    @staticmethod
+    def _spans(text, spans):
+        return spans if text.isascii() else utf16_spans(text, spans)
+
+
+class PTokenCache:
+    """
+    Bounded LRU memo of `PTokenizer.tokenize`, keyed by the line text and the
+    lexer state it starts in.
+
+    Qt highlights the same text again on scroll, undo and paste, and real
+    sources repeat a lot of lines (imports, boilerplate, `print` calls), those
+    become a dictionary lookup instead of a regex scan.
+    """
+
+    def __init__(self, tokenizer, max_size=4096) -> None:
+        self.tokenizer = tokenizer
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def tokenize(self, text, state=NORMAL_STATE):
+        """Same as `PTokenizer.tokenize`, spans are returned as a tuple."""
+        key = (text, state)
+        entries = self._entries
+
+        result = entries.get(key)
+        if result is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return result
+
+        self.misses += 1
+        spans, end_state = self.tokenizer.tokenize(text, state)
+        result = entries[key] = (tuple(spans), end_state)
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+        return result
+
+    def resize(self, max_size):
+        """Change the maximum number of cached lines, evicting the oldest ones."""
+        self.max_size = max_size
+        while len(self._entries) > max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def statistics(self):
+        """Return the size, hit and miss counters of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def utf16_spans(text, spans):
+    """
+    Convert python string indexes to the UTF-16 indexes `QSyntaxHighlighter`
+    expects, they only differ when the text has characters outside the BMP.
+    """
+    if all(ord(char) <= 0xFFFF for char in text):
+        return spans
+
+    offsets = [0]
+    for char in text:
+        offsets.append(offsets[-1] + (2 if ord(char) > 0xFFFF else 1))
+
+    return [
+        (offsets[start], offsets[start + length] - offsets[start], style)
+        for start, length, style in spans
+    ]
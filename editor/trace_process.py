@@ -0,0 +1,140 @@
+import os
+import sys
+
+from PyQt5.QtCore import QObject, QProcess, QProcessEnvironment, pyqtSignal
+
+from tracer.events import (
+    EVENT_FINISHED,
+    EVENT_INPUT,
+    EVENT_OUTPUT,
+    EVENT_PAGE,
+    PFrameDecoder,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class PTraceProcess(QObject):
+    """
+    Runs a script under `tracer.runner` in a separate process, and turns the
+    frames of events it writes into signals.
+
+    The tracer already limits the event rate, `eventsReady` is emitted once
+    per frame it sends. Call `send_input` to answer `inputRequested`.
+
+    Once the script is over the process stays alive to answer `request_page`
+    with `pageReady`, until `stop` is called.
+    """
+
+    # * list of the events of one frame
+    eventsReady = pyqtSignal(object)
+    # * prompt
+    inputRequested = pyqtSignal(str)
+    # * exit code
+    finished = pyqtSignal(int)
+    # * ref, start, [(key, summary), ...]
+    pageReady = pyqtSignal(int, int, object)
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+
+        self._process = None
+        self._decoder = None
+        self._finished = False
+
+    def start(self, path):
+        """Trace the script at ``path``, stopping the previous run."""
+        self.stop()
+
+        environment = QProcessEnvironment.systemEnvironment()
+        python_path = environment.value("PYTHONPATH")
+        environment.insert(
+            "PYTHONPATH", os.pathsep.join(filter(None, (ROOT, python_path)))
+        )
+        environment.insert("PYTHONIOENCODING", "utf-8")
+
+        process = self._process = QProcess(self)
+        self._decoder = PFrameDecoder()
+        self._finished = False
+        process.setProcessEnvironment(environment)
+        process.setWorkingDirectory(os.path.dirname(os.path.abspath(path)))
+        process.readyReadStandardOutput.connect(self._read_events)
+        process.readyReadStandardError.connect(self._read_errors)
+        process.finished.connect(self._on_finished)
+        process.start(sys.executable, ["-m", "tracer.runner", path])
+
+    def is_running(self):
+        """Whether the script is still running."""
+        return self._process is not None and not self._finished
+
+    def send_input(self, text):
+        """Answer an `input()` of the script with the line ``text``."""
+        self._send(f"i {text}")
+
+    def request_page(self, ref, start, count):
+        """Ask for ``count`` elements of the value of ``ref`` from ``start``."""
+        self._send(f"p {ref} {start} {count}")
+
+    def close_input(self):
+        """The script gets EOFError from its next `input()`."""
+        if self._process is not None:
+            self._process.closeWriteChannel()
+
+    def stop(self):
+        process = self._process
+        if process is None:
+            return
+        self._process = None
+        process.finished.disconnect(self._on_finished)
+        process.kill()
+        process.waitForFinished(1000)
+        process.deleteLater()
+
+    def _send(self, command):
+        if self._process is not None:
+            # * a line typed with a line break would be two commands
+            command = command.replace("\r", " ").replace("\n", " ")
+            self._process.write((command + "\n").encode("utf-8"))
+
+    def _read_events(self):
+        if self._process is None:
+            return
+        data = bytes(self._process.readAllStandardOutput())
+        prompt = None
+        exit_code = None
+        for events in self._decoder.feed(data):
+            pages = []
+            for event in events:
+                kind = event[0]
+                if kind == EVENT_INPUT:
+                    prompt = event[1]
+                elif kind == EVENT_FINISHED:
+                    exit_code = event[1]
+                elif kind == EVENT_PAGE:
+                    pages.append(event)
+            self.eventsReady.emit(events)
+            for _, ref, start, items in pages:
+                self.pageReady.emit(ref, start, items)
+        # * after the events before it are shown
+        if prompt is not None:
+            self.inputRequested.emit(prompt)
+        if exit_code is not None and not self._finished:
+            self._finished = True
+            self.finished.emit(exit_code)
+
+    def _read_errors(self):
+        # * written by the interpreter itself, e.g. when the tracer fails
+        if self._process is None:
+            return
+        text = bytes(self._process.readAllStandardError()).decode("utf-8", "replace")
+        self.eventsReady.emit([(EVENT_OUTPUT, text)])
+
+    def _on_finished(self, exit_code, exit_status):
+        self._read_events()
+        self._read_errors()
+        process, self._process = self._process, None
+        process.deleteLater()
+        # * the interpreter failed before the script was over
+        if not self._finished:
+            self._finished = True
+            self.finished.emit(exit_code)
@@ -0,0 +1,111 @@
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem
+
+from tracer.values import format_summary
+
+# * the summary of the value of an item
+SUMMARY_ROLE = Qt.UserRole
+# * (ref, start) of the page a "more" item asks for
+MORE_ROLE = Qt.UserRole + 1
+
+
+class PVariablesView(QTreeWidget):
+    """
+    Shows the variables of a traced script from the summaries of their
+    values.
+
+    An item is only updated when the summary of its variable changed, so an
+    unchanged value keeps its expanded elements. A value whose summary has a
+    ref is expanded page by page: `pageRequested` asks for a page and
+    `add_page` shows it.
+    """
+
+    # * ref, start, count
+    pageRequested = pyqtSignal(int, int, int)
+
+    PAGE_SIZE = 50
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+
+        self.setColumnCount(2)
+        self.setHeaderLabels(["Name", "Value"])
+        self.setUniformRowHeights(True)
+        self.itemExpanded.connect(self._on_expanded)
+        self.itemActivated.connect(self._on_activated)
+
+        # * variable name -> its top level item
+        self._items = {}
+        # * (ref, start) -> items waiting for the page
+        self._pending = {}
+
+    def set_variables(self, variables):
+        """Show ``variables``, a dict of variable name -> summary."""
+        items = self._items
+        for name in [name for name in items if name not in variables]:
+            self.takeTopLevelItem(self.indexOfTopLevelItem(items.pop(name)))
+
+        for name, summary in variables.items():
+            item = items.get(name)
+            if item is None:
+                item = items[name] = QTreeWidgetItem(self, [name, ""])
+            elif item.data(0, SUMMARY_ROLE) == summary:
+                continue
+            self._set_summary(item, summary)
+
+    def clear(self):
+        super().clear()
+        self._items.clear()
+        self._pending.clear()
+
+    def add_page(self, ref, start, elements):
+        """Show the page of ``elements`` of the value of ``ref`` from ``start``."""
+        for parent in self._pending.pop((ref, start), ()):
+            # * the variable was changed or removed since it was asked for
+            if parent.treeWidget() is not self:
+                continue
+            summary = parent.data(0, SUMMARY_ROLE)
+            if summary is None or summary[3] != ref:
+                continue
+            # * the "loading" or "more" item
+            if parent.childCount():
+                parent.removeChild(parent.child(parent.childCount() - 1))
+
+            for key, element in elements:
+                self._set_summary(QTreeWidgetItem(parent, [key, ""]), element)
+            end = start + len(elements)
+            if len(elements) == self.PAGE_SIZE and end < summary[1]:
+                more = QTreeWidgetItem(parent, ["…", f"{summary[1] - end} more"])
+                more.setData(0, MORE_ROLE, end)
+
+    def _set_summary(self, item, summary):
+        item.setData(0, SUMMARY_ROLE, summary)
+        item.setText(1, format_summary(summary))
+        # * the elements of the previous value
+        item.takeChildren()
+        item.setChildIndicatorPolicy(
+            QTreeWidgetItem.ShowIndicator
+            if summary[3]
+            else QTreeWidgetItem.DontShowIndicatorWhenChildless
+        )
+        item.setExpanded(False)
+
+    def _request(self, item, start):
+        ref = item.data(0, SUMMARY_ROLE)[3]
+        self._pending.setdefault((ref, start), []).append(item)
+        self.pageRequested.emit(ref, start, self.PAGE_SIZE)
+
+    def _on_expanded(self, item):
+        summary = item.data(0, SUMMARY_ROLE)
+        if summary is None or not summary[3] or item.childCount():
+            return
+        QTreeWidgetItem(item, ["…", "loading"])
+        self._request(item, 0)
+
+    def _on_activated(self, item, column):
+        start = item.data(0, MORE_ROLE)
+        if start is None or item.parent() is None:
+            return
+        item.setText(1, "loading")
+        item.setData(0, MORE_ROLE, None)
+        self._request(item.parent(), start)
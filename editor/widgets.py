@@ -1,24 +1,39 @@
+from collections import OrderedDict
 import math
 from PyQt5.QtWidgets import (
     QHBoxLayout,
     QSplitter,
+    QVBoxLayout,
     QWidget,
     QGraphicsScene,
     QGraphicsView,
 )
-from PyQt5.QtCore import QLine, Qt
+from PyQt5.QtCore import QLine, QPointF, QRectF, Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import (
     QColor,
     QPen,
     QKeyEvent,
     QPainter,
+    QPixmap,
     QWheelEvent,
 )
 
+from code_generator.flowchart import NODE_END, NODE_START
 from editor.code_overview import PCodeOverview
+from editor.find_bar import PFindBar
+from editor.graph_items import PEdgeItem, PNodeItem
+from editor.graph_store import PEdge, PEdgeStore, PNode, PNodeStore
+from editor.line_index import PLineIndex
+from editor.routing import PEdgeRouter
+from editor.spatial_index import PSpatialIndex
 
 
 class PEditorWidget(QWidget):
+    # * idle time after an edit before the flowchart is updated, in ms
+    FLOWCHART_DELAY = 300
+    # * the view follows the cursor at most once per this time, in ms
+    CENTER_DELAY = 50
+
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
 
@@ -39,14 +54,49 @@ class PEditorWidget(QWidget):
 
         self.view = PGraphicsView(self.graphic_scene, self)
         # self.layout.addWidget(self.view)
+
+        # * flowchart of the code, updated incrementally while it is edited
+        self.scene = PScene(self.graphic_scene)
+        # * created with the first flowchart, after the first paint
+        self.flowchart = None
+        self._flowchart_timer = QTimer(self)
+        self._flowchart_timer.setSingleShot(True)
+        self._flowchart_timer.setInterval(self.FLOWCHART_DELAY)
+        self._flowchart_timer.timeout.connect(self.update_flowchart)
+
+        # * holding an arrow key moves the cursor many times per scroll
+        self._center_timer = QTimer(self)
+        self._center_timer.setSingleShot(True)
+        self._center_timer.setInterval(self.CENTER_DELAY)
+        self._center_timer.timeout.connect(self.center_current_node)
+        self._cursor_line = None
+
         self.code_overview = PCodeOverview()
+        self.code_overview.document().contentsChange.connect(
+            self.schedule_flowchart_update
+        )
+        self.code_overview.fileLoaded.connect(self.update_flowchart)
+        self.code_overview.cursorPositionChanged.connect(self.on_cursor_moved)
+        self.code_overview.foldsChanged.connect(self.update_folds)
+        self.view.scenePressed.connect(self.on_scene_pressed)
         # self.layout.addWidget(self.code_overview)
 
+        # * find bar under the code, shown by `PWindow`
+        self.find_bar = PFindBar(self.code_overview)
+        self.find_bar.hide()
+        code_panel = QWidget()
+        code_layout = QVBoxLayout()
+        code_layout.setContentsMargins(0, 0, 0, 0)
+        code_layout.setSpacing(0)
+        code_layout.addWidget(self.code_overview)
+        code_layout.addWidget(self.find_bar)
+        code_panel.setLayout(code_layout)
+
         # * adding a Splitter between codeoverview and graph
         self.splitter = QSplitter()
         self.splitter.setOrientation(Qt.Orientation.Horizontal)
         self.splitter.addWidget(self.view)
-        self.splitter.addWidget(self.code_overview)
+        self.splitter.addWidget(code_panel)
 
         self.layout.addWidget(self.splitter)
 
@@ -58,43 +108,437 @@ class PEditorWidget(QWidget):
 
         # self.add_debug_content()
 
+    def load_file(self, path):
+        """Load the file at ``path``, its flowchart is built once it is loaded."""
+        self.code_overview.load_file(path)
+
+    def schedule_flowchart_update(self, position=0, removed=0, added=0):
+        # * restarting the timer coalesces bursts of typing into one update
+        if not self.code_overview.is_loading():
+            self._flowchart_timer.start()
+
+    def update_flowchart(self, *args):
+        self._flowchart_timer.stop()
+        # * the graph is kept as it is while the code does not parse, a file
+        # * in the virtual mode is too big for one and gets an empty one
+        text = ""
+        if not self.code_overview.is_virtual():
+            text = self.code_overview.toPlainText()
+        if self.flowchart is None:
+            from code_generator.incremental import PIncrementalFlowchart
+
+            self.flowchart = PIncrementalFlowchart(self.scene)
+        self.flowchart.update(text)
+        self.update_folds()
+        # * the node of the cursor line may have been replaced
+        self._cursor_line = None
+        self.on_cursor_moved()
+
+    def update_folds(self):
+        """Collapse the subgraphs of the lines folded in the code."""
+        self.scene.set_folded_lines(
+            [
+                (first + 1, last + 1)
+                for first, last in self.code_overview.folded_regions()
+            ]
+        )
+
+    def on_cursor_moved(self):
+        """Mark the node of the cursor line and bring it into the view."""
+        code_overview = self.code_overview
+        line = code_overview.first_line + code_overview.textCursor().blockNumber() + 1
+        if line == self._cursor_line:
+            return
+        self._cursor_line = line
+        self.scene.set_current_node(self.scene.node_at_line(line))
+        if not self._center_timer.isActive():
+            self._center_timer.start()
+
+    def center_current_node(self):
+        """Center the view on the node of the cursor line when it is not shown."""
+        node = self.scene.current_node
+        if node is None:
+            return
+        x, y, width, height = self.scene.node_store.rect(node)
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        if not visible.contains(QRectF(x, y, width, height)):
+            self.view.centerOn(x + width / 2, y + height / 2)
+
+    def on_scene_pressed(self, position):
+        """Show the code of the node clicked in the view."""
+        node = self.scene.node_at(position.x(), position.y())
+        if node is not None and node not in self.scene.folded_nodes:
+            self.code_overview.show_lines(*self.scene.lines_of(node))
+
 
 class PScene:
-    def __init__(self) -> None:
-        self.nodes = []
-        self.edges = []
+    """
+    Model of the flowchart.
+
+    Nodes and edges are ids into the columnar `PNodeStore` / `PEdgeStore`,
+    `node()` and `edge()` return handles to read them. They are also kept in
+    spatial indexes with their bounding rects ``(x, y, width, height)``, so
+    region queries and hit testing only look at the items near the region.
+    The source line spans of the nodes are kept in a `PLineIndex`, to find
+    the node of a line of the code, and to hide the nodes of the lines
+    folded in the code with `set_folded_lines`.
+
+    When a `PGraphicsScene` is given, the graphics items of the nodes and
+    edges are kept in sync with the model. Edges are drawn along the
+    orthogonal routes of a `PEdgeRouter` snapped to the grid of the scene;
+    a change only drops the routes of the edges of the changed nodes and of
+    the routes passing near them.
+    """
+
+    def __init__(self, graphic_scene=None) -> None:
+        self.node_store = PNodeStore()
+        self.edge_store = PEdgeStore()
+
+        self.nodes = PSpatialIndex()
+        self.edges = PSpatialIndex()
+        self.lines = PLineIndex()
+
+        # * node -> set of the edges starting or ending at it
+        self.node_edges = {}
+        # * the node running in a trace, and the node of the cursor line
+        self.active_node = None
+        self.current_node = None
+        # * nodes hidden by `set_folded_lines`
+        self.folded_nodes = set()
+
+        # * graphics items of the nodes and edges
+        self.grahpic_scene = graphic_scene
+        self.node_items = {}
+        self.edge_items = {}
+
+        grid_size = PEdgeRouter.GRID_SIZE
+        if graphic_scene is not None:
+            grid_size = graphic_scene.grid_size
+        self.router = PEdgeRouter(self, grid_size, self._on_route)
+        # * edges without a route, indexed with a rect which may be stale
+        self._unrouted = set()
 
         # * scene height and width
 
         self.scene_height = 64_000
         self.scene_width = 64_000
 
-        self.init_ui()
+        if self.grahpic_scene is not None:
+            self.init_ui()
 
     def init_ui(self):
-        self.grahpic_scene = PGraphicsScene()
         self.grahpic_scene.set_scene(self.scene_width, self.scene_height)
 
-    def add_node(self, node):
-        self.nodes.append(node)
+    def node(self, node):
+        return PNode(self.node_store, node)
 
-    def add_edge(self, edge):
-        self.edges.append(edge)
+    def edge(self, edge):
+        return PEdge(self.edge_store, edge)
+
+    def add_node(
+        self, x, y, width, height, kind=0, first_line=0, last_line=0, label=""
+    ):
+        """Add a node and return its id."""
+        self._reroute((), [(x, y, width, height)])
+        node = self.node_store.add(
+            x, y, width, height, kind, first_line, last_line, label
+        )
+        self.nodes.insert(node, (x, y, width, height))
+        self.lines.insert(node, first_line, last_line)
+        self.node_edges[node] = set()
+        self._add_node_item(node)
+        return node
+
+    def add_nodes(
+        self,
+        xs,
+        ys,
+        widths,
+        heights,
+        kinds=None,
+        first_lines=None,
+        last_lines=None,
+        labels=None,
+    ):
+        """Add nodes from one sequence per column and return their ids."""
+        self._reroute((), list(zip(xs, ys, widths, heights)))
+        nodes = self.node_store.add_many(
+            xs, ys, widths, heights, kinds, first_lines, last_lines, labels
+        )
+        insert = self.nodes.insert
+        insert_lines = self.lines.insert
+        first_lines, last_lines = self.node_store.first_line, self.node_store.last_line
+        for node, rect in zip(nodes, zip(xs, ys, widths, heights)):
+            insert(node, rect)
+            insert_lines(node, first_lines[node], last_lines[node])
+            self.node_edges[node] = set()
+            self._add_node_item(node)
+        return nodes
+
+    def move_node(self, node, x, y):
+        """Move a node, the edges connected to it follow."""
+        rect = self.node_store.rect(node)
+        self._reroute([node], [rect, (x, y, rect[2], rect[3])])
+        self.node_store.move(node, x, y)
+        self.nodes.move(node, self.node_store.rect(node))
+        self._move_node_item(node)
+
+    def move_nodes(self, nodes, xs, ys):
+        """
+        Move each of ``nodes`` to the matching ``(xs, ys)`` position in one
+        batch, e.g. to apply a layout.
+        """
+        nodes = list(nodes)
+        store = self.node_store
+        rects = [store.rect(node) for node in nodes]
+        rects += [
+            (x, y, store.width[node], store.height[node])
+            for node, x, y in zip(nodes, xs, ys)
+        ]
+        self._reroute(nodes, rects)
+
+        self.node_store.move_many(nodes, xs, ys)
+
+        for node in nodes:
+            self.nodes.move(node, self.node_store.rect(node))
+            self._move_node_item(node)
+
+    def translate(self, dx, dy, nodes=None):
+        """Move ``nodes``, or the whole graph when None, by ``(dx, dy)``."""
+        moved = list(self.node_store if nodes is None else nodes)
+        rects = [self.node_store.rect(node) for node in moved]
+        rects += [(x + dx, y + dy, width, height) for x, y, width, height in rects]
+        self._reroute(moved, rects)
+
+        self.node_store.translate(dx, dy, nodes)
+
+        for node in moved:
+            self.nodes.move(node, self.node_store.rect(node))
+            self._move_node_item(node)
+
+    def set_lines(self, node, first_line, last_line):
+        """Change the source line span of a node."""
+        self.node_store.first_line[node] = first_line
+        self.node_store.last_line[node] = last_line
+        self.lines.move(node, first_line, last_line)
+
+    def node_at_line(self, line):
+        """
+        Return the node with the shortest source line span containing
+        ``line``, None when there is none.
+        """
+        store = self.node_store
+        first_lines, last_lines, kinds = store.first_line, store.last_line, store.kind
+        found, found_span = None, None
+        for node in self.lines.at(line):
+            if kinds[node] in (NODE_START, NODE_END):
+                continue
+            span = last_lines[node] - first_lines[node]
+            # * the lowest id breaks ties, as the order of the set is arbitrary
+            if found is None or (span, node) < (found_span, found):
+                found, found_span = node, span
+        return found
+
+    def lines_of(self, node):
+        """Return the ``(first, last)`` source lines of ``node``."""
+        return self.lines.lines(node)
+
+    def set_folded_lines(self, regions):
+        """
+        Hide the nodes whose lines are all in one of the ``(first, last)``
+        line spans of ``regions``, and the edges of the hidden nodes, the
+        subgraph of a block folded in the code collapses into its header.
+        """
+        folded = set()
+        for first, last in regions:
+            folded.update(self.lines.within(first, last))
+
+        changed = folded ^ self.folded_nodes
+        self.folded_nodes = folded
+        edges = set()
+        for node in changed:
+            item = self.node_items.get(node)
+            if item is not None:
+                item.setVisible(node not in folded)
+            edges.update(self.node_edges[node])
+        for edge in edges:
+            item = self.edge_items.get(edge)
+            if item is not None:
+                item.setVisible(not self._is_edge_folded(edge))
+
+    def set_active_node(self, node):
+        """Highlight ``node``, e.g. the one running in a trace, None clears it."""
+        if node != self.active_node:
+            self._set_item_flag("active", self.active_node, node)
+            self.active_node = node
+
+    def set_current_node(self, node):
+        """Mark ``node`` as the one of the cursor line, None clears it."""
+        if node != self.current_node:
+            self._set_item_flag("current", self.current_node, node)
+            self.current_node = node
+
+    def bounding_rect(self):
+        """Return the rect enclosing the whole graph, e.g. to fit it in a view."""
+        return self.node_store.bounding_rect()
+
+    def add_edge(self, source, target, kind=0):
+        """Add an edge between two nodes and return its id."""
+        edge = self.edge_store.add(source, target, kind)
+        self._index_edge(edge)
+        return edge
+
+    def add_edges(self, sources, targets, kinds=None):
+        """Add edges from one sequence per column and return their ids."""
+        edges = self.edge_store.add_many(sources, targets, kinds)
+        for edge in edges:
+            self._index_edge(edge)
+        return edges
 
     def remove_node(self, node):
+        """Remove a node and the edges connected to it."""
+        for edge in list(self.node_edges[node]):
+            self.remove_edge(edge)
+        del self.node_edges[node]
+        self.folded_nodes.discard(node)
+        if node == self.active_node:
+            self.active_node = None
+        if node == self.current_node:
+            self.current_node = None
         self.nodes.remove(node)
+        self.lines.remove(node)
+        self.node_store.remove(node)
+        item = self.node_items.pop(node, None)
+        if item is not None:
+            self.grahpic_scene.removeItem(item)
 
     def remove_edge(self, edge):
+        self.router.invalidate([edge])
+        source, target = self.edge_store.ends(edge)
+        self.node_edges[source].discard(edge)
+        self.node_edges[target].discard(edge)
+        self._unrouted.discard(edge)
         self.edges.remove(edge)
+        self.edge_store.remove(edge)
+        item = self.edge_items.pop(edge, None)
+        if item is not None:
+            self.grahpic_scene.removeItem(item)
+
+    def nodes_in(self, rect):
+        """Return the set of nodes intersecting ``rect``."""
+        return self.nodes.query(rect)
+
+    def edges_in(self, rect):
+        """Return the set of edges whose route's bounding rect intersects ``rect``."""
+        # * their routes may pass anywhere, they are indexed once routed
+        route = self.router.route
+        for edge in list(self._unrouted):
+            route(edge)
+        return self.edges.query(rect)
+
+    def node_at(self, x, y, max_distance=0):
+        """Return the node closest to ``(x, y)`` within ``max_distance``."""
+        return self.nodes.nearest(x, y, max_distance)
+
+    def edges_of(self, node):
+        """Return the edges starting or ending at ``node``."""
+        return self.node_edges[node]
+
+    def _index_edge(self, edge):
+        source, target = self.edge_store.ends(edge)
+        self.node_edges[source].add(edge)
+        self.node_edges[target].add(edge)
+        self.edges.insert(edge, self._edge_rect(edge))
+        self._unrouted.add(edge)
+
+        if self.grahpic_scene is not None:
+            item = self.edge_items[edge] = PEdgeItem(self, edge)
+            item.setVisible(not self._is_edge_folded(edge))
+            self.grahpic_scene.addItem(item)
+
+    def _is_edge_folded(self, edge):
+        source, target = self.edge_store.ends(edge)
+        return source in self.folded_nodes or target in self.folded_nodes
+
+    def _add_node_item(self, node):
+        if self.grahpic_scene is not None:
+            item = self.node_items[node] = PNodeItem(self, node)
+            self.grahpic_scene.addItem(item)
+
+    def _set_item_flag(self, flag, old_node, new_node):
+        for node, value in ((old_node, False), (new_node, True)):
+            item = self.node_items.get(node)
+            if item is not None:
+                setattr(item, flag, value)
+                item.update()
+
+    def _move_node_item(self, node):
+        item = self.node_items.get(node)
+        if item is not None:
+            item.setPos(self.node_store.x[node], self.node_store.y[node])
+
+    def _reroute(self, nodes, rects):
+        """
+        Drop the routes changed by moving ``nodes`` or by nodes covering
+        ``rects``, before the change.
+        """
+        edges = set()
+        for node in nodes:
+            edges.update(self.node_edges[node])
+
+        if len(rects) > len(self.router.routes):
+            # * most routes change, dropping them all is cheaper
+            rerouted = set(self.router.routes)
+        else:
+            rerouted = self.router.edges_near(rects)
+        rerouted.update(edges)
+
+        self._prepare_edge_items(rerouted)
+        self.router.invalidate(rerouted)
+        self._unrouted.update(rerouted)
+
+    def _on_route(self, edge, rect):
+        self._unrouted.discard(edge)
+        self.edges.move(edge, rect)
+
+    def _prepare_edge_items(self, edges):
+        # * an edge without a route was not drawn since its last change
+        edge_items = self.edge_items
+        routes = self.router.routes
+        for edge in edges:
+            item = edge_items.get(edge)
+            if item is not None and edge in routes:
+                item.update_geometry()
+
+    def _edge_rect(self, edge):
+        # * bounding rect of the line between the centers of the two nodes,
+        # * until the edge is routed
+        source, target = self.edge_store.ends(edge)
+        x1, y1, width1, height1 = self.node_store.rect(source)
+        x2, y2, width2, height2 = self.node_store.rect(target)
+        x1, y1 = x1 + width1 / 2, y1 + height1 / 2
+        x2, y2 = x2 + width2 / 2, y2 + height2 / 2
+        return (min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1))
 
 
 class PGraphicsScene(QGraphicsScene):
+    # * grid lines closer than this on screen (in pixels) are not drawn
+    GRID_MIN_SPACING = 6
+    # * side of the tiles of the grid, in pixels, and how many are kept
+    GRID_TILE_SIZE = 256
+    GRID_TILES = 128
+
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
 
         # * settings
         self.grid_size = 20
+        self.grid_major_size = 100
         self.grid_visible = True
+        # * (column, row) -> pixmap of the grid, least recently used first,
+        # * for the zoom, sizes and background of `_grid_tiles_key`
+        self._grid_tiles = OrderedDict()
+        self._grid_tiles_key = None
         self._color_dark_background = QColor("#202225")
 
         self._color_light_background = QColor("#ffffff")
@@ -109,64 +553,218 @@ class PGraphicsScene(QGraphicsScene):
         self._pen_dark = QPen(self._color_dark)
         self._pen_dark.setWidth(1)
 
+        # * the views only draw the items the index finds in the exposed area
+        self.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+
         # * scene height and width
-        self.scene_width, self.scene_height = 1000, 1000
+        self.set_scene(1000, 1000)
+
+        self.setBackgroundBrush(self._color_dark_background)
+
+    def set_scene(self, scene_width, scene_height):
+        """Resize the scene, it is centered on the origin."""
+        self.scene_width, self.scene_height = scene_width, scene_height
 
         # * scene default position
         self.setSceneRect(
-            self.scene_width // 2,
-            self.scene_height // 2,
+            -self.scene_width // 2,
+            -self.scene_height // 2,
             self.scene_width,
             self.scene_height,
         )
 
-        self.setBackgroundBrush(self._color_dark_background)
-
     # & Drawing a Grid Background in the Graphic Scene
     def drawBackground(self, painter, rect):
         """
         Creating a Grid as background
         """
-        super().drawBackground(painter, rect)
-
-        left = int(math.floor(rect.left()))
-        right = int(math.ceil(rect.right()))
-        top = int(math.floor(rect.top()))
-        bottom = int(math.ceil(rect.bottom()))
-
-        first_left = left - (left % self.grid_size)
-        first_top = top - (top % self.grid_size)
-
-        lines_light, lines_dark = [], []
+        if not self.grid_visible:
+            super().drawBackground(painter, rect)
+            return
 
-        for x_cordinate in range(first_left, right, self.grid_size):
-            if x_cordinate % 100 == 0:
-                lines_dark.append(QLine(x_cordinate, top, x_cordinate, bottom))
-                continue
-            lines_light.append(QLine(x_cordinate, top, x_cordinate, bottom))
+        transform = painter.worldTransform()
+        tiles = self.grid_tiles(rect, transform.m11())
+        if not tiles:
+            super().drawBackground(painter, rect)
+            return
 
-        for y_cordinate in range(first_top, bottom, self.grid_size):
-            if y_cordinate % 100 == 0:
-                lines_dark.append(QLine(left, y_cordinate, right, y_cordinate))
-                continue
-            lines_light.append(QLine(left, y_cordinate, right, y_cordinate))
+        # * the tiles are in device pixels, they are copied as they are
+        painter.save()
+        painter.resetTransform()
+        left, top = round(transform.dx()), round(transform.dy())
+        for x, y, pixmap in tiles:
+            painter.drawPixmap(left + x, top + y, pixmap)
+        painter.restore()
 
-        if self.grid_visible:
+    def grid_tiles(self, rect, scale):
+        """
+        Return ``(x, y, pixmap)`` for the tiles of the grid covering ``rect``
+        at the zoom ``scale``, ``x`` and ``y`` in device pixels from the
+        origin of the scene. A tile is rendered with its background once per
+        zoom level, so a frame only copies pixels, whatever the number of
+        grid lines. Empty when no grid line is drawn at this zoom.
+        """
+        if self.grid_step(scale) is None:
+            return []
+
+        key = (
+            self.grid_size,
+            self.grid_major_size,
+            scale,
+            self.backgroundBrush().color().rgba(),
+        )
+        if key != self._grid_tiles_key:
+            self._grid_tiles_key = key
+            self._grid_tiles.clear()
+
+        size = self.GRID_TILE_SIZE
+        tiles = self._grid_tiles
+        first_column = math.floor(rect.left() * scale / size)
+        last_column = math.floor(rect.right() * scale / size)
+        first_row = math.floor(rect.top() * scale / size)
+        last_row = math.floor(rect.bottom() * scale / size)
+        result = []
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                pixmap = tiles.get((column, row))
+                if pixmap is None:
+                    pixmap = tiles[column, row] = self._grid_tile(column, row, scale)
+                    if len(tiles) > self.GRID_TILES:
+                        tiles.popitem(last=False)
+                else:
+                    tiles.move_to_end((column, row))
+                result.append((column * size, row * size, pixmap))
+        return result
+
+    def _grid_tile(self, column, row, scale):
+        size = self.GRID_TILE_SIZE
+        pixmap = QPixmap(size, size)
+        pixmap.fill(self.backgroundBrush().color())
+
+        # * the transform of the view, moved to the tile by whole pixels, so
+        # * the lines fall on the same pixels as if drawn across the view
+        painter = QPainter(pixmap)
+        painter.translate(-column * size, -row * size)
+        painter.scale(scale, scale)
+        # * with a pixel of margin, a line on the edge is in both tiles
+        margin = 1 / scale
+        rect = QRectF(
+            column * size / scale - margin,
+            row * size / scale - margin,
+            size / scale + 2 * margin,
+            size / scale + 2 * margin,
+        )
+        lines_light, lines_dark = self.grid_lines(rect, scale)
+        if lines_light:
             painter.setPen(self._pen_light)
-            painter.drawLines(*lines_light)
-
+            painter.drawLines(lines_light)
+        if lines_dark:
             painter.setPen(self._pen_dark)
-            painter.drawLines(*lines_dark)
+            painter.drawLines(lines_dark)
+        painter.end()
+        return pixmap
+
+    def grid_step(self, scale):
+        """
+        Return the step between the grid lines drawn at the zoom ``scale``,
+        None when none is. Lines closer than `GRID_MIN_SPACING` pixels on
+        screen are left out, the minor ones first.
+        """
+        step, major = self.grid_size, self.grid_major_size
+        if step * scale >= self.GRID_MIN_SPACING:
+            return step
+        if major * scale >= self.GRID_MIN_SPACING:
+            return major
+        return None
+
+    def grid_lines(self, rect, scale):
+        """
+        Return the light and dark grid lines intersecting ``rect`` at the
+        zoom ``scale``. The light lines are on the multiples of `grid_size`,
+        the dark ones on the multiples of `grid_major_size`.
+        """
+        step = self.grid_step(scale)
+        if step is None:
+            return [], []
+        major = self.grid_major_size
+
+        left = math.floor(rect.left())
+        right = math.ceil(rect.right())
+        top = math.floor(rect.top())
+        bottom = math.ceil(rect.bottom())
+
+        lines_light = []
+        if step != major:
+            lines_light = [
+                QLine(x_cordinate, top, x_cordinate, bottom)
+                for x_cordinate in range(-(-left // step) * step, right + 1, step)
+                if x_cordinate % major
+            ]
+            lines_light += [
+                QLine(left, y_cordinate, right, y_cordinate)
+                for y_cordinate in range(-(-top // step) * step, bottom + 1, step)
+                if y_cordinate % major
+            ]
+        lines_dark = [
+            QLine(x_cordinate, top, x_cordinate, bottom)
+            for x_cordinate in range(-(-left // major) * major, right + 1, major)
+        ]
+        lines_dark += [
+            QLine(left, y_cordinate, right, y_cordinate)
+            for y_cordinate in range(-(-top // major) * major, bottom + 1, major)
+        ]
+        return lines_light, lines_dark
+
+    def set_grid_visible(self, visible):
+        self.grid_visible = visible
+        self.invalidate(QRectF(), QGraphicsScene.BackgroundLayer)
 
 
 class PGraphicsView(QGraphicsView):
     """
     Additional settings and Features for `QGraphicsView`
+
+    A left click outside of a drag emits `scenePressed` with the position
+    in the scene.
+
+    Antialiasing is turned off while the view is panned or zoomed, and turned
+    back on `INTERACTION_DELAY` ms after the last move.
+
+    ``update_mode`` is one of `UPDATE_MODES`, how much of the viewport a
+    change repaints. The background is not cached by the view, the scene
+    copies its grid from pre-rendered tiles.
     """
 
-    def __init__(self, graphics_scene: QGraphicsScene, parent=None) -> None:
+    # * position of a left click in the scene
+    scenePressed = pyqtSignal(QPointF)
+
+    UPDATE_MODES = {
+        "full": QGraphicsView.FullViewportUpdate,
+        "minimal": QGraphicsView.MinimalViewportUpdate,
+        "smart": QGraphicsView.SmartViewportUpdate,
+        "bounding": QGraphicsView.BoundingRectViewportUpdate,
+    }
+
+    # * idle time after a pan or a zoom before antialiasing is back, in ms
+    INTERACTION_DELAY = 150
+    RENDER_HINTS = (
+        QPainter.Antialiasing
+        | QPainter.HighQualityAntialiasing
+        | QPainter.TextAntialiasing
+        | QPainter.SmoothPixmapTransform
+    )
+
+    def __init__(
+        self, graphics_scene: QGraphicsScene, parent=None, update_mode="bounding"
+    ) -> None:
         super().__init__(parent)
         self.graphics_scene = graphics_scene
+        self.update_mode = update_mode
+
+        self._interaction_timer = QTimer(self)
+        self._interaction_timer.setSingleShot(True)
+        self._interaction_timer.setInterval(self.INTERACTION_DELAY)
+        self._interaction_timer.timeout.connect(self.end_interaction)
 
         self.initUI()
 
@@ -178,16 +776,35 @@ class PGraphicsView(QGraphicsView):
         self.zoom_range = [0, 10]
 
     def initUI(self) -> None:
-        self.setRenderHints(
-            QPainter.Antialiasing
-            | QPainter.HighQualityAntialiasing
-            | QPainter.TextAntialiasing
-            | QPainter.SmoothPixmapTransform
-        )
-        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        self.setRenderHints(self.RENDER_HINTS)
+        self.set_update_mode(self.update_mode)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
 
+    def set_update_mode(self, update_mode):
+        """Repaint the changes with one of the `UPDATE_MODES`."""
+        self.setViewportUpdateMode(self.UPDATE_MODES[update_mode])
+        self.update_mode = update_mode
+
+    def begin_interaction(self):
+        """Draw without antialiasing until the view stops moving."""
+        if not self._interaction_timer.isActive():
+            self.setRenderHints(QPainter.RenderHints())
+        self._interaction_timer.start()
+
+    def end_interaction(self):
+        self.setRenderHints(self.RENDER_HINTS)
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        # * a Python override, so that `PInstrumentation` can time the frames
+        super().paintEvent(event)
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        # * the space drag and the zoom around the cursor scroll the view
+        self.begin_interaction()
+        super().scrollContentsBy(dx, dy)
+
     # & Space Hold left Click to Navigate Like PhotoShop Navigation.
 
     def keyPressEvent(self, event: QKeyEvent) -> None:
@@ -218,7 +835,6 @@ class PGraphicsView(QGraphicsView):
         if event.isAutoRepeat():
             return
         self.setDragMode(QGraphicsView.DragMode.NoDrag)
-        print("released")
 
     # & Zoom feature using Scroll Wheel
 
@@ -241,10 +857,19 @@ class PGraphicsView(QGraphicsView):
             self.zoom, clamped = self.zoom_range[1], True
 
         if not clamped or self.zoomClamp is False:
+            self.begin_interaction()
             self.scale(zoom_factor, zoom_factor)
 
         return super().wheelEvent(event)
 
+    def mousePressEvent(self, event):
+        if (
+            event.button() == Qt.LeftButton
+            and self.dragMode() == QGraphicsView.DragMode.NoDrag
+        ):
+            self.scenePressed.emit(self.mapToScene(event.pos()))
+        super().mousePressEvent(event)
+
     # & Middle Mouse Button for Navigation like photoshop Navigation
     # def mousePressEvent(self, event):
     #     if event.button() == Qt.MiddleButton:
@@ -1,15 +1,50 @@
-from PyQt5.QtGui import QFont
+import contextlib
+import os
+import tempfile
+
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor
 from PyQt5.QtWidgets import (
     QAction,
     QDesktopWidget,
+    QDockWidget,
+    QFileDialog,
+    QInputDialog,
     QMainWindow,
+    QPlainTextEdit,
+    QSlider,
 )
 
-from editor.widgets import PEditorWidget
+from editor.code_overview import PCodeOverview, PSyntaxHighlighter
+from editor.lazy_import import lazy_import
+from editor.widgets import PEditorWidget, PGraphicsScene, PGraphicsView
 import globals
 
+# * loaded when a script is first traced
+tracer_events = lazy_import("tracer.events")
+trace_file = lazy_import("tracer.trace_file")
+values = lazy_import("tracer.values")
+
 
 class PWindow(QMainWindow):
+    """
+    Main window of proi.
+
+    It starts in two stages: the window shell is built and shown first, the
+    demo program and its flowchart are loaded from the event loop once the
+    window is painted, then `startupFinished` is emitted. The tracer and the
+    instrumentation are only loaded and created when they are first used.
+    """
+
+    # * the second stage starts at the latest after this time, in ms, even
+    # * when the window is not painted
+    STARTUP_DELAY = 500
+
+    startupFinished = pyqtSignal()
+
+    # * lines of output kept in the output view
+    OUTPUT_LINES = 10_000
+
     def __init__(self) -> None:
         super().__init__()
 
@@ -23,38 +58,401 @@ class PWindow(QMainWindow):
 
         self.setCentralWidget(self.peditor_widget)
 
+        # * output of the traced script
+        self.output_view = QPlainTextEdit()
+        self.output_view.setReadOnly(True)
+        self.output_view.setMaximumBlockCount(self.OUTPUT_LINES)
+        self.output_view.setFont(globals.font(point_size=10))
+        output_dock = QDockWidget("Output", self)
+        output_dock.setWidget(self.output_view)
+        self.addDockWidget(Qt.BottomDockWidgetArea, output_dock)
+
+        # * steps of the last traced run, it is replayed from its trace file
+        self.replay_slider = QSlider(Qt.Horizontal)
+        self.replay_slider.setEnabled(False)
+        self.replay_slider.valueChanged.connect(self.on_replay_step)
+        replay_dock = QDockWidget("Replay", self)
+        replay_dock.setWidget(self.replay_slider)
+        self.addDockWidget(Qt.BottomDockWidgetArea, replay_dock)
+        # * in a directory of this window only, removed when it closes
+        self._trace_directory = tempfile.TemporaryDirectory(prefix="proi_")
+        self.trace_path = os.path.join(self._trace_directory.name, "run.trace")
+        self.trace_writer = None
+        self.trace_reader = None
+        # * private copy of the script of the editor being traced, if any
+        self.trace_script_path = None
+        # * variables of the calls of the running script, innermost last
+        self.trace_stack = []
+
+        # * the view of the variables goes in it, see `trace_tools`
+        self.variables_dock = QDockWidget("Variables", self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.variables_dock)
+        # * created on first use, see `trace_tools`
+        self.trace_process = None
+        self.variables_view = None
+
+        # * created on first use, see `instrumentation_tools`
+        self.instrumentation = None
+        self.instrumentation_overlay = None
+
         # * set window title
         self.setWindowTitle("proi")
-        self.setFont(QFont(globals.DEFAULT_FONT))
+        self.setFont(globals.font())
         # * display the UI
+        self._started = False
+        QTimer.singleShot(self.STARTUP_DELAY, self.finish_startup)
         self.show()
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._started:
+            # * after the children of the shell are painted too
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Second stage of the startup, the content of the editor."""
+        if self._started:
+            return
+        self._started = True
+        self.peditor_widget.load_file(globals.DEMO_FILE)
+        self.startupFinished.emit()
+
+    def trace_tools(self):
+        """Return the trace process and the view of the variables, creating them."""
+        if self.trace_process is None:
+            from editor.trace_process import PTraceProcess
+            from editor.variables_view import PVariablesView
+
+            # * variables of the current step, their elements are asked for to
+            # * the traced process, which stays alive after the run for it
+            self.variables_view = PVariablesView()
+            self.variables_view.setFont(globals.font(point_size=10))
+            self.variables_dock.setWidget(self.variables_view)
+
+            self.trace_process = PTraceProcess(self)
+            self.trace_process.eventsReady.connect(self.on_trace_events)
+            self.trace_process.inputRequested.connect(self.on_trace_input)
+            self.trace_process.finished.connect(self.on_trace_finished)
+            self.trace_process.pageReady.connect(self.variables_view.add_page)
+            self.variables_view.pageRequested.connect(
+                self.trace_process.request_page
+            )
+        return self.trace_process, self.variables_view
+
+    @staticmethod
+    def instrumented():
+        """Return the hot paths timed while the instrumentation is on."""
+        from code_generator.incremental import PIncrementalFlowchart
+        from editor.layout import PLayeredLayout
+
+        return {
+            "highlighter.block": (PSyntaxHighlighter, "highlightBlock"),
+            "highlighter.apply": (PSyntaxHighlighter, "_apply_async_results"),
+            "number_bar.paint": (PCodeOverview.PNumberBar, "paintEvent"),
+            "code.paint": (PCodeOverview, "paintEvent"),
+            "scene.background": (PGraphicsScene, "drawBackground"),
+            "view.paint": (PGraphicsView, "paintEvent"),
+            "flowchart.update": (PIncrementalFlowchart, "update"),
+            "layout.arrange": (PLayeredLayout, "arrange"),
+        }
+
+    def instrumentation_tools(self):
+        """Return the instrumentation and its overlay, creating them."""
+        if self.instrumentation is None:
+            from editor.instrumentation import (
+                PInstrumentation,
+                PInstrumentationOverlay,
+            )
+
+            # * off until the overlay is shown, it then times the hot paths
+            self.instrumentation = PInstrumentation(self.instrumented(), self)
+            self.instrumentation_overlay = PInstrumentationOverlay(
+                self.instrumentation, self
+            )
+            self.instrumentation_overlay.hide()
+        return self.instrumentation, self.instrumentation_overlay
+
     def p_menuBar(self) -> None:
 
         menubar = self.menuBar()
+
+        file_menu = menubar.addMenu("File")
+
+        # Open Option
+        action_open = QAction("Open...", self)
+        action_open.setFont(globals.font())
+        action_open.setShortcut("Ctrl+O")
+        action_open.setToolTip("Open a python script in the Editor")
+        action_open.triggered.connect(self.onClickOpen)
+        file_menu.addAction(action_open)
+
+        edit_menu = menubar.addMenu("Edit")
+
+        action_find = QAction("Find...", self)
+        action_find.setFont(globals.font())
+        action_find.setShortcut("Ctrl+F")
+        action_find.setToolTip("Find the text and highlight all its matches")
+        action_find.triggered.connect(self.onClickFind)
+        edit_menu.addAction(action_find)
+
+        action_find_next = QAction("Find Next", self)
+        action_find_next.setFont(globals.font())
+        action_find_next.setShortcut("F3")
+        action_find_next.triggered.connect(self.onClickFindNext)
+        edit_menu.addAction(action_find_next)
+
+        action_find_previous = QAction("Find Previous", self)
+        action_find_previous.setFont(globals.font())
+        action_find_previous.setShortcut("Shift+F3")
+        action_find_previous.triggered.connect(self.onClickFindPrevious)
+        edit_menu.addAction(action_find_previous)
+
+        edit_menu.addSeparator()
+
+        action_toggle_fold = QAction("Toggle Fold", self)
+        action_toggle_fold.setFont(globals.font())
+        action_toggle_fold.setShortcut("Ctrl+Shift+[")
+        action_toggle_fold.setToolTip("Fold or unfold the block of the cursor line")
+        action_toggle_fold.triggered.connect(self.onClickToggleFold)
+        edit_menu.addAction(action_toggle_fold)
+
+        action_unfold_all = QAction("Unfold All", self)
+        action_unfold_all.setFont(globals.font())
+        action_unfold_all.triggered.connect(self.onClickUnfoldAll)
+        edit_menu.addAction(action_unfold_all)
+
         filemenu = menubar.addMenu("View")
 
         # New Option
         action_new = QAction("Show Grid", self)
-        action_new.setFont(QFont(globals.DEFAULT_FONT))
+        action_new.setFont(globals.font())
         # action_new.setShortcut("Ctrl+N")
         action_new.setToolTip("Show Grid in the Editor")
         action_new.triggered.connect(self.onClickNew)
         filemenu.addAction(action_new)
 
+        action_overlay = QAction("Instrumentation Overlay", self)
+        action_overlay.setFont(globals.font())
+        action_overlay.setCheckable(True)
+        action_overlay.setShortcut("Ctrl+Shift+I")
+        action_overlay.setToolTip("Time the editor and show the frame times")
+        action_overlay.toggled.connect(self.onToggleInstrumentation)
+        filemenu.addAction(action_overlay)
+
+        action_dump = QAction("Save Instrumentation...", self)
+        action_dump.setFont(globals.font())
+        action_dump.setToolTip("Save the timings and stalls as JSON")
+        action_dump.triggered.connect(self.onClickDumpInstrumentation)
+        filemenu.addAction(action_dump)
+
+        run_menu = menubar.addMenu("Run")
+
+        action_trace = QAction("Trace", self)
+        action_trace.setFont(globals.font())
+        action_trace.setShortcut("F5")
+        action_trace.setToolTip("Run the script and follow it line by line")
+        action_trace.triggered.connect(self.onClickTrace)
+        run_menu.addAction(action_trace)
+
+        action_stop = QAction("Stop", self)
+        action_stop.setFont(globals.font())
+        action_stop.setShortcut("Shift+F5")
+        action_stop.triggered.connect(self.onClickStop)
+        run_menu.addAction(action_stop)
+
+    def onClickOpen(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Open", "", "Python Files (*.py);;All Files (*)"
+        )
+        if path:
+            self.peditor_widget.load_file(path)
+
+    def onClickFind(self):
+        self.peditor_widget.find_bar.open()
+
+    def onClickFindNext(self):
+        self.peditor_widget.find_bar.find_next()
+
+    def onClickFindPrevious(self):
+        self.peditor_widget.find_bar.find_previous()
+
+    def onClickToggleFold(self):
+        self.peditor_widget.code_overview.toggle_fold()
+
+    def onClickUnfoldAll(self):
+        self.peditor_widget.code_overview.unfold_all()
+
     def onClickNew(self):
-        self.peditor_widget.graphic_scene.grid_visible = (
+        self.peditor_widget.graphic_scene.set_grid_visible(
             not self.peditor_widget.graphic_scene.grid_visible
         )
-        self.peditor_widget.graphic_scene.update()
-        print("clicked ")
+
+    def onToggleInstrumentation(self, checked):
+        instrumentation, overlay = self.instrumentation_tools()
+        if checked:
+            instrumentation.enable()
+            overlay.show()
+        else:
+            overlay.hide()
+            instrumentation.disable()
+
+    def onClickDumpInstrumentation(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save Instrumentation", "proi_instrumentation.json", "JSON (*.json)"
+        )
+        if path:
+            self.instrumentation_tools()[0].dump(path)
+            self.statusBar().showMessage(f"Instrumentation saved to {path}")
+
+    def onClickTrace(self):
+        process, view = self.trace_tools()
+        process.stop()
+        self._close_trace()
+        self._remove_trace_script()
+
+        code_overview = self.peditor_widget.code_overview
+        path = code_overview.file_path
+        if path is None or code_overview.document().isModified():
+            # * the script is run as it is in the editor, from a file only
+            # * this window can write
+            descriptor, path = tempfile.mkstemp(prefix="proi_trace_", suffix=".py")
+            with open(descriptor, "w", encoding="utf-8") as script_file:
+                script_file.write(code_overview.toPlainText())
+            self.trace_script_path = path
+
+        self.output_view.clear()
+        self.statusBar().showMessage(f"Tracing {os.path.basename(path)}")
+        self.trace_writer = trace_file.PTraceWriter(self.trace_path)
+        self.trace_stack = []
+        view.clear()
+        process.start(path)
+
+    def onClickStop(self):
+        if self.trace_process is not None and self.trace_process.is_running():
+            self.trace_process.stop()
+            self._remove_trace_script()
+            self.peditor_widget.code_overview.set_trace_line(None)
+            self._open_replay()
+            self.statusBar().showMessage("Stopped")
+
+    def on_trace_events(self, events):
+        if self.trace_writer is not None:
+            self.trace_writer.write(events)
+
+        # * a frame comes at most every few ms, only its last line is shown
+        output = []
+        line = None
+        stack = self.trace_stack
+        for event in events:
+            kind = event[0]
+            if kind == tracer_events.EVENT_LINE:
+                line = event[1]
+            elif kind == tracer_events.EVENT_VARIABLE:
+                if not stack:
+                    stack.append({})
+                stack[-1][event[1]] = event[2]
+            elif kind == tracer_events.EVENT_CALL:
+                stack.append({})
+            elif kind == tracer_events.EVENT_RETURN:
+                if stack:
+                    stack.pop()
+            elif kind in (tracer_events.EVENT_OUTPUT, tracer_events.EVENT_EXCEPTION):
+                output.append(event[1])
+            elif kind == tracer_events.EVENT_DROPPED:
+                self.statusBar().showMessage(f"{event[1]} trace events skipped")
+            elif kind == tracer_events.EVENT_FINISHED:
+                line = None
+
+        if output:
+            self.output_view.moveCursor(QTextCursor.End)
+            self.output_view.insertPlainText("".join(output))
+            self.output_view.ensureCursorVisible()
+        if line is not None:
+            self.peditor_widget.code_overview.set_trace_line(line - 1)
+            self.variables_view.set_variables(stack[-1] if stack else {})
+
+    def on_trace_input(self, prompt):
+        text, accepted = QInputDialog.getText(self, "Input", prompt)
+        if accepted:
+            self.output_view.moveCursor(QTextCursor.End)
+            self.output_view.insertPlainText(prompt + text + "\n")
+            self.trace_process.send_input(text)
+        else:
+            self.trace_process.close_input()
+
+    def on_trace_finished(self, exit_code):
+        self._remove_trace_script()
+        self.peditor_widget.code_overview.set_trace_line(None)
+        self._open_replay()
+        self.statusBar().showMessage(f"Finished with exit code {exit_code}")
+
+    def on_replay_step(self, step):
+        if self.trace_reader is None:
+            return
+        state = self.trace_reader.state(step)
+        editor = self.peditor_widget
+        editor.code_overview.set_trace_line(state.line - 1)
+        editor.scene.set_active_node(editor.scene.node_at_line(state.line))
+        self.variables_view.set_variables(state.variables)
+
+        variables = ", ".join(
+            f"{name} = {values.format_summary(summary)}"
+            for name, summary in state.variables.items()
+        )
+        self.statusBar().showMessage(
+            f"Step {step + 1}/{len(self.trace_reader)}  {variables}"
+        )
+
+    def _open_replay(self):
+        """Close the trace file of the run and replay it with the slider."""
+        if self.trace_writer is None:
+            return
+        self.trace_writer.close()
+        self.trace_writer = None
+        self.trace_reader = trace_file.PTraceReader(self.trace_path)
+
+        steps = len(self.trace_reader)
+        self.replay_slider.blockSignals(True)
+        self.replay_slider.setRange(0, max(steps - 1, 0))
+        self.replay_slider.setValue(0)
+        self.replay_slider.blockSignals(False)
+        self.replay_slider.setEnabled(steps > 0)
+
+    def _close_trace(self):
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+            self.trace_writer = None
+        if self.trace_reader is not None:
+            self.trace_reader.close()
+            self.trace_reader = None
+        self.replay_slider.setEnabled(False)
+        self.peditor_widget.scene.set_active_node(None)
+
+    def _remove_trace_script(self):
+        """Remove the copy of the script once the process compiled it."""
+        if self.trace_script_path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.trace_script_path)
+            self.trace_script_path = None
+
+    def closeEvent(self, event):
+        # * the traced process waits for page requests until it is stopped
+        if self.trace_process is not None:
+            self.trace_process.stop()
+        self._close_trace()
+        self._remove_trace_script()
+        # * after the trace file is unmapped
+        self._trace_directory.cleanup()
+        if self.instrumentation is not None:
+            self.instrumentation.disable()
+        super().closeEvent(event)
 
     def window_position(self) -> None:
         # * get the display size.
         display_resolution = QDesktopWidget().screenGeometry(-1)
         # * set the initial window size and position
         self.setGeometry(
-            0, 0, display_resolution.width() / 2, display_resolution.height() / 2
+            0, 0, display_resolution.width() // 2, display_resolution.height() // 2
         )
         # * set the window in the middle
         qr = self.frameGeometry()
@@ -1,2 +1,27 @@
+import os
+
 DEFAULT_FONT = "JetBrains Mono Light"
 DEFAULT_FONT_BOLD = "JetBrains Mono"
+
+# * (family, point size) -> QFont
+_fonts = {}
+
+# * python script shown in the editor at startup
+DEMO_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "demo_python_pgm.txt"
+)
+
+
+def font(family=DEFAULT_FONT, point_size=-1):
+    """
+    Return the `QFont` of ``family``, created on the first call and shared
+    afterwards. Copy it before changing it.
+    """
+    key = (family, point_size)
+    shared = _fonts.get(key)
+    if shared is None:
+        # * Qt is only needed once there is a window
+        from PyQt5.QtGui import QFont
+
+        shared = _fonts[key] = QFont(family, point_size)
+    return shared
@@ -1,10 +1,33 @@
-import sys
-from PyQt5.QtWidgets import QApplication
-from editor.window import PWindow
+import time
+
+# * taken before the imports, they are a good part of the startup
+START = time.perf_counter()
+
+import sys  # noqa: E402
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from editor.window import PWindow  # noqa: E402
+
+
+def print_startup_times(times):
+    print(
+        f"startup: first paint {times['first_paint'] * 1000:.1f}ms, "
+        f"interactive {times['interactive'] * 1000:.1f}ms",
+        file=sys.stderr,
+    )
+
 
 if __name__ == "__main__":
     application = QApplication([])
 
     window = PWindow()
 
+    # * python main.py --startup-timing
+    if "--startup-timing" in sys.argv[1:]:
+        from editor.startup import PStartupTiming
+
+        timing = PStartupTiming(window, START)
+        timing.finished.connect(print_startup_times)
+
     sys.exit(application.exec_())
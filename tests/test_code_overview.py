@@ -0,0 +1,110 @@
+import os
+import tempfile
+import time
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+from editor.code_overview import PCodeOverview, PSyntaxHighlighter
+from editor.mapped_source import index_path
+from editor.structure_index import PStructureIndex
+from editor.tokenizer import NORMAL_STATE, TRI_DOUBLE_STATE
+
+
+class PCodeOverviewVirtualTest(unittest.TestCase):
+    def setUp(self):
+        self.application = QApplication.instance() or QApplication([])
+        # * a docstring over the lines [100, 3000), then code
+        lines = [f"value_{number} = ({number}, [{number}])" for number in range(100)]
+        lines.append('"""')
+        lines += [f"    if ({number}):" for number in range(101, 3000)]
+        lines.append('"""')
+        lines += [f"def f_{number}(x):" for number in range(3001, 10_000)]
+        self.lines = lines
+
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".py", delete=False, encoding="utf-8"
+        ) as source_file:
+            source_file.write("\n".join(lines))
+        self.path = source_file.name
+
+        self.editor = PCodeOverview()
+        self.editor.resize(600, 400)
+        self.editor.load_file(self.path, virtual=True)
+        deadline = time.perf_counter() + 60
+        while self.editor.is_loading():
+            self.assertLess(time.perf_counter(), deadline)
+            self.application.processEvents()
+
+    def tearDown(self):
+        self.editor.highlighter.stop_async()
+        self.editor.load_file(os.devnull)
+        os.remove(index_path(self.path))
+        os.remove(self.path)
+
+    def settle(self):
+        # * the highlighter and the structure index work from the event loop
+        deadline = time.perf_counter() + 1
+        while time.perf_counter() < deadline:
+            self.application.processEvents()
+
+    def assert_indexes_match_document(self):
+        editor = self.editor
+        lines = editor.toPlainText().split("\n")
+        self.assertEqual(
+            lines, self.lines[editor.first_line : editor.first_line + len(lines)]
+        )
+
+        index = editor.search_index()
+        self.assertEqual([index.line(line) for line in range(len(index))], lines)
+
+        expected = PStructureIndex(editor.highlighter.token_cache.tokenize)
+        expected.start_state = editor.highlighter.start_state
+        expected.set_lines(lines)
+        structure = editor.structure
+        self.assertEqual(len(structure), len(lines))
+        for line in range(len(lines)):
+            self.assertEqual(structure.indent(line), expected.indent(line))
+
+    def test_window_starting_inside_a_string_is_highlighted_as_one(self):
+        self.editor.scroll_to_line(1_500)
+        self.settle()
+
+        self.assertEqual(self.editor.first_line, 500)
+        self.assertEqual(self.editor.highlighter.start_state, TRI_DOUBLE_STATE)
+        block = self.editor.document().firstBlock()
+        self.assertEqual(block.userState(), TRI_DOUBLE_STATE)
+        string = PSyntaxHighlighter.STYLES["string2"]
+        formats = [
+            (format.start, format.length, format.format)
+            for format in block.layout().formats()
+        ]
+        self.assertEqual(formats, [(0, len(block.text()), string)])
+
+    def test_refills_move_the_indexes(self):
+        self.settle()
+        search_index = self.editor.search_index()
+        structure = self.editor.structure
+        self.assertIsNotNone(structure)
+
+        # * down and back up, the windows overlap
+        for line in (1_500, 2_600, 1_800, 200):
+            self.editor.scroll_to_line(line)
+            self.settle()
+            self.assertIs(self.editor.search_index(), search_index)
+            self.assertIs(self.editor.structure, structure)
+            self.assert_indexes_match_document()
+
+    def test_jump_builds_the_indexes_again(self):
+        self.settle()
+        self.editor.scroll_to_line(8_000)
+        self.settle()
+
+        self.assertEqual(self.editor.highlighter.start_state, NORMAL_STATE)
+        self.assert_indexes_match_document()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import ast
+import unittest
+
+from code_generator.flowchart import (
+    EDGE_BODY,
+    EDGE_BREAK,
+    EDGE_CONTINUE,
+    EDGE_EXCEPT,
+    EDGE_FALSE,
+    EDGE_LOOP,
+    EDGE_NEXT,
+    EDGE_RETURN,
+    EDGE_TRUE,
+    NODE_BREAK,
+    NODE_CONDITION,
+    NODE_CONTINUE,
+    NODE_END,
+    NODE_FUNCTION,
+    NODE_HANDLER,
+    NODE_LOOP,
+    NODE_RETURN,
+    NODE_START,
+    NODE_STATEMENT,
+    NODE_TRY,
+    PFlowchartGenerator,
+)
+
+
+def edges(chart):
+    """The edges of ``chart`` as ``(source label, target label, kind)``."""
+    labels = chart.labels
+    return {
+        (labels[source], labels[target], kind)
+        for source, target, kind in zip(
+            chart.edge_sources, chart.edge_targets, chart.edge_kinds
+        )
+    }
+
+
+class PFlowchartGeneratorTest(unittest.TestCase):
+    def test_labels_after_a_form_feed(self):
+        # * a form feed is whitespace to `ast`, not the end of a line
+        source = "x = 1\n\x0c\ny = 2\r\nif x:\r    z = 3\n"
+        chart = PFlowchartGenerator().generate(source)
+
+        self.assertEqual(
+            chart.labels, ["start", "x = 1", "if x:", "z = 3", "end"]
+        )
+
+    def test_if_elif_else(self):
+        source = "if x:\n    a = 1\nelif y:\n    b = 2\nelse:\n    c = 3\nd = 4\n"
+        chart = PFlowchartGenerator().generate(source)
+
+        self.assertEqual(
+            list(zip(chart.kinds, chart.labels, chart.first_lines)),
+            [
+                (NODE_START, "start", 1),
+                (NODE_CONDITION, "if x:", 1),
+                (NODE_STATEMENT, "a = 1", 2),
+                (NODE_CONDITION, "elif y:", 3),
+                (NODE_STATEMENT, "b = 2", 4),
+                (NODE_STATEMENT, "c = 3", 6),
+                (NODE_STATEMENT, "d = 4", 7),
+                (NODE_END, "end", 7),
+            ],
+        )
+        self.assertEqual(
+            edges(chart),
+            {
+                ("start", "if x:", EDGE_NEXT),
+                ("if x:", "a = 1", EDGE_TRUE),
+                ("if x:", "elif y:", EDGE_FALSE),
+                ("elif y:", "b = 2", EDGE_TRUE),
+                ("elif y:", "c = 3", EDGE_FALSE),
+                ("a = 1", "d = 4", EDGE_NEXT),
+                ("b = 2", "d = 4", EDGE_NEXT),
+                ("c = 3", "d = 4", EDGE_NEXT),
+                ("d = 4", "end", EDGE_NEXT),
+            },
+        )
+
+    def test_loop_with_break_continue_and_else(self):
+        source = "while x:\n    if y:\n        break\n    continue\nelse:\n    z = 1\n"
+        chart = PFlowchartGenerator().generate(source)
+
+        self.assertEqual(
+            chart.kinds,
+            [
+                NODE_START,
+                NODE_LOOP,
+                NODE_CONDITION,
+                NODE_BREAK,
+                NODE_CONTINUE,
+                NODE_STATEMENT,
+                NODE_END,
+            ],
+        )
+        self.assertEqual(
+            edges(chart),
+            {
+                ("start", "while x:", EDGE_NEXT),
+                ("while x:", "if y:", EDGE_TRUE),
+                ("if y:", "break", EDGE_TRUE),
+                ("if y:", "continue", EDGE_FALSE),
+                ("continue", "while x:", EDGE_CONTINUE),
+                ("while x:", "z = 1", EDGE_FALSE),
+                ("z = 1", "end", EDGE_NEXT),
+                # * a break skips the else clause
+                ("break", "end", EDGE_BREAK),
+            },
+        )
+
+    def test_function_body_ends_in_its_own_end_node(self):
+        source = "def f(a):\n    if a:\n        return 1\n    b = 2\n\nf(3)\n"
+        chart = PFlowchartGenerator().generate(source)
+
+        self.assertEqual(
+            list(zip(chart.kinds, chart.labels, chart.first_lines, chart.last_lines)),
+            [
+                (NODE_START, "start", 1, 1),
+                (NODE_FUNCTION, "def f(a):", 1, 1),
+                (NODE_CONDITION, "if a:", 2, 2),
+                (NODE_RETURN, "return 1", 3, 3),
+                (NODE_STATEMENT, "b = 2", 4, 4),
+                (NODE_END, "end f", 4, 4),
+                (NODE_STATEMENT, "f(3)", 6, 6),
+                (NODE_END, "end", 6, 6),
+            ],
+        )
+        self.assertEqual(
+            edges(chart),
+            {
+                ("start", "def f(a):", EDGE_NEXT),
+                ("def f(a):", "if a:", EDGE_BODY),
+                ("if a:", "return 1", EDGE_TRUE),
+                ("if a:", "b = 2", EDGE_FALSE),
+                ("b = 2", "end f", EDGE_NEXT),
+                ("return 1", "end f", EDGE_RETURN),
+                # * the module flow goes past the definition
+                ("def f(a):", "f(3)", EDGE_NEXT),
+                ("f(3)", "end", EDGE_NEXT),
+            },
+        )
+
+    def test_try_except_finally(self):
+        source = "try:\n    a = 1\nexcept E:\n    b = 2\nfinally:\n    c = 3\n"
+        chart = PFlowchartGenerator().generate(source)
+
+        self.assertEqual(chart.kinds[1], NODE_TRY)
+        self.assertEqual(chart.kinds[3], NODE_HANDLER)
+        self.assertEqual(
+            edges(chart),
+            {
+                ("start", "try:", EDGE_NEXT),
+                ("try:", "a = 1", EDGE_NEXT),
+                ("try:", "except E:", EDGE_EXCEPT),
+                ("except E:", "b = 2", EDGE_NEXT),
+                ("a = 1", "c = 3", EDGE_NEXT),
+                ("b = 2", "c = 3", EDGE_NEXT),
+                ("c = 3", "end", EDGE_NEXT),
+            },
+        )
+
+    def test_fragment_has_no_start_and_end_nodes(self):
+        source = "a = 1\nfor i in x:\n    b = i\n"
+        chart = PFlowchartGenerator().generate_fragment(
+            ast.parse(source).body, source.split("\n")
+        )
+
+        self.assertEqual(chart.labels, ["a = 1", "for i in x:", "b = i"])
+        self.assertEqual(
+            edges(chart),
+            {
+                ("a = 1", "for i in x:", EDGE_NEXT),
+                ("for i in x:", "b = i", EDGE_TRUE),
+                ("b = i", "for i in x:", EDGE_LOOP),
+            },
+        )
+        # * the flow leaves the fragment when the loop is done
+        self.assertEqual(chart.ends, [(1, EDGE_FALSE)])
+
+
+if __name__ == "__main__":
+    unittest.main()
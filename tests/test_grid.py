@@ -0,0 +1,67 @@
+import os
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QApplication
+
+from editor.widgets import PGraphicsScene
+
+
+def vertical_lines(lines):
+    return sorted(line.x1() for line in lines if line.x1() == line.x2())
+
+
+class PGraphicsSceneGridTest(unittest.TestCase):
+    def setUp(self):
+        self.application = QApplication.instance() or QApplication([])
+        self.scene = PGraphicsScene()
+
+    def render(self, scale, dx, dy, tiled):
+        """The background of a 600x400 view, from the tiles or line by line."""
+        image = QImage(600, 400, QImage.Format_RGB32)
+        painter = QPainter(image)
+        painter.translate(dx, dy)
+        painter.scale(scale, scale)
+        rect = QRectF(-dx / scale, -dy / scale, 600 / scale, 400 / scale)
+        if tiled:
+            self.scene.drawBackground(painter, rect)
+        else:
+            painter.fillRect(rect, self.scene.backgroundBrush())
+            lines_light, lines_dark = self.scene.grid_lines(rect, scale)
+            painter.setPen(self.scene._pen_light)
+            painter.drawLines(lines_light)
+            painter.setPen(self.scene._pen_dark)
+            painter.drawLines(lines_dark)
+        painter.end()
+        return image
+
+    def test_lines_are_on_the_multiples_of_the_grid_size(self):
+        self.scene.grid_size = 30
+        lines_light, lines_dark = self.scene.grid_lines(QRectF(-95, -95, 200, 200), 1)
+
+        self.assertEqual(vertical_lines(lines_light), [-90, -60, -30, 30, 60, 90])
+        self.assertEqual(vertical_lines(lines_dark), [0, 100])
+
+    def test_minor_lines_are_left_out_when_zoomed_out(self):
+        lines_light, lines_dark = self.scene.grid_lines(QRectF(0, 0, 1000, 1000), 0.2)
+
+        self.assertEqual(lines_light, [])
+        self.assertEqual(vertical_lines(lines_dark), list(range(0, 1001, 100)))
+
+    def test_tiles_draw_the_same_pixels_as_the_lines(self):
+        for grid_size in (20, 30):
+            self.scene.grid_size = grid_size
+            for scale in (0.26, 0.33, 1, 1.25):
+                for dx, dy in ((0, 0), (137, -411), (-1000, 523)):
+                    with self.subTest(grid_size=grid_size, scale=scale, dx=dx, dy=dy):
+                        self.assertEqual(
+                            self.render(scale, dx, dy, tiled=True),
+                            self.render(scale, dx, dy, tiled=False),
+                        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import time
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtGui import QTextCursor, QTextDocument
+from PyQt5.QtWidgets import QApplication, QPlainTextDocumentLayout
+
+from editor.code_overview import PSyntaxHighlighter
+
+
+class PSyntaxHighlighterAsyncTest(unittest.TestCase):
+    def setUp(self):
+        self.application = QApplication.instance() or QApplication([])
+        self.document = QTextDocument()
+        # * as in `PCodeOverview`, without a layout the edits are not highlighted
+        self.document.setDocumentLayout(QPlainTextDocumentLayout(self.document))
+        line_count = PSyntaxHighlighter.ASYNC_BLOCK_COUNT + 3_000
+        self.document.setPlainText(
+            "\n".join(f"value_{number} = {number}" for number in range(line_count))
+        )
+        self.highlighter = PSyntaxHighlighter(self.document, asynchronous=True)
+
+        self.finished = 0
+        self.highlighter.asyncFinished.connect(self.on_async_finished)
+        self.requests = []
+        self.highlighter.tokenizeRequested.connect(self.on_tokenize_requested)
+
+    def tearDown(self):
+        self.highlighter.stop_async()
+
+    def on_async_finished(self):
+        self.finished += 1
+
+    def on_tokenize_requested(self, generation, lines, start_state):
+        self.requests.append(generation)
+
+    def wait_for_async(self, count=1):
+        deadline = time.perf_counter() + 60
+        while self.finished < count:
+            self.assertLess(time.perf_counter(), deadline)
+            self.application.processEvents()
+
+    def test_every_block_is_highlighted_in_the_background(self):
+        self.wait_for_async()
+
+        block = self.document.firstBlock()
+        while block.isValid():
+            self.assertGreaterEqual(block.userState(), 0)
+            self.assertTrue(block.layout().formats())
+            block = block.next()
+
+    def test_edit_after_background_job_is_highlighted_synchronously(self):
+        self.wait_for_async()
+
+        block = self.document.findBlockByNumber(4_000)
+        cursor = QTextCursor(block)
+        cursor.insertText("if ")
+
+        self.assertEqual(self.requests, [])
+        formats = [(format.start, format.length) for format in block.layout().formats()]
+        self.assertIn((0, 2), formats)
+
+    def test_set_document_starts_the_background_job_again(self):
+        self.wait_for_async()
+        self.highlighter.setDocument(None)
+        self.highlighter.setDocument(self.document)
+
+        self.assertEqual(len(self.requests), 1)
+        self.wait_for_async(2)
+
+
+if __name__ == "__main__":
+    unittest.main()
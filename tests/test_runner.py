@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from tracer.events import (
+    EVENT_CALL,
+    EVENT_EXCEPTION,
+    EVENT_FINISHED,
+    EVENT_INPUT,
+    EVENT_LINE,
+    EVENT_OUTPUT,
+    EVENT_RETURN,
+    EVENT_VARIABLE,
+    PFrameDecoder,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def trace(source, commands=""):
+    """
+    Return the events of ``source`` run by `tracer.runner`, with ``commands``
+    written to its stdin.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "script.py")
+        with open(path, "w", encoding="utf-8") as script_file:
+            script_file.write(textwrap.dedent(source))
+        environment = dict(os.environ, PYTHONPATH=ROOT)
+        result = subprocess.run(
+            [sys.executable, "-m", "tracer.runner", path],
+            input=commands.encode("utf-8"),
+            capture_output=True,
+            env=environment,
+            timeout=60,
+        )
+    batches = PFrameDecoder().feed(result.stdout)
+    return [event for events in batches for event in events]
+
+
+def previews(events, name):
+    """The previews sent for the variable ``name``, in order."""
+    return [
+        event[2][2]
+        for event in events
+        if event[0] == EVENT_VARIABLE and event[1] == name
+    ]
+
+
+class PTracerTest(unittest.TestCase):
+    def test_event_stream(self):
+        events = trace(
+            """
+            def double(x):
+                return 2 * x
+
+            print(double(21))
+            """
+        )
+        kinds = [event[0] for event in events]
+
+        self.assertIn(EVENT_LINE, kinds)
+        self.assertIn((EVENT_CALL, "double", 2), events)
+        self.assertIn((EVENT_RETURN, "double", ("int", -1, "42", 0)), events)
+        self.assertIn((EVENT_OUTPUT, "42\n"), events)
+        self.assertEqual(events[-1], (EVENT_FINISHED, 0))
+
+    def test_same_length_mutations_are_sent(self):
+        events = trace(
+            """
+            a = [3, 1, 2]
+            d = {}
+            for i in range(2):
+                a[i] = 10 + i
+                d["k"] = i
+            a.sort()
+            pass
+            """
+        )
+
+        self.assertEqual(
+            previews(events, "a"),
+            ["3, 1, 2", "10, 1, 2", "10, 11, 2", "2, 10, 11"],
+        )
+        self.assertEqual(previews(events, "d"), ["", "'k': 0", "'k': 1"])
+
+    def test_input_is_typed_in_the_ui(self):
+        events = trace(
+            """
+            name = input("name? ")
+            print("hello", name)
+            """,
+            "i Ada\n",
+        )
+
+        self.assertIn((EVENT_INPUT, "name? "), events)
+        self.assertEqual(previews(events, "name"), ["'Ada'"])
+        self.assertIn((EVENT_OUTPUT, "hello Ada\n"), events)
+
+    def test_exception_ends_the_run(self):
+        events = trace(
+            """
+            class Parser:
+                def parse(self):
+                    raise ValueError("bad input")
+
+            Parser().parse()
+            """
+        )
+
+        self.assertIn((EVENT_CALL, "Parser.parse", 3), events)
+        (text,) = [event[1] for event in events if event[0] == EVENT_EXCEPTION]
+        self.assertTrue(text.endswith("ValueError: bad input\n"))
+        # * the frames of the tracer are left out
+        self.assertNotIn("runner.py", text)
+        self.assertEqual(events[-1], (EVENT_FINISHED, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
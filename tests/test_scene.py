@@ -0,0 +1,37 @@
+import unittest
+
+from editor.widgets import PScene
+
+
+class PSceneEdgeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.scene = PScene()
+        self.top = self.scene.add_node(0, 0, 120, 40)
+        self.bottom = self.scene.add_node(0, 100, 120, 40)
+        # * a loop, its route goes around the two nodes
+        self.edge = self.scene.add_edge(self.bottom, self.top)
+
+    def route_rect(self):
+        points = self.scene.router.route(self.edge)
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def test_edges_are_found_along_their_route(self):
+        left, top, right, bottom = self.route_rect()
+
+        # * below the bottom node, out of the box between the node centers
+        self.assertEqual(self.scene.edges_in((left, bottom - 1, 1, 2)), {self.edge})
+        self.assertEqual(self.scene.edges_in((left, top - 1, 1, 2)), {self.edge})
+
+    def test_moved_edges_are_indexed_with_their_new_route(self):
+        self.scene.move_node(self.bottom, 400, 300)
+        _, _, right, bottom = self.route_rect()
+
+        self.assertEqual(
+            self.scene.edges_in((right - 1, bottom - 1, 2, 2)), {self.edge}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+from tracer.events import (
+    EVENT_CALL,
+    EVENT_DROPPED,
+    EVENT_FINISHED,
+    EVENT_LINE,
+    EVENT_OUTPUT,
+    EVENT_RETURN,
+    EVENT_VARIABLE,
+)
+from tracer.trace_file import PTraceReader, PTraceWriter
+
+
+def run_events():
+    """Events of a run calling ``f`` in a loop, lines far apart included."""
+    events = [(EVENT_LINE, 1), (EVENT_VARIABLE, "n", ("int", -1, "0", 0))]
+    for number in range(20):
+        events += [
+            (EVENT_LINE, 2),
+            (EVENT_VARIABLE, "n", ("int", -1, str(number), 0)),
+            (EVENT_CALL, "f", 300),
+            (EVENT_LINE, 301),
+            (EVENT_VARIABLE, "items", ("list", number, "1, 2", number + 1)),
+            (EVENT_LINE, 302),
+            (EVENT_OUTPUT, f"{number}\n"),
+            (EVENT_RETURN, "f", ("NoneType", -1, "None", 0)),
+        ]
+    events += [(EVENT_DROPPED, 12), (EVENT_LINE, 3), (EVENT_FINISHED, 0)]
+    return events
+
+
+def expected_states(events):
+    """The (line, stack) after each line event, replayed naively."""
+    line, stack, states = 0, [], []
+    for event in events:
+        kind = event[0]
+        if kind == EVENT_LINE:
+            line = event[1]
+            states.append((line, [(name, dict(values)) for name, values in stack]))
+        elif kind == EVENT_VARIABLE:
+            if not stack:
+                stack.append(("<module>", {}))
+            stack[-1][1][event[1]] = event[2]
+        elif kind == EVENT_CALL:
+            stack.append((event[1], {}))
+        elif kind == EVENT_RETURN:
+            stack.pop()
+    return states
+
+
+class PTraceFileTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "run.trace")
+
+    def write(self, events, checkpoint_steps):
+        writer = PTraceWriter(self.path, checkpoint_steps)
+        # * in batches, as they come from the traced process
+        for start in range(0, len(events), 7):
+            writer.write(events[start : start + 7])
+        writer.close()
+        reader = PTraceReader(self.path)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_every_step_is_replayed(self):
+        events = run_events()
+        expected = expected_states(events)
+
+        for checkpoint_steps in (1, 8, 1024):
+            reader = self.write(events, checkpoint_steps)
+            self.assertEqual(len(reader), len(expected))
+            for step, (line, stack) in enumerate(expected):
+                state = reader.state(step)
+                self.assertEqual((state.line, state.stack), (line, stack), step)
+
+    def test_variables_are_the_ones_of_the_innermost_call(self):
+        reader = self.write(run_events(), 8)
+
+        # * line 302 of the second call
+        state = reader.state(6)
+        self.assertEqual(state.line, 302)
+        self.assertEqual(state.variables, {"items": ("list", 1, "1, 2", 2)})
+        # * back in the loop, the variables of a line are sent after it
+        state = reader.state(7)
+        self.assertEqual(state.line, 2)
+        self.assertEqual(state.variables, {"n": ("int", -1, "1", 0)})
+
+    def test_steps_out_of_range(self):
+        reader = self.write(run_events(), 8)
+
+        with self.assertRaises(IndexError):
+            reader.state(len(reader))
+        with self.assertRaises(IndexError):
+            reader.state(-1)
+
+    def test_other_files_are_rejected(self):
+        with open(self.path, "wb") as other_file:
+            other_file.write(bytes(64))
+
+        with self.assertRaises(ValueError):
+            PTraceReader(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
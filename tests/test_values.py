@@ -0,0 +1,46 @@
+import unittest
+
+from tracer.values import PValueInspector
+
+
+class PTrackedBytes(bytes):
+    """Bytes recording the length of every value `repr` is called on."""
+
+    lengths = []
+
+    def __repr__(self):
+        PTrackedBytes.lengths.append(len(self))
+        return super().__repr__()
+
+
+class PValueInspectorTest(unittest.TestCase):
+    def setUp(self):
+        PTrackedBytes.lengths = []
+        self.inspector = PValueInspector()
+
+    def test_large_bytes_are_not_repr_in_full(self):
+        value = PTrackedBytes(b"x" * 10_000_000)
+
+        type_name, length, preview, ref = self.inspector.summarize(value)
+        self.inspector.new_step()
+        _, _, element_preview, _ = self.inspector.summarize([value])
+
+        # * only slices, plain bytes, were given to `repr`
+        self.assertEqual(PTrackedBytes.lengths, [])
+        self.assertLessEqual(len(preview), self.inspector.text_size)
+        self.assertIn("...", preview)
+        self.assertLessEqual(
+            len(element_preview), self.inspector.element_size + len(", …")
+        )
+
+    def test_bytearray_preview_is_bounded(self):
+        _, _, preview, _ = self.inspector.summarize(bytearray(10_000_000))
+        self.assertTrue(preview.startswith("bytearray(b'\\x00"))
+        self.assertLessEqual(len(preview), self.inspector.text_size)
+
+    def test_small_bytes_are_shown_whole(self):
+        self.assertEqual(self.inspector.summarize(b"ab")[2], "b'ab'")
+
+
+if __name__ == "__main__":
+    unittest.main()
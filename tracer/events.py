@@ -0,0 +1,67 @@
+"""
+Events streamed from the traced process, and the frames they travel in.
+
+An event is a tuple ``(kind, ...)``, values are sent as the summaries of
+`tracer.values`. Events are sent in batches, each batch is one frame: its
+length as a 4 byte little endian integer, then the list of events encoded
+with `marshal`.
+
+The traced process reads commands from its stdin, one per line: ``i`` and a
+line typed for `input()`, or ``p ref start count`` to ask for a page of the
+elements of a value.
+"""
+import marshal
+import struct
+
+# * (EVENT_LINE, line), a line is about to run
+EVENT_LINE = 0
+# * (EVENT_CALL, function name, line of the definition)
+EVENT_CALL = 1
+# * (EVENT_RETURN, function name, summary of the returned value)
+EVENT_RETURN = 2
+# * (EVENT_VARIABLE, name, summary of the new value)
+EVENT_VARIABLE = 3
+# * (EVENT_OUTPUT, text), printed by the script
+EVENT_OUTPUT = 4
+# * (EVENT_INPUT, prompt), the script waits for a line on its stdin
+EVENT_INPUT = 5
+# * (EVENT_EXCEPTION, formatted traceback)
+EVENT_EXCEPTION = 6
+# * (EVENT_DROPPED, count), events left out while the rate was too high
+EVENT_DROPPED = 7
+# * (EVENT_FINISHED, exit code)
+EVENT_FINISHED = 8
+# * (EVENT_PAGE, ref, start, [(key, summary), ...]), answer to a page request
+EVENT_PAGE = 9
+
+_HEADER = struct.Struct("<I")
+
+
+def encode_frame(events):
+    """Return the bytes of the frame of ``events``."""
+    payload = marshal.dumps(events)
+    return _HEADER.pack(len(payload)) + payload
+
+
+class PFrameDecoder:
+    """Splits a byte stream back into the event lists of its frames."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """Add ``data`` from the stream and return the complete event lists."""
+        buffer = self._buffer
+        buffer += data
+
+        batches = []
+        offset = 0
+        while len(buffer) - offset >= _HEADER.size:
+            (size,) = _HEADER.unpack_from(buffer, offset)
+            end = offset + _HEADER.size + size
+            if end > len(buffer):
+                break
+            batches.append(marshal.loads(bytes(buffer[offset + _HEADER.size : end])))
+            offset = end
+        del buffer[:offset]
+        return batches
@@ -0,0 +1,411 @@
+"""
+Runs a script under `PTracer`, in the process started by `PTraceProcess`:
+
+    python -m tracer.runner script.py
+
+The frames of events are written to the stdout the process started with,
+what the script prints is sent as events. `input()` asks the UI for a line
+with an `EVENT_INPUT` event and reads the answer from stdin. Once the script
+is over, the process keeps answering page requests until its stdin is
+closed.
+"""
+import builtins
+import io
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+
+from tracer.events import (
+    EVENT_CALL,
+    EVENT_DROPPED,
+    EVENT_EXCEPTION,
+    EVENT_FINISHED,
+    EVENT_INPUT,
+    EVENT_LINE,
+    EVENT_OUTPUT,
+    EVENT_PAGE,
+    EVENT_RETURN,
+    EVENT_VARIABLE,
+    encode_frame,
+)
+from tracer.values import MUTABLE_CONTAINERS, PValueInspector
+
+
+class PTracer:
+    """
+    Records the line, call, return and variable events of the code of one
+    script and writes them in batches to ``channel``.
+
+    On python 3.12+ it uses `sys.monitoring`, whose callbacks are turned off
+    for the code of other files, and falls back to `sys.settrace` before.
+
+    At most ``max_rate`` events a second are recorded. Past the budget of a
+    ``window``, the events are counted and dropped until the next window,
+    and an `EVENT_DROPPED` is sent with their count. With `sys.monitoring`
+    the line events of the busy lines are turned off until the next window,
+    so a hot loop runs close to full speed, and only the first drop of each
+    line is counted.
+
+    Values are sent as the bounded summaries of ``inspector``. A variable is
+    sent again when it is bound to another object, or when the length or the
+    preview of a mutable container changes.
+    """
+
+    BATCH_SIZE = 512
+    MAX_RATE = 20_000
+    WINDOW = 0.05
+
+    def __init__(
+        self,
+        path,
+        channel,
+        stdin=None,
+        max_rate=MAX_RATE,
+        window=WINDOW,
+        batch_size=BATCH_SIZE,
+        inspector=None,
+    ) -> None:
+        # * the file name the script is compiled with
+        self.path = path
+        self.channel = channel
+        self.stdin = stdin if stdin is not None else sys.stdin
+        self.window = window
+        self.batch_size = batch_size
+        self.inspector = inspector if inspector is not None else PValueInspector()
+
+        self.batch = []
+        self.dropped = 0
+        self._budget = max(int(max_rate * window), 1)
+        self._count = 0
+        # * set by the clock thread at the end of each window
+        self._window_over = False
+        self._last_flush = time.perf_counter()
+        self._clock = None
+        self._stopped = threading.Event()
+        self._monitoring = False
+
+        # * commands read from stdin by the reader thread, None once it closed
+        self._inputs = queue.Queue()
+        self._requests = queue.Queue()
+        self._reader = None
+
+        # * locals of the traced frames as last sent,
+        # * name -> (value, length, preview), innermost last
+        self._snapshots = []
+        # * code -> name sent for its calls and returns
+        self._names = {}
+
+    def run(self, source):
+        """Run ``source`` as ``__main__`` under the tracer, return its exit code."""
+        namespace = {"__name__": "__main__", "__file__": self.path}
+        exit_code = 0
+        if self._reader is None:
+            self._reader = threading.Thread(target=self._read_commands, daemon=True)
+            self._reader.start()
+        try:
+            code = compile(source, self.path, "exec")
+            self._start()
+            try:
+                exec(code, namespace)
+            finally:
+                self._stop()
+        except SystemExit as exit:
+            if exit.code is None or isinstance(exit.code, int):
+                exit_code = exit.code or 0
+            else:
+                self.output(f"{exit.code}\n")
+                exit_code = 1
+        except BaseException as error:
+            exit_code = 1
+            # * the frames of the tracer are left out of the traceback
+            tb = error.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename != self.path:
+                tb = tb.tb_next
+            text = "".join(traceback.format_exception(type(error), error, tb))
+            self.batch.append((EVENT_EXCEPTION, text))
+
+        self.batch.append((EVENT_FINISHED, exit_code))
+        self.flush()
+        return exit_code
+
+    def flush(self):
+        if self.batch:
+            self.channel.write(encode_frame(self.batch))
+            self.channel.flush()
+            self.batch = []
+        self._last_flush = time.perf_counter()
+
+    def output(self, text):
+        """Send ``text`` printed by the script."""
+        batch = self.batch
+        if batch and batch[-1][0] == EVENT_OUTPUT:
+            batch[-1] = (EVENT_OUTPUT, batch[-1][1] + text)
+        else:
+            batch.append((EVENT_OUTPUT, text))
+        # * a print in a hot loop is sent with the next window
+        if time.perf_counter() - self._last_flush >= self.window:
+            self.flush()
+
+    def input(self, prompt=""):
+        """`input()` of the script, the line is typed in the UI."""
+        self.batch.append((EVENT_INPUT, str(prompt)))
+        self.flush()
+        while True:
+            try:
+                line = self._inputs.get(timeout=self.window)
+            except queue.Empty:
+                # * the values can be looked at while the script waits
+                if self._serve_requests():
+                    self.flush()
+                continue
+            if line is None:
+                self._inputs.put(None)
+                raise EOFError("EOF when reading a line")
+            return line
+
+    def serve(self):
+        """Answer the page requests until stdin is closed."""
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            self._page(request)
+            self.flush()
+
+    def _read_commands(self):
+        # * the reader thread
+        for line in self.stdin:
+            command, _, argument = line.rstrip("\r\n").partition(" ")
+            if command == "i":
+                self._inputs.put(argument)
+            elif command == "p":
+                self._requests.put(tuple(int(value) for value in argument.split()))
+        self._inputs.put(None)
+        self._requests.put(None)
+
+    def _serve_requests(self):
+        """Answer the pending page requests, returns whether there were some."""
+        served = False
+        requests = self._requests
+        while not requests.empty():
+            request = requests.get_nowait()
+            if request is None:
+                # * kept for `serve`
+                requests.put(None)
+                break
+            self._page(request)
+            served = True
+        return served
+
+    def _page(self, request):
+        ref, start, count = request
+        self.batch.append(
+            (EVENT_PAGE, ref, start, self.inspector.page(ref, start, count))
+        )
+
+    def _start(self):
+        self._stopped.clear()
+        self._clock = threading.Thread(target=self._tick, daemon=True)
+        self._clock.start()
+
+        monitoring = getattr(sys, "monitoring", None)
+        if monitoring is not None:
+            try:
+                monitoring.use_tool_id(monitoring.DEBUGGER_ID, "proi")
+            except ValueError:
+                # * a debugger is already using it
+                monitoring = None
+        if monitoring is None:
+            sys.settrace(self._trace_call)
+            return
+
+        self._monitoring = True
+        tool, events = monitoring.DEBUGGER_ID, monitoring.events
+        callbacks = {
+            events.PY_START: self._monitor_start,
+            events.PY_RESUME: self._monitor_start,
+            events.PY_THROW: self._monitor_start,
+            events.PY_RETURN: self._monitor_return,
+            events.PY_YIELD: self._monitor_return,
+            events.PY_UNWIND: self._monitor_unwind,
+            events.LINE: self._monitor_line,
+        }
+        event_set = 0
+        for event, callback in callbacks.items():
+            monitoring.register_callback(tool, event, callback)
+            event_set |= event
+        monitoring.set_events(tool, event_set)
+
+    def _stop(self):
+        self._stopped.set()
+        if self._monitoring:
+            monitoring = sys.monitoring
+            monitoring.set_events(monitoring.DEBUGGER_ID, 0)
+            monitoring.free_tool_id(monitoring.DEBUGGER_ID)
+            self._monitoring = False
+        else:
+            sys.settrace(None)
+        self._next_window()
+
+    def _tick(self):
+        # * the clock thread, it ends the windows
+        while not self._stopped.wait(self.window):
+            self._window_over = True
+            if self._monitoring:
+                sys.monitoring.restart_events()
+
+    def _allow(self):
+        """Whether an event fits in the budget of the current window."""
+        if self._window_over:
+            self._next_window()
+        if self._count < self._budget:
+            self._count += 1
+            return True
+        self.dropped += 1
+        return False
+
+    def _next_window(self):
+        self._window_over = False
+        self._count = 0
+        self._serve_requests()
+        if self.dropped:
+            self.batch.append((EVENT_DROPPED, self.dropped))
+            self.dropped = 0
+        self.flush()
+
+    def _record(self, event):
+        batch = self.batch
+        batch.append(event)
+        if len(batch) >= self.batch_size:
+            self.flush()
+
+    def _enter(self, code):
+        self._snapshots.append({})
+        if self._allow():
+            self._record((EVENT_CALL, self._name(code), code.co_firstlineno))
+
+    def _exit(self, code, value):
+        if self._snapshots:
+            self._snapshots.pop()
+        if self._allow():
+            self.inspector.new_step()
+            summary = self.inspector.summarize(value)
+            self._record((EVENT_RETURN, self._name(code), summary))
+
+    def _name(self, code):
+        name = self._names.get(code)
+        if name is None:
+            # * `co_qualname` is new in python 3.11, the `sys.settrace`
+            # * fallback also runs on older versions
+            name = self._names[code] = getattr(code, "co_qualname", code.co_name)
+        return name
+
+    def _line(self, frame, line):
+        """Record a line about to run, returns False when it was dropped."""
+        if not self._allow():
+            return False
+        snapshot = self._snapshots[-1] if self._snapshots else {}
+        inspector = self.inspector
+        inspector.new_step()
+        for name, value in frame.f_locals.items():
+            if name[:2] == "__":
+                continue
+            if isinstance(value, MUTABLE_CONTAINERS):
+                length = len(value)
+                preview = inspector.preview(value)
+            else:
+                length, preview = -1, None
+            sent = snapshot.get(name)
+            if (
+                sent is None
+                or sent[0] is not value
+                or sent[1] != length
+                or sent[2] != preview
+            ):
+                snapshot[name] = (value, length, preview)
+                summary = inspector.summarize(value)
+                self._record((EVENT_VARIABLE, name, summary))
+        self._record((EVENT_LINE, line))
+        return True
+
+    # & sys.settrace
+
+    def _trace_call(self, frame, event, arg):
+        if frame.f_code.co_filename != self.path:
+            return None
+        self._enter(frame.f_code)
+        return self._trace_local
+
+    def _trace_local(self, frame, event, arg):
+        if event == "line":
+            self._line(frame, frame.f_lineno)
+        elif event == "return":
+            self._exit(frame.f_code, arg)
+        return self._trace_local
+
+    # & sys.monitoring
+
+    def _monitor_start(self, code, offset, *exception):
+        if code.co_filename != self.path:
+            return sys.monitoring.DISABLE
+        self._enter(code)
+
+    def _monitor_return(self, code, offset, value):
+        if code.co_filename != self.path:
+            return sys.monitoring.DISABLE
+        self._exit(code, value)
+
+    def _monitor_unwind(self, code, offset, exception):
+        # * can not be disabled
+        if code.co_filename == self.path:
+            self._exit(code, None)
+
+    def _monitor_line(self, code, line):
+        if code.co_filename != self.path:
+            return sys.monitoring.DISABLE
+        if not self._line(sys._getframe(1), line):
+            return sys.monitoring.DISABLE
+
+
+class _PEventOutput(io.TextIOBase):
+    """`sys.stdout` and `sys.stderr` of the script, sent as events."""
+
+    def __init__(self, tracer) -> None:
+        super().__init__()
+        self.tracer = tracer
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            self.tracer.output(text)
+        return len(text)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = os.path.abspath(argv[0])
+    with open(path, "r", encoding="utf-8") as script_file:
+        source = script_file.read()
+
+    # * the frames go to the stdout the process started with, anything else
+    # * written to that file descriptor goes to stderr instead
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    tracer = PTracer(path, channel)
+    sys.stdout = sys.stderr = _PEventOutput(tracer)
+    builtins.input = tracer.input
+    sys.argv = [path] + argv[1:]
+    sys.path[0] = os.path.dirname(path)
+    exit_code = tracer.run(source)
+    tracer.serve()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+"""
+Compact on disk format of a traced run, and its replay.
+
+The events are stored as records, one opcode byte followed by varints and
+length prefixed utf-8 strings:
+
+- a line is stored as the difference with the previous line, in the high
+  nibble of the opcode byte when it is small, so most steps take one byte;
+- a variable or function name is written once with `OP_NAME` and then
+  referred to by its number;
+- a value is stored as its summary (see `tracer.values`): the number of its
+  type name, its length, its preview and its ref;
+- every `CHECKPOINT_STEPS` steps a checkpoint record holds the whole state
+  (line, call stack and variables).
+
+The footer holds the name table and the steps and offsets of the
+checkpoints as two arrays of 64 bit integers in the byte order of the
+machine, the trailer at the very end tells where they are. `PTraceReader`
+memory maps the file and reads the state of any step from the closest
+checkpoint before it, so opening a trace only reads its footer and seeking
+reads at most `CHECKPOINT_STEPS` steps.
+"""
+from array import array
+import bisect
+import mmap
+import struct
+
+from tracer.events import (
+    EVENT_CALL,
+    EVENT_DROPPED,
+    EVENT_EXCEPTION,
+    EVENT_FINISHED,
+    EVENT_INPUT,
+    EVENT_LINE,
+    EVENT_OUTPUT,
+    EVENT_RETURN,
+    EVENT_VARIABLE,
+)
+
+MAGIC = b"PROITRC2"
+CHECKPOINT_STEPS = 1024
+
+# * the opcode is in the low nibble of the first byte of a record
+OP_LINE_SHORT = 0
+OP_LINE = 1
+OP_NAME = 2
+OP_VARIABLE = 3
+OP_CALL = 4
+OP_RETURN = 5
+OP_OUTPUT = 6
+OP_EXCEPTION = 7
+OP_DROPPED = 8
+OP_CHECKPOINT = 9
+OP_INPUT = 10
+OP_FINISHED = 11
+
+# * step count, names offset, checkpoint count, checkpoints offset, magic
+_TRAILER = struct.Struct("=QQQQ8s")
+_STRING_EVENTS = {
+    EVENT_OUTPUT: OP_OUTPUT,
+    EVENT_EXCEPTION: OP_EXCEPTION,
+    EVENT_INPUT: OP_INPUT,
+}
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _put_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _put_string(buffer, text):
+    data = text.encode("utf-8", "replace")
+    _put_varint(buffer, len(data))
+    buffer += data
+
+
+def _get_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _get_string(data, offset):
+    size, offset = _get_varint(data, offset)
+    end = offset + size
+    return str(data[offset:end], "utf-8"), end
+
+
+def _skip_string(data, offset):
+    size, offset = _get_varint(data, offset)
+    return offset + size
+
+
+def _get_summary(data, offset, names):
+    type_name, offset = _get_varint(data, offset)
+    length, offset = _get_varint(data, offset)
+    preview, offset = _get_string(data, offset)
+    ref, offset = _get_varint(data, offset)
+    return (names[type_name], _unzigzag(length), preview, ref), offset
+
+
+def _skip_summary(data, offset):
+    _, offset = _get_varint(data, offset)
+    _, offset = _get_varint(data, offset)
+    offset = _skip_string(data, offset)
+    _, offset = _get_varint(data, offset)
+    return offset
+
+
+class PTraceState:
+    """
+    State of a traced run after a step: the line about to run, and for each
+    call of the stack (outermost first) its function name and variables.
+    """
+
+    __slots__ = ("step", "line", "stack")
+
+    def __init__(self, step, line, stack) -> None:
+        self.step = step
+        self.line = line
+        # * [(function name, {variable name: summary of its value}), ...]
+        self.stack = stack
+
+    @property
+    def variables(self):
+        """The variables of the innermost call."""
+        return self.stack[-1][1] if self.stack else {}
+
+
+class PTraceWriter:
+    """
+    Writes the events of a run, as sent by `PTracer`, to a trace file.
+    Call `close` once the run is over to write the footer.
+    """
+
+    # * the records are written to the file in chunks of about this size
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, path, checkpoint_steps=CHECKPOINT_STEPS) -> None:
+        self.path = path
+        self.checkpoint_steps = checkpoint_steps
+        self.step_count = 0
+
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+        self._buffer = bytearray()
+
+        # * name -> number, in the order they are defined
+        self._names = {}
+        self._line = 0
+        # * [(function name number, {variable name number: value}), ...]
+        self._stack = []
+        self._checkpoint_steps = array("Q")
+        self._checkpoint_offsets = array("Q")
+
+    def write(self, events):
+        buffer = self._buffer
+        for event in events:
+            kind = event[0]
+            if kind == EVENT_LINE:
+                self._write_line(buffer, event[1])
+            elif kind == EVENT_VARIABLE:
+                name = self._name(buffer, event[1])
+                if not self._stack:
+                    self._stack.append((self._name(buffer, "<module>"), {}))
+                # * the type name is defined before the record refers to it
+                type_name = self._name(buffer, event[2][0])
+                self._stack[-1][1][name] = (type_name,) + event[2][1:]
+                buffer.append(OP_VARIABLE)
+                _put_varint(buffer, name)
+                self._put_summary(buffer, type_name, event[2])
+            elif kind == EVENT_CALL:
+                name = self._name(buffer, event[1])
+                self._stack.append((name, {}))
+                buffer.append(OP_CALL)
+                _put_varint(buffer, name)
+                _put_varint(buffer, event[2])
+            elif kind == EVENT_RETURN:
+                # * calls dropped by the tracer leave the stack unbalanced
+                if self._stack:
+                    self._stack.pop()
+                name = self._name(buffer, event[1])
+                type_name = self._name(buffer, event[2][0])
+                buffer.append(OP_RETURN)
+                _put_varint(buffer, name)
+                self._put_summary(buffer, type_name, event[2])
+            elif kind in _STRING_EVENTS:
+                buffer.append(_STRING_EVENTS[kind])
+                _put_string(buffer, event[1])
+            elif kind == EVENT_DROPPED:
+                buffer.append(OP_DROPPED)
+                _put_varint(buffer, event[1])
+            elif kind == EVENT_FINISHED:
+                buffer.append(OP_FINISHED)
+                _put_varint(buffer, _zigzag(event[1]))
+
+            if len(buffer) >= self.CHUNK_SIZE:
+                self._flush()
+
+    def close(self):
+        buffer = self._buffer
+        names_offset = self._offset + len(buffer)
+        _put_varint(buffer, len(self._names))
+        for name in self._names:
+            _put_string(buffer, name)
+
+        # * the arrays are 8 byte aligned, so that they can be cast in place
+        buffer += bytes(-(self._offset + len(buffer)) % 8)
+        checkpoints_offset = self._offset + len(buffer)
+        buffer += self._checkpoint_steps.tobytes()
+        buffer += self._checkpoint_offsets.tobytes()
+
+        buffer += _TRAILER.pack(
+            self.step_count,
+            names_offset,
+            len(self._checkpoint_steps),
+            checkpoints_offset,
+            MAGIC,
+        )
+        self._flush()
+        self._file.close()
+
+    def _write_line(self, buffer, line):
+        delta = _zigzag(line - self._line)
+        self._line = line
+        if delta < 16:
+            buffer.append(OP_LINE_SHORT | delta << 4)
+        else:
+            buffer.append(OP_LINE)
+            _put_varint(buffer, delta)
+
+        step = self.step_count
+        self.step_count += 1
+        if step % self.checkpoint_steps == 0:
+            self._checkpoint_steps.append(step)
+            self._checkpoint_offsets.append(self._offset + len(buffer))
+            buffer.append(OP_CHECKPOINT)
+            _put_varint(buffer, line)
+            _put_varint(buffer, len(self._stack))
+            for function, variables in self._stack:
+                _put_varint(buffer, function)
+                _put_varint(buffer, len(variables))
+                for name, summary in variables.items():
+                    _put_varint(buffer, name)
+                    self._put_summary(buffer, summary[0], summary)
+
+    def _put_summary(self, buffer, type_name, summary):
+        _, length, preview, ref = summary
+        _put_varint(buffer, type_name)
+        _put_varint(buffer, _zigzag(length))
+        _put_string(buffer, preview)
+        _put_varint(buffer, ref)
+
+    def _name(self, buffer, name):
+        number = self._names.get(name)
+        if number is None:
+            number = self._names[name] = len(self._names)
+            buffer.append(OP_NAME)
+            _put_string(buffer, name)
+        return number
+
+    def _flush(self):
+        self._file.write(self._buffer)
+        self._offset += len(self._buffer)
+        self._buffer.clear()
+
+
+class PTraceReader:
+    """
+    Reads the state of any step of a trace file written by `PTraceWriter`.
+
+    The file is memory mapped, only the footer is read when it is opened and
+    the pages around the steps looked at are loaded by the OS.
+    """
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            self.step_count,
+            names_offset,
+            checkpoint_count,
+            checkpoints_offset,
+            magic,
+        ) = _TRAILER.unpack_from(self._map, len(self._map) - _TRAILER.size)
+        if magic != MAGIC or self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a trace file")
+
+        count, offset = _get_varint(self._map, names_offset)
+        self.names = []
+        for _ in range(count):
+            name, offset = _get_string(self._map, offset)
+            self.names.append(name)
+
+        # * views of the checkpoint arrays, without copying them
+        self._view = memoryview(self._map)
+        size = checkpoint_count * 8
+        self._checkpoint_steps = self._view[
+            checkpoints_offset : checkpoints_offset + size
+        ].cast("Q")
+        self._checkpoint_offsets = self._view[
+            checkpoints_offset + size : checkpoints_offset + 2 * size
+        ].cast("Q")
+
+    def __len__(self):
+        return self.step_count
+
+    def state(self, step):
+        """Return the `PTraceState` after ``step``, from 0 to ``len() - 1``."""
+        if not 0 <= step < self.step_count:
+            raise IndexError(f"step {step} out of range")
+
+        checkpoint = bisect.bisect_right(self._checkpoint_steps, step) - 1
+        current = self._checkpoint_steps[checkpoint]
+        data = self._map
+        names = self.names
+
+        offset = self._checkpoint_offsets[checkpoint] + 1
+        line, offset = _get_varint(data, offset)
+        depth, offset = _get_varint(data, offset)
+        stack = []
+        for _ in range(depth):
+            function, offset = _get_varint(data, offset)
+            count, offset = _get_varint(data, offset)
+            variables = {}
+            for _ in range(count):
+                name, offset = _get_varint(data, offset)
+                variables[names[name]], offset = _get_summary(data, offset, names)
+            stack.append((names[function], variables))
+
+        while current < step:
+            byte = data[offset]
+            offset += 1
+            opcode = byte & 0x0F
+            if opcode == OP_LINE_SHORT:
+                line += _unzigzag(byte >> 4)
+                current += 1
+            elif opcode == OP_LINE:
+                delta, offset = _get_varint(data, offset)
+                line += _unzigzag(delta)
+                current += 1
+            elif opcode == OP_VARIABLE:
+                name, offset = _get_varint(data, offset)
+                if not stack:
+                    stack.append(("<module>", {}))
+                stack[-1][1][names[name]], offset = _get_summary(data, offset, names)
+            elif opcode == OP_CALL:
+                function, offset = _get_varint(data, offset)
+                _, offset = _get_varint(data, offset)
+                stack.append((names[function], {}))
+            elif opcode == OP_RETURN:
+                _, offset = _get_varint(data, offset)
+                offset = _skip_summary(data, offset)
+                if stack:
+                    stack.pop()
+            elif opcode in (OP_NAME, OP_OUTPUT, OP_EXCEPTION, OP_INPUT):
+                offset = _skip_string(data, offset)
+            elif opcode in (OP_DROPPED, OP_FINISHED):
+                _, offset = _get_varint(data, offset)
+            else:
+                # * the next checkpoint is after ``step``, it is never reached
+                raise ValueError(f"bad record at offset {offset - 1}")
+
+        return PTraceState(step, line, stack)
+
+    def close(self):
+        if getattr(self, "_view", None) is not None:
+            self._checkpoint_steps.release()
+            self._checkpoint_offsets.release()
+            self._view.release()
+            self._view = None
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,224 @@
+"""
+Bounded summaries of the values of a traced script.
+
+A summary is a tuple ``(type name, length, preview, ref)``:
+
+- ``length`` is the number of elements of a container or the length of a
+  string, -1 for other values;
+- ``preview`` is a short text of the value, of a container its first
+  elements;
+- ``ref`` is 0 when the preview shows the whole value, else a handle to ask
+  the tracer process for the elements page by page with `PValueInspector.page`.
+
+Summaries are plain tuples so that they go through `marshal` as they are.
+"""
+from collections import OrderedDict
+from itertools import islice
+import reprlib
+
+_SCALARS = (int, float, complex, bool, type(None))
+_MAPPINGS = (dict,)
+_SEQUENCES = (list, tuple)
+_CONTAINERS = (dict, list, tuple, set, frozenset)
+# * reprlib has no handler for them, it would repr the whole value
+_BYTES = (bytes, bytearray)
+# * containers changed in place, see `PValueInspector.preview`
+MUTABLE_CONTAINERS = (dict, list, set, bytearray)
+
+
+def format_summary(summary):
+    """Return the text shown for a summary, e.g. ``list[1000] [0, 1, 2, …]``."""
+    type_name, length, preview, _ = summary
+    if length < 0 or type_name == "str":
+        return preview
+    return f"{type_name}[{length}] {preview}" if preview else f"{type_name}[{length}]"
+
+
+class PValueInspector:
+    """
+    Summarizes the values of the traced script without calling `repr` on
+    whole containers.
+
+    A container shows its first `items_per_page` elements, each one in at
+    most `element_size` characters, a string its first `text_size`
+    characters. The previews of one step share a budget of `step_budget`
+    characters, once it is spent the summaries only have a type and a
+    length. A summary which does not show the whole value keeps a reference
+    to it, up to `max_refs` of them, the least recently used are dropped.
+    """
+
+    ITEMS_PER_PAGE = 10
+    TEXT_SIZE = 80
+    ELEMENT_SIZE = 20
+    STEP_BUDGET = 2048
+    MAX_REFS = 1024
+
+    def __init__(
+        self,
+        items_per_page=ITEMS_PER_PAGE,
+        text_size=TEXT_SIZE,
+        element_size=ELEMENT_SIZE,
+        step_budget=STEP_BUDGET,
+        max_refs=MAX_REFS,
+    ) -> None:
+        self.items_per_page = items_per_page
+        self.text_size = text_size
+        self.element_size = element_size
+        self.step_budget = step_budget
+        self.max_refs = max_refs
+
+        self.budget = step_budget
+        # * ref -> value, least recently used first
+        self._refs = OrderedDict()
+        # * id of a value -> its ref, valid while the value is in ``_refs``
+        self._ref_ids = {}
+        self._next_ref = 1
+
+        self._repr = reprlib.Repr()
+        self._repr.maxstring = text_size
+        self._repr.maxother = text_size
+        self._element_repr = reprlib.Repr()
+        self._element_repr.maxstring = element_size
+        self._element_repr.maxother = element_size
+        self._element_repr.maxlevel = 1
+
+    def new_step(self):
+        self.budget = self.step_budget
+
+    def summarize(self, value):
+        """Return the summary of ``value``, charged to the budget of the step."""
+        value_type = type(value)
+        type_name = value_type.__name__
+
+        if isinstance(value, _SCALARS):
+            preview = self._text(value, self._repr)
+            return (type_name, -1, self._charge(preview), 0)
+
+        if isinstance(value, str):
+            preview = self._charge(self._repr.repr(value))
+            ref = self._ref(value) if len(value) > self.text_size else 0
+            return (type_name, len(value), preview, ref)
+
+        if isinstance(value, _CONTAINERS):
+            length = len(value)
+            elements = self._elements(value)
+            preview = ", ".join(elements)
+            if length > len(elements):
+                preview += ", …"
+            preview = self._charge(preview)
+            ref = self._ref(value) if length else 0
+            return (type_name, length, preview, ref)
+
+        return (type_name, -1, self._charge(self._text(value, self._repr)), 0)
+
+    def preview(self, value):
+        """
+        Return the preview of ``value`` as `summarize` makes it, without
+        charging it to the budget. A container changed in place with the same
+        length has another preview unless only elements past the first ones
+        changed.
+        """
+        if isinstance(value, _CONTAINERS):
+            return ", ".join(self._elements(value))
+        return self._text(value, self._repr)
+
+    def page(self, ref, start, count):
+        """
+        Return ``[(key, summary), ...]`` for ``count`` elements of the value
+        of ``ref`` from ``start``, as the value is now. Empty when the ref was
+        dropped.
+        """
+        value = self._refs.get(ref)
+        if value is None:
+            return []
+        self._refs.move_to_end(ref)
+
+        self.new_step()
+        if isinstance(value, str):
+            # * the elements of a string are chunks of `text_size` characters
+            size = self.text_size
+            chunks = [
+                (index, value[index * size : (index + 1) * size])
+                for index in range(start, start + count)
+            ]
+            return [
+                (str(index), ("str", len(chunk), chunk, 0))
+                for index, chunk in chunks
+                if chunk
+            ]
+
+        try:
+            if isinstance(value, _MAPPINGS):
+                pairs = [
+                    (self._text(key, self._element_repr), item)
+                    for key, item in islice(value.items(), start, start + count)
+                ]
+            else:
+                if isinstance(value, _SEQUENCES):
+                    # * without walking the elements before ``start``
+                    items = value[start : start + count]
+                else:
+                    items = islice(value, start, start + count)
+                pairs = [
+                    (str(index), item) for index, item in enumerate(items, start)
+                ]
+        except RuntimeError:
+            # * changed size while it was read
+            return []
+        return [(key, self.summarize(item)) for key, item in pairs]
+
+    def _elements(self, value):
+        """Return the texts of the first elements of a container."""
+        element_repr = self._element_repr
+        count = self.items_per_page
+        try:
+            if isinstance(value, _MAPPINGS):
+                return [
+                    f"{self._text(key, element_repr)}: "
+                    f"{self._text(item, element_repr)}"
+                    for key, item in islice(value.items(), count)
+                ]
+            return [self._text(item, element_repr) for item in islice(value, count)]
+        except RuntimeError:
+            return []
+
+    def _text(self, value, repr_):
+        try:
+            if isinstance(value, _BYTES):
+                return self._bytes_text(value, repr_.maxstring)
+            return repr_.repr(value)
+        except Exception:
+            return f"<{type(value).__name__}>"
+
+    @staticmethod
+    def _bytes_text(value, size):
+        """`reprlib.Repr.repr_str` for bytes, from at most ``size`` of them."""
+        text = repr(value[:size])
+        if len(text) > size:
+            head = max(0, (size - 3) // 2)
+            tail = max(0, size - 3 - head)
+            text = repr(value[:head] + value[len(value) - tail :])
+            text = text[:head] + "..." + text[len(text) - tail :]
+        return text
+
+    def _charge(self, preview):
+        """Return the part of ``preview`` the budget of the step allows."""
+        if len(preview) > self.budget:
+            preview = preview[: self.budget]
+        self.budget -= len(preview)
+        return preview
+
+    def _ref(self, value):
+        ref = self._ref_ids.get(id(value))
+        if ref is not None:
+            self._refs.move_to_end(ref)
+            return ref
+
+        ref = self._next_ref
+        self._next_ref += 1
+        self._refs[ref] = value
+        self._ref_ids[id(value)] = ref
+        if len(self._refs) > self.max_refs:
+            _, dropped = self._refs.popitem(last=False)
+            del self._ref_ids[id(dropped)]
+        return ref